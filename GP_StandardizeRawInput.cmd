@@ -3,4 +3,4 @@ echo off
 call _SET_ENV.cmd
 
 rem %PYTHON_EXE_PATH%\python.exe %TOOL_STD_INPUT_SOURCES_PATH%\GP_StandardizeRawInput.py >norm.log 2>error.log
-python.exe %TOOL_STD_INPUT_SOURCES_PATH%\GP_StandardizeRawInput.py 2>exec.log
\ No newline at end of file
+python.exe %TOOL_STD_INPUT_SOURCES_PATH%\GP_StandardizeRawInput.py all 2>exec.log
\ No newline at end of file
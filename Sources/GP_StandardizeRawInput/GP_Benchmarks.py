@@ -0,0 +1,163 @@
+import argparse
+import logging
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# =======================================
+# ============= CONSTANTS ===============
+CLI_SCRIPT_NAME = 'GP_StandardizeRawInput.py'
+
+DEF_STARTUP_RUNS = 5
+DEF_STARTUP_LIMIT_MS = 150.0
+
+# modules, which must not be imported before a subcommand really runs
+STARTUP_FORBIDDEN_MODULES = ['pandas', 'numpy', 'GP_StandardizeRawIPG', 'GP_StandardizeRawScript2']
+
+IMPORTTIME_PREFIX = 'import time:'
+IMPORTTIME_DELIM = '|'
+
+DEF_REGRESSION_IPG_ROWS = 20000
+DEF_REGRESSION_SCRIPT2_RECORDS = 500
+DEF_REGRESSION_CHUNK_ROWS = 100000
+# =======================================
+
+
+def parse_importtime_output(importtime_output):
+    """
+    parses stderr of "python -X importtime"
+    :param importtime_output: string with stderr
+    :return: dict top-level module name -> cumulative import time in us
+    """
+    import_times = {}
+
+    for line in importtime_output.splitlines():
+        if not line.startswith(IMPORTTIME_PREFIX):
+            continue
+
+        fields = line[len(IMPORTTIME_PREFIX):].split(IMPORTTIME_DELIM)
+        if len(fields) != 3:
+            continue
+
+        cumulative_str = fields[1].strip()
+        module_name = fields[2].rstrip()
+
+        # skip header line and nested imports, which are already counted in cumulative time of top-level ones
+        if (not cumulative_str.isdigit()) or module_name.startswith('  '):
+            continue
+
+        import_times[module_name.strip()] = int(cumulative_str)
+
+    return import_times
+
+
+def run_cli_startup(cli_args):
+    """
+    runs CLI once with -X importtime
+    :param cli_args: list of CLI arguments
+    :return: tuple (wall time in ms, dict top-level module name -> cumulative import time in us)
+    """
+    cli_fullname = str(Path(__file__).parent / CLI_SCRIPT_NAME)
+
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', cli_fullname] + cli_args,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+                            cwd=str(Path(__file__).parent))
+    wall_ms = (time.perf_counter() - start) * 1000
+
+    return wall_ms, parse_importtime_output(result.stderr)
+
+
+def bench_startup(runs=DEF_STARTUP_RUNS, limit_ms=DEF_STARTUP_LIMIT_MS):
+    """
+    benchmarks startup of the CLI (--help), and checks it against regressions:
+        - none of STARTUP_FORBIDDEN_MODULES is imported
+        - best total import time is below limit_ms
+
+    :param runs: number of CLI runs, the best one is taken
+    :param limit_ms: max allowed total import time in ms
+    :return: True if no regression found
+    """
+    best_import_ms = None
+    best_wall_ms = None
+    imported_forbidden = set()
+
+    for _ in range(runs):
+        wall_ms, import_times = run_cli_startup(['--help'])
+
+        import_ms = sum(import_times.values()) / 1000
+        best_import_ms = import_ms if best_import_ms is None else min(best_import_ms, import_ms)
+        best_wall_ms = wall_ms if best_wall_ms is None else min(best_wall_ms, wall_ms)
+
+        imported_forbidden.update([module for module in import_times if module in STARTUP_FORBIDDEN_MODULES])
+
+    logging.info(f'Startup: best wall time {best_wall_ms:.1f} ms, best import time {best_import_ms:.1f} ms '
+                 f'(limit {limit_ms:.1f} ms)')
+
+    is_ok = True
+    if imported_forbidden:
+        logging.error('Startup imports heavy modules: ' + ', '.join(sorted(imported_forbidden)))
+        is_ok = False
+    if best_import_ms > limit_ms:
+        logging.error(f'Startup import time {best_import_ms:.1f} ms exceeds limit {limit_ms:.1f} ms')
+        is_ok = False
+
+    return is_ok
+
+
+def bench_regression(cmd_args):
+    """
+    runs differential regression check of optimized standardization paths against the reference ones,
+    see GP_StandardizeRegression.run_regression
+    :param cmd_args: parsed command-line options
+    :return: True if no regression found
+    """
+    import GP_StandardizeRegression as regr
+
+    tolerance = regr.CompareTolerance(chunk_rows=cmd_args.regression_chunk_rows)
+
+    if cmd_args.regression_work_dir:
+        return regr.run_regression(cmd_args.regression_work_dir, cmd_args.regression_indir, cmd_args.golden_dir,
+                                   cmd_args.regression_ipg_rows, cmd_args.regression_script2_records, tolerance)
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        return regr.run_regression(work_dir, cmd_args.regression_indir, cmd_args.golden_dir,
+                                   cmd_args.regression_ipg_rows, cmd_args.regression_script2_records, tolerance)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format=' %(asctime)s - %(levelname)s - %(message)s')
+
+    cmd_parser = argparse.ArgumentParser(description='Benchmarks of GP raw input standardization')
+    cmd_parser.add_argument('--startup-runs', type=int, default=DEF_STARTUP_RUNS,
+                            help='Number of CLI runs for startup benchmark. By default -- ' + str(DEF_STARTUP_RUNS))
+    cmd_parser.add_argument('--startup-limit-ms', type=float, default=DEF_STARTUP_LIMIT_MS,
+                            help='Max allowed CLI import time, ms. By default -- ' + str(DEF_STARTUP_LIMIT_MS))
+    cmd_parser.add_argument('--no-regression', action='store_true',
+                            help='Skip differential regression check of optimized standardization paths')
+    cmd_parser.add_argument('--regression-indir', nargs='+', default=None,
+                            help='Directories with recorded raw files to check in addition to generated ones')
+    cmd_parser.add_argument('--regression-ipg-rows', type=int, default=DEF_REGRESSION_IPG_ROWS,
+                            help='Number of rows per generated IPG file. By default -- '
+                                 + str(DEF_REGRESSION_IPG_ROWS))
+    cmd_parser.add_argument('--regression-script2-records', type=int, default=DEF_REGRESSION_SCRIPT2_RECORDS,
+                            help='Number of records per generated Script2 file. By default -- '
+                                 + str(DEF_REGRESSION_SCRIPT2_RECORDS))
+    cmd_parser.add_argument('--regression-chunk-rows', type=int, default=DEF_REGRESSION_CHUNK_ROWS,
+                            help='Number of rows per compared chunk of standardized files. By default -- '
+                                 + str(DEF_REGRESSION_CHUNK_ROWS))
+    cmd_parser.add_argument('--golden-dir', default='',
+                            help='Directory with golden standardized files of the reference run; '
+                                 'recorded there if empty. By default -- no golden comparison')
+    cmd_parser.add_argument('--regression-work-dir', default='',
+                            help='Directory to keep generated raw files, outputs and logs of the regression check. '
+                                 'By default -- temporary directory')
+    cmd_args = cmd_parser.parse_args()
+
+    all_ok = bench_startup(cmd_args.startup_runs, cmd_args.startup_limit_ms)
+    if not cmd_args.no_regression:
+        all_ok = bench_regression(cmd_args) and all_ok
+
+    sys.exit(0 if all_ok else 1)
@@ -0,0 +1,180 @@
+import logging
+import hashlib
+import os
+import shutil
+import uuid
+from pathlib import Path
+import pandas as pd
+
+import GP_RawInputUtils as rawu
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+# =======================================
+# ============= CONSTANTS ===============
+CACHE_KEY_DELIM = '_'
+CACHE_TMP_DIR_PREFIX = '.tmp_'
+# size in bytes of the hash of the filename parts in the key
+CACHE_NAME_HASH_SIZE = 8
+
+# Feather (Arrow IPC) files can be memory-mapped on load, pickle is used if pyarrow is not installed
+CACHE_FEATHER_FILE_EXT = '.feather'
+CACHE_PICKLE_FILE_EXT = '.pkl'
+CACHE_PICKLE_PROTOCOL = 5
+
+CACHE_COPIED_FILE_EXT = '.file'
+# =======================================
+
+
+def get_cache_key(full_filename, source_name, parser_version, options_tag=''):
+    """
+    creates cache key of parsed tables of the raw file:
+    the same content parsed by the same parser version gives the same key, independently on the path of the file;
+    PC name and date/time from the filename are part of the key, as parsers put them to the tables
+    :param full_filename: full name (including full path) of the raw file
+    :param source_name: name of the raw source
+    :param parser_version: version of the parser of the raw source
+    :param options_tag: tag of the parser options, which change the set of cached tables; empty for no such options
+    :return: key string
+    """
+    filename_parts = rawu.get_filename_parts(full_filename)
+    name_hash = hashlib.blake2b((filename_parts.PC_name + CACHE_KEY_DELIM + filename_parts.Date + CACHE_KEY_DELIM
+                                 + filename_parts.Time).encode(), digest_size=CACHE_NAME_HASH_SIZE).hexdigest()
+
+    return rawu.get_file_content_hash(full_filename) + CACHE_KEY_DELIM + name_hash + CACHE_KEY_DELIM + source_name \
+           + CACHE_KEY_DELIM + str(parser_version) + ((CACHE_KEY_DELIM + options_tag) if options_tag else '')
+
+
+def get_cache_file_ext():
+    """
+    :return: extension of cached table files
+    """
+    return CACHE_PICKLE_FILE_EXT if pyarrow is None else CACHE_FEATHER_FILE_EXT
+
+
+def store_cached_tables(cache_dir, key, tables, files=None):
+    """
+    stores parsed tables to cache; the entry appears atomically, so parallel runs never see it partially
+    :param cache_dir: cache directory
+    :param key: cache key
+    :param tables: dict table name -> Dataframe
+    :param files: dict name -> full filename of already stored (e.g. streamed) table, copied to the entry as is
+    :return: None
+    """
+    entry_path = Path(cache_dir) / key
+    if entry_path.exists():
+        return
+
+    tmp_path = Path(cache_dir) / (CACHE_TMP_DIR_PREFIX + key + CACHE_KEY_DELIM + uuid.uuid4().hex)
+    tmp_path.mkdir(parents=True)
+
+    file_ext = get_cache_file_ext()
+    for name, df in tables.items():
+        table_fullname = tmp_path / (name + file_ext)
+        if pyarrow is None:
+            df.to_pickle(table_fullname, protocol=CACHE_PICKLE_PROTOCOL)
+        else:
+            df.reset_index(drop=True).to_feather(table_fullname)
+
+    if files is not None:
+        for name, full_filename in files.items():
+            shutil.copyfile(full_filename, tmp_path / (name + CACHE_COPIED_FILE_EXT))
+
+    try:
+        os.rename(tmp_path, entry_path)
+        logging.info('Parsed tables are cached to "' + str(entry_path) + '"')
+    except OSError:
+        # the same entry is already stored by a parallel run
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def load_cached_tables(cache_dir, key):
+    """
+    loads parsed tables from cache, and marks the entry as recently used
+    :param cache_dir: cache directory
+    :param key: cache key
+    :return: dict table name -> Dataframe, None if there is no such entry
+    """
+    entry_path = Path(cache_dir) / key
+    if not entry_path.is_dir():
+        return None
+
+    tables = {}
+    try:
+        for table_file in entry_path.iterdir():
+            if table_file.suffix == CACHE_FEATHER_FILE_EXT:
+                if pyarrow is None:
+                    return None
+                tables[table_file.stem] = pd.read_feather(table_file, memory_map=True)
+            elif table_file.suffix == CACHE_PICKLE_FILE_EXT:
+                tables[table_file.stem] = pd.read_pickle(table_file)
+
+        # mtime of the entry is its last usage time for LRU eviction
+        os.utime(entry_path)
+    except OSError:
+        # the entry is evicted by a parallel run
+        return None
+
+    logging.info('Parsed tables are loaded from cache "' + str(entry_path) + '"')
+
+    return tables
+
+
+def get_cached_file(cache_dir, key, name):
+    """
+    gets file, copied to the cache entry by store_cached_tables
+    :param cache_dir: cache directory
+    :param key: cache key
+    :param name: name of the file in the entry
+    :return: full filename, None if there is no such file
+    """
+    cached_file = Path(cache_dir) / key / (name + CACHE_COPIED_FILE_EXT)
+
+    return str(cached_file) if cached_file.is_file() else None
+
+
+def get_cache_entry_size(entry_path):
+    """
+    :param entry_path: Path of the cache entry
+    :return: size of all files of the entry in bytes
+    """
+    return sum([table_file.stat().st_size for table_file in entry_path.iterdir()])
+
+
+def evict_cache(cache_dir, max_bytes):
+    """
+    removes least recently used cache entries until the cache size is not above max_bytes
+    :param cache_dir: cache directory
+    :param max_bytes: max cache size in bytes, 0 for unlimited
+    :return: number of removed entries
+    """
+    if (max_bytes <= 0) or (not Path(cache_dir).is_dir()):
+        return 0
+
+    entries = []
+    for entry_path in Path(cache_dir).iterdir():
+        if (not entry_path.is_dir()) or entry_path.name.startswith(CACHE_TMP_DIR_PREFIX):
+            continue
+        try:
+            entries.append((entry_path.stat().st_mtime, get_cache_entry_size(entry_path), entry_path))
+        except OSError:
+            continue
+
+    total_bytes = sum([entry[1] for entry in entries])
+
+    num_removed = 0
+    for mtime, size, entry_path in sorted(entries):
+        if total_bytes <= max_bytes:
+            break
+
+        shutil.rmtree(entry_path, ignore_errors=True)
+        total_bytes -= size
+        num_removed += 1
+
+    if num_removed:
+        logging.info(str(num_removed) + ' least recently used entries are evicted from cache "' + str(cache_dir) + '"')
+
+    return num_removed
@@ -0,0 +1,196 @@
+import logging
+import heapq
+from pathlib import Path
+from dataclasses import dataclass, field
+import pandas as pd
+
+import GP_RawInputUtils as rawu
+import GP_StandardizeCheckpoint as chkp
+
+# =======================================
+# ============= CONSTANTS ===============
+# max number of processes, tracked by one summary; when exceeded, only the heaviest processes are kept
+PROCESS_SUMMARY_MAX_PROCESSES = 5000
+
+# indexes of the running stats of one (process, metric)
+SUMMARY_SAMPLES_IDX = 0
+SUMMARY_SUM_IDX = 1
+SUMMARY_MAX_IDX = 2
+# =======================================
+
+
+# =======================================
+# ============= STD TYPES ===============
+@dataclass()
+class ProcessSummary:
+    """
+    online aggregation of process metrics: process name -> metric name -> [samples, sum, max]
+    """
+    stats: dict = field(default_factory=dict)
+    max_processes: int = PROCESS_SUMMARY_MAX_PROCESSES
+    # number of tracked processes, above which the summary is pruned, 0 for twice max_processes
+    prune_size: int = 0
+
+
+# =======================================
+
+
+def add_processes_to_summary(summary: ProcessSummary, prc_rows):
+    """
+    adds metrics of processes of one timestamp to the running stats
+    :param summary: ProcessSummary structure
+    :param prc_rows: list of tuples (process name, pid, metric name, value)
+    :return: None
+    """
+    for prc_name, prc_pid, metric_name, value in prc_rows:
+        prc_stats = summary.stats.get(prc_name)
+        if prc_stats is None:
+            prc_stats = summary.stats[prc_name] = {}
+
+        metric_stats = prc_stats.get(metric_name)
+        if metric_stats is None:
+            prc_stats[metric_name] = [1, value, value]
+        else:
+            metric_stats[SUMMARY_SAMPLES_IDX] += 1
+            metric_stats[SUMMARY_SUM_IDX] += value
+            if value > metric_stats[SUMMARY_MAX_IDX]:
+                metric_stats[SUMMARY_MAX_IDX] = value
+
+    # pruning is amortized: the summary may grow twice above its size after the last pruning before it's pruned again
+    if len(summary.stats) > (summary.prune_size or 2 * summary.max_processes):
+        prune_process_summary(summary)
+
+
+def prune_process_summary(summary: ProcessSummary):
+    """
+    keeps in the summary only processes, which are among max_processes heaviest ones by sum of any metric;
+    light processes, dropped here and seen again later, restart their stats from zero;
+    the union of per-metric heaviest processes could be up to max_processes per metric,
+    so the next pruning is done only when the summary grows twice above the kept size
+    :param summary: ProcessSummary structure
+    :return: number of dropped processes
+    """
+    metric_names = set()
+    for prc_stats in summary.stats.values():
+        metric_names.update(prc_stats.keys())
+
+    kept_names = set()
+    for metric_name in metric_names:
+        heaviest = heapq.nlargest(summary.max_processes, summary.stats.items(),
+                                  key=lambda item: item[1].get(metric_name, (0, 0, 0))[SUMMARY_SUM_IDX])
+        kept_names.update([prc_name for prc_name, prc_stats in heaviest])
+
+    num_dropped = len(summary.stats) - len(kept_names)
+    summary.stats = {prc_name: summary.stats[prc_name] for prc_name in kept_names}
+    summary.prune_size = 2 * max(len(kept_names), summary.max_processes)
+
+    logging.debug(str(num_dropped) + ' light processes are dropped from process summary')
+
+    return num_dropped
+
+
+def get_process_summary_df(summary: ProcessSummary, pc_name) -> pd.DataFrame:
+    """
+    converts running stats to Dataframe, which could be merged with summaries of other files
+    :param summary: ProcessSummary structure
+    :param pc_name: name of PC
+    :return: Dataframe with PROCESSES_SUMMARY_STATS_COLUMN_NAMES columns
+    """
+    rows = [(pc_name, prc_name, metric_name,
+             metric_stats[SUMMARY_SAMPLES_IDX], metric_stats[SUMMARY_SUM_IDX], metric_stats[SUMMARY_MAX_IDX])
+            for prc_name, prc_stats in summary.stats.items()
+            for metric_name, metric_stats in prc_stats.items()]
+
+    return pd.DataFrame(rows, columns=rawu.PROCESSES_SUMMARY_STATS_COLUMN_NAMES)
+
+
+def merge_process_summary_dfs(summary_dfs) -> pd.DataFrame:
+    """
+    merges summaries of many files: samples and sums are added, maxima are taken
+    :param summary_dfs: list of Dataframes, created by get_process_summary_df
+    :return: merged Dataframe with the same columns
+    """
+    summary_df = pd.concat(summary_dfs, ignore_index=True)
+
+    group_columns = [rawu.RAW_PC_NAME_COLUMN_NAME, rawu.PROCESS_NAME_COLUMN_NAME, rawu.METRIC_COLUMN_NAME]
+    merged_df = summary_df.groupby(group_columns, sort=False, as_index=False).agg(
+        {rawu.SAMPLES_COLUMN_NAME: 'sum', rawu.SUM_COLUMN_NAME: 'sum', rawu.MAX_COLUMN_NAME: 'max'})
+
+    return merged_df[rawu.PROCESSES_SUMMARY_STATS_COLUMN_NAMES]
+
+
+def get_top_processes_df(summary_df: pd.DataFrame, top_n) -> pd.DataFrame:
+    """
+    ranks processes by sum of every metric, and keeps top_n processes per metric
+    :param summary_df: Dataframe, created by get_process_summary_df or merge_process_summary_dfs
+    :param top_n: number of processes to keep per metric
+    :return: Dataframe with PROCESSES_TOP_COLUMN_NAMES columns, sorted by metric and rank
+    """
+    top_df = summary_df.copy()
+    top_df[rawu.MEAN_COLUMN_NAME] = top_df[rawu.SUM_COLUMN_NAME] / top_df[rawu.SAMPLES_COLUMN_NAME]
+    top_df[rawu.RANK_COLUMN_NAME] = top_df.groupby(rawu.METRIC_COLUMN_NAME)[rawu.SUM_COLUMN_NAME].rank(
+        method='first', ascending=False).astype('int64')
+
+    top_df = top_df[top_df[rawu.RANK_COLUMN_NAME] <= top_n]
+    top_df = top_df.sort_values([rawu.METRIC_COLUMN_NAME, rawu.RANK_COLUMN_NAME], kind='mergesort')
+
+    return top_df[rawu.PROCESSES_TOP_COLUMN_NAMES].reset_index(drop=True)
+
+
+def get_std_pc_top_processes_name(pc_name, start_datetime, end_datetime, out_dir, options: rawu.StdOptions = None):
+    """
+    creates standardized filename of per-PC top processes, which is not used by other files of the run
+    and by files of previous runs in out_dir
+    :param pc_name: name of PC
+    :param start_datetime: start datetime of all Script2 files of the PC
+    :param end_datetime: end datetime of all Script2 files of the PC
+    :param out_dir: directory to store the file
+    :param options: StdOptions structure of the run, None for runs without checkpoints
+    :return: filename
+    """
+    # the file of PC has no raw file, so its claims are owned by the PC in out_dir, the same for resumed runs
+    claim_func = None if options is None else chkp.get_std_filename_claimer(options, Path(out_dir) / pc_name, out_dir,
+                                                                             keep_existing=True)
+    taken_names = rawu.get_dir_filenames(out_dir) if claim_func is None else None
+
+    return rawu.get_std_raw_filenames([(pc_name, start_datetime, end_datetime,
+                                        rawu.RAW_SCRIPT2_PROCESSES_TOP_ALL_FILENAME_SUFFIX)],
+                                      taken_names, claim_func)[0]
+
+
+def store_pc_process_summaries(reports, top_n, options: rawu.StdOptions = None):
+    """
+    merges process summaries of all standardized files of every PC and stores per-PC top processes,
+    next to the per-file top processes files;
+    per-PC files never replace files of previous runs, they get a collision index in their names instead
+    :param reports: list of StdFileReport structures
+    :param top_n: number of processes to keep per metric
+    :param options: StdOptions structure of the run, its names are claimed in its checkpoints;
+                    None for runs without checkpoints
+    :return: list of stored filenames
+    """
+    # PC name -> list of tuples (std filename parts of per-file top, its full name, summary Dataframe)
+    summaries_by_pc = {}
+    for report in reports:
+        if report.process_summary is None:
+            continue
+
+        for out_file in report.out_files:
+            std_parts = rawu.get_std_filename_parts(out_file)
+            if (std_parts is not None) and (std_parts.Suffix == rawu.RAW_SCRIPT2_PROCESSES_TOP_FILENAME_SUFFIX):
+                summaries_by_pc.setdefault(std_parts.PC_name, []).append((std_parts, out_file,
+                                                                          report.process_summary))
+
+    stored_list = []
+    for pc_name, summaries in sorted(summaries_by_pc.items()):
+        top_df = get_top_processes_df(merge_process_summary_dfs([summary_df for std_parts, out_file, summary_df
+                                                                 in summaries]), top_n)
+
+        out_dir = Path(summaries[0][1]).parent
+        datetimes = [rawu.get_std_filename_datetimes(std_parts) for std_parts, out_file, summary_df in summaries]
+        std_name = get_std_pc_top_processes_name(pc_name, min([start for start, end in datetimes]),
+                                                 max([end for start, end in datetimes]), out_dir, options)
+        stored_list.append(rawu.store_std_df(top_df, out_dir, std_name,
+                                             'Script2 top processes of PC "' + pc_name + '"'))
+
+    return stored_list
@@ -1,10 +1,25 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pathlib import Path
 import re
+import io
+import gzip
+import bz2
+import lzma
+import json
+import hashlib
 import datetime as dt
+import time
+from contextlib import contextmanager
 import pandas as pd
 import logging
 
+import GP_StandardizeDefaults as dflt
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 # =======================================
 # ============= CONSTANTS ===============
 
@@ -15,7 +30,8 @@ RAW_FILENAME_TIME_DELIM = '-'
 
 RAW_IPG_FILENAME_SUFFIX = 'IPG'
 RAW_SCRIPT2_FILENAME_SUFFIX = 'Script2'
-RAW_FILENAME_SUFFIXES_LIST = RAW_IPG_FILENAME_SUFFIX + '|' + RAW_SCRIPT2_FILENAME_SUFFIX
+# suffixes of all known raw sources, extended by registration of new raw sources
+RAW_FILENAME_SUFFIXES = [RAW_IPG_FILENAME_SUFFIX, RAW_SCRIPT2_FILENAME_SUFFIX]
 
 RAW_REALMEAS_FILENAME_SUFFIX = 'RM'
 RAW_CUMMEAS_FILENAME_SUFFIX = 'CUM'
@@ -23,6 +39,55 @@ RAW_CUMMEAS_FILENAME_SUFFIX = 'CUM'
 RAW_IPG_REALMEAS_FILENAME_SUFFIX = RAW_IPG_FILENAME_SUFFIX + RAW_FILENAME_DELIM + RAW_REALMEAS_FILENAME_SUFFIX
 RAW_SCRIPT2_REALMEAS_FILENAME_SUFFIX = RAW_SCRIPT2_FILENAME_SUFFIX + RAW_FILENAME_DELIM + RAW_REALMEAS_FILENAME_SUFFIX
 RAW_IPG_CUMMEAS_FILENAME_SUFFIX = RAW_IPG_FILENAME_SUFFIX + RAW_FILENAME_DELIM + RAW_CUMMEAS_FILENAME_SUFFIX
+
+RAW_ENERGY_FILENAME_SUFFIX = 'ENERGY'
+RAW_IPG_ENERGY_FILENAME_SUFFIX = RAW_IPG_FILENAME_SUFFIX + RAW_FILENAME_DELIM + RAW_ENERGY_FILENAME_SUFFIX
+
+RAW_ALL_FILES_FILENAME_SUFFIX = 'ALL'
+RAW_MULTI_PC_NAME = 'MULTI_PC'
+RAW_IPG_CUMMEAS_ALL_FILENAME_SUFFIX = RAW_IPG_CUMMEAS_FILENAME_SUFFIX + RAW_FILENAME_DELIM \
+                                      + RAW_ALL_FILES_FILENAME_SUFFIX
+
+RAW_JOIN_FILENAME_SUFFIX = 'JOIN'
+RAW_IPG_SCRIPT2_JOIN_FILENAME_SUFFIX = RAW_IPG_FILENAME_SUFFIX + '_' + RAW_SCRIPT2_FILENAME_SUFFIX \
+                                       + RAW_FILENAME_DELIM + RAW_JOIN_FILENAME_SUFFIX
+
+STD_FILENAME_DATE_FORMAT = '%Y-%m-%d'
+STD_FILENAME_TIME_FORMAT = '%H' + RAW_FILENAME_TIME_DELIM + '%M' + RAW_FILENAME_TIME_DELIM + '%S'
+STD_FILENAME_DATETIME_FORMAT = STD_FILENAME_DATE_FORMAT + RAW_FILENAME_DELIM + STD_FILENAME_TIME_FORMAT
+STD_FILENAME_EXT = 'csv'
+# index of the output, which would get already used standardized filename, e.g. PC1__..__IPG__RM~1.csv
+STD_FILENAME_COLLISION_DELIM = '~'
+# standardized times in filenames are truncated to seconds
+STD_FILENAME_TIME_RESOLUTION = dt.timedelta(seconds=1)
+# ---------------------------------------
+
+# ---------------------------------------
+# ------ Compressed files constants -----
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_BZ2 = 'bz2'
+COMPRESSION_XZ = 'xz'
+COMPRESSION_ZSTD = 'zstd'
+
+COMPRESSED_FILE_SUFFIXES = {'.gz': COMPRESSION_GZIP, '.bz2': COMPRESSION_BZ2, '.xz': COMPRESSION_XZ,
+                            '.zst': COMPRESSION_ZSTD}
+COMPRESSION_MAGIC_BYTES = {b'\x1f\x8b': COMPRESSION_GZIP, b'BZh': COMPRESSION_BZ2, b'\xfd7zXZ\x00': COMPRESSION_XZ,
+                           b'\x28\xb5\x2f\xfd': COMPRESSION_ZSTD}
+COMPRESSION_MAGIC_BYTES_MAX_LEN = 6
+# size of compressed raw files is not known without decompression, so it's estimated by typical ratio of text files
+COMPRESSION_RATIO_ESTIMATE = 10
+
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+JSON_READ_CHUNK_SIZE = 1024 * 1024
+HASH_READ_CHUNK_SIZE = 1024 * 1024
+
+STAGE_CACHE_LOAD = 'cache_load'
+STAGE_READ = 'read'
+STAGE_VALIDATE = 'validate'
+STAGE_TRANSFORM = 'transform'
+STAGE_STORE = 'store'
+STAGE_CHUNKED = 'chunked'
 # ---------------------------------------
 
 # ---------------------------------------
@@ -70,8 +135,43 @@ PROCESS_COLUMN_PREFIX = 'Process'
 PROCESS_NAME_COLUMN_NAME = PROCESS_COLUMN_PREFIX + COLUMN_NAME_DELIM + 'Name'
 PROCESS_PID_COLUMN_NAME = PROCESS_COLUMN_PREFIX + COLUMN_NAME_DELIM + 'Pid'
 PROCESS_PID_COLUMN_NAME = PROCESS_COLUMN_PREFIX + COLUMN_NAME_DELIM + 'Pid'
+PROCESS_NAME_CODE_COLUMN_NAME = PROCESS_NAME_COLUMN_NAME + COLUMN_NAME_DELIM + 'Code'
+
+METRIC_COLUMN_NAME = 'Metric'
+METRIC_VALUE_COLUMN_NAME = 'Value'
+
+PROCESSES_NAMES_COLUMN_NAMES = [PROCESS_NAME_CODE_COLUMN_NAME, PROCESS_NAME_COLUMN_NAME]
+
+SAMPLES_COLUMN_NAME = 'Samples'
+SUM_COLUMN_NAME = 'Sum'
+MEAN_COLUMN_NAME = 'Mean'
+MAX_COLUMN_NAME = 'Max'
+RANK_COLUMN_NAME = 'Rank'
 
 OVERALL_SYSTEM_PROCESS_NAME = 'SYS_Overall'
+RAW_SCRIPT2_SYS_FILENAME_SUFFIX = OVERALL_SYSTEM_PROCESS_NAME.upper() + RAW_FILENAME_DELIM \
+                                  + RAW_SCRIPT2_REALMEAS_FILENAME_SUFFIX
+
+PROCESSES_FILENAME_PREFIX = 'PROCESSES'
+RAW_LONG_FILENAME_SUFFIX = 'LONG'
+RAW_NAMES_FILENAME_SUFFIX = 'NAMES'
+RAW_SCRIPT2_PROCESSES_LONG_FILENAME_SUFFIX = PROCESSES_FILENAME_PREFIX + RAW_FILENAME_DELIM \
+                                             + RAW_SCRIPT2_FILENAME_SUFFIX + RAW_FILENAME_DELIM \
+                                             + RAW_LONG_FILENAME_SUFFIX
+RAW_SCRIPT2_PROCESSES_NAMES_FILENAME_SUFFIX = PROCESSES_FILENAME_PREFIX + RAW_FILENAME_DELIM \
+                                              + RAW_SCRIPT2_FILENAME_SUFFIX + RAW_FILENAME_DELIM \
+                                              + RAW_NAMES_FILENAME_SUFFIX
+RAW_TOP_FILENAME_SUFFIX = 'TOP'
+RAW_SCRIPT2_PROCESSES_TOP_FILENAME_SUFFIX = PROCESSES_FILENAME_PREFIX + RAW_FILENAME_DELIM \
+                                            + RAW_SCRIPT2_FILENAME_SUFFIX + RAW_FILENAME_DELIM + RAW_TOP_FILENAME_SUFFIX
+RAW_SCRIPT2_PROCESSES_TOP_ALL_FILENAME_SUFFIX = RAW_SCRIPT2_PROCESSES_TOP_FILENAME_SUFFIX + RAW_FILENAME_DELIM \
+                                                + RAW_ALL_FILES_FILENAME_SUFFIX
+
+# standardized files, whose rows could be merged across files of the same PC, e.g. by compaction;
+# per-file dictionaries (e.g. process names codes) and rankings could not be merged this way
+STD_COMPACTABLE_FILENAME_SUFFIXES = [RAW_IPG_REALMEAS_FILENAME_SUFFIX, RAW_IPG_CUMMEAS_FILENAME_SUFFIX,
+                                     RAW_IPG_ENERGY_FILENAME_SUFFIX, RAW_SCRIPT2_SYS_FILENAME_SUFFIX,
+                                     RAW_IPG_SCRIPT2_JOIN_FILENAME_SUFFIX]
 
 
 OVERAL_CPU_LOAD_COLUMN_NAME = OVERALL_COLUMN_NAME_SPECIFICATOR + COLUMN_NAME_DELIM + \
@@ -79,6 +179,14 @@ OVERAL_CPU_LOAD_COLUMN_NAME = OVERALL_COLUMN_NAME_SPECIFICATOR + COLUMN_NAME_DEL
 
 
 RAW_START_DATETIME_COLUMN_NAME = RAW_START_COLUMN_NAME_PREFIX + COLUMN_NAME_DELIM + RAW_DATETIME_COLUMN_NAME
+
+PROCESSES_LONG_COLUMN_NAMES = [RAW_START_DATETIME_COLUMN_NAME, PROCESS_NAME_CODE_COLUMN_NAME, PROCESS_PID_COLUMN_NAME,
+                               METRIC_COLUMN_NAME, METRIC_VALUE_COLUMN_NAME]
+PROCESSES_SUMMARY_STATS_COLUMN_NAMES = [RAW_PC_NAME_COLUMN_NAME, PROCESS_NAME_COLUMN_NAME, METRIC_COLUMN_NAME,
+                                        SAMPLES_COLUMN_NAME, SUM_COLUMN_NAME, MAX_COLUMN_NAME]
+PROCESSES_TOP_COLUMN_NAMES = [RAW_PC_NAME_COLUMN_NAME, METRIC_COLUMN_NAME, RANK_COLUMN_NAME, PROCESS_NAME_COLUMN_NAME,
+                              SAMPLES_COLUMN_NAME, SUM_COLUMN_NAME, MEAN_COLUMN_NAME, MAX_COLUMN_NAME]
+
 RAW_START_DATE_COLUMN_NAME = RAW_START_COLUMN_NAME_PREFIX + COLUMN_NAME_DELIM + RAW_DATE_COLUMN_NAME
 RAW_START_TIME_COLUMN_NAME = RAW_START_COLUMN_NAME_PREFIX + COLUMN_NAME_DELIM + RAW_TIME_COLUMN_NAME
 
@@ -90,6 +198,12 @@ TIMESTAMPS_COLUMN_NAMES_RM = [RAW_START_DATETIME_COLUMN_NAME, RAW_START_DATE_COL
 
 TIMESTAMPS_COLUMN_NAMES_CUM = [RAW_START_DATETIME_COLUMN_NAME, RAW_START_DATE_COLUMN_NAME, RAW_START_TIME_COLUMN_NAME,
                                RAW_END_DATETIME_COLUMN_NAME, RAW_END_DATE_COLUMN_NAME, RAW_END_TIME_COLUMN_NAME]
+
+# memory-efficient schema of standardized tables: string columns with few distinct values are categories,
+# numeric columns are downcast, see downcast_std_df
+STD_CATEGORY_COLUMN_NAMES = [RAW_PC_NAME_COLUMN_NAME, CPU_TYPE_COLUMN_NAME, CPU_DETAILS_COLUMN_NAME,
+                             PROCESS_NAME_COLUMN_NAME]
+STD_DOWNCAST_FLOAT_DTYPE = 'float32'
 # ---------------------------------------
 
 # ---------------------------------------
@@ -98,6 +212,10 @@ PANDAS_TIME_DELIM = ':'
 
 GP_DELIM_BETWEEN_DATE_AND_TIME = ' '
 
+# format of datetimes, stored to standardized Script2 files
+STD_SCRIPT2_DATETIME_FORMAT = '%Y-%m-%d' + GP_DELIM_BETWEEN_DATE_AND_TIME + '%H' + PANDAS_TIME_DELIM + '%M' \
+                              + PANDAS_TIME_DELIM + '%S' + PANDAS_TIME_DELIM + '%f'
+
 
 # ---------------------------------------
 
@@ -114,6 +232,64 @@ class RawInputFilenameParts:
     FileExt: str = ''
 
 
+@dataclass()
+class StdFilenameParts:
+    PC_name: str = ''
+    StartDate: str = ''
+    StartTime: str = ''
+    EndDate: str = ''
+    EndTime: str = ''
+    Suffix: str = ''
+    FileExt: str = ''
+    # collision index, empty if the name is not a result of collision
+    CollisionIdx: str = ''
+
+
+@dataclass()
+class StdOptions:
+    quarantine_dir: str = ''
+    cache_dir: str = ''
+    cache_max_bytes: int = 0
+    store_processes: bool = True
+    top_processes: int = dflt.DEF_TOP_PROCESSES
+    ipg_energy: bool = False
+    energy_window_sec: float = dflt.DEF_ENERGY_WINDOW_SEC
+    chunk_rows: int = 0
+    chunk_min_bytes: int = 0
+    metrics_file: str = ''
+    metrics_interval_sec: float = dflt.DEF_METRICS_INTERVAL_SEC
+    checkpoint_dir: str = ''
+    resume: bool = False
+    # max total estimated memory of raw files, standardized in parallel, 0 for no limit
+    memory_budget: int = 0
+    # time window [time_from, time_to) of measurements to standardize, None for no limit
+    time_from: dt.datetime = None
+    time_to: dt.datetime = None
+
+
+@dataclass()
+class StdFileReport:
+    full_filename: str = ''
+    records_total: int = 0
+    records_bad: int = 0
+    is_quarantined: bool = False
+    error: str = ''
+    out_files: list = field(default_factory=list)
+    process_summary: object = None
+    seconds: float = 0.0
+    stage_seconds: dict = field(default_factory=dict)
+
+
+@dataclass()
+class DatetimeAlignState:
+    """
+    state of dates alignment, carried between chunks of measurements:
+    current date and time of day (as timedelta since midnight) of the last aligned measurement
+    """
+    cur_date: dt.date = None
+    prev_time: pd.Timedelta = None
+
+
 @dataclass()
 class CumMeasTimestamps:
     startdate: str = ''
@@ -128,6 +304,192 @@ class CumMeasTimestamps:
 # =======================================
 # ======== Handling of filenames ========
 
+def get_raw_inner_file_path(full_filename):
+    """
+    gets path of the file inside of the compressed raw file, e.g. "x.csv" for "x.csv.gz"
+    :param full_filename:
+    :return: Path of inner file, the same path for not compressed files
+    """
+    filename_p = Path(full_filename)
+    if filename_p.suffix.lower() in COMPRESSED_FILE_SUFFIXES:
+        filename_p = filename_p.with_suffix('')
+
+    return filename_p
+
+
+def get_raw_file_compression(full_filename):
+    """
+    detects compression of the raw file by its suffix, or by magic bytes at its beginning
+    :param full_filename:
+    :return: one of COMPRESSION_* constants, None for not compressed file
+    """
+    compression = COMPRESSED_FILE_SUFFIXES.get(Path(full_filename).suffix.lower())
+
+    if compression is None:
+        with open(full_filename, 'rb') as raw_file:
+            magic_bytes = raw_file.read(COMPRESSION_MAGIC_BYTES_MAX_LEN)
+
+        for magic, magic_compression in COMPRESSION_MAGIC_BYTES.items():
+            if magic_bytes.startswith(magic):
+                compression = magic_compression
+                break
+
+    return compression
+
+
+def open_raw_file(full_filename, encoding=None):
+    """
+    opens raw file for text reading, compressed files are decompressed on the fly while reading
+    :param full_filename:
+    :param encoding: text encoding, None for the default one
+    :return: text stream
+    """
+    compression = get_raw_file_compression(full_filename)
+
+    if compression is None:
+        return open(full_filename, encoding=encoding)
+    elif compression == COMPRESSION_GZIP:
+        return gzip.open(full_filename, 'rt', encoding=encoding)
+    elif compression == COMPRESSION_BZ2:
+        return bz2.open(full_filename, 'rt', encoding=encoding)
+    elif compression == COMPRESSION_XZ:
+        return lzma.open(full_filename, 'rt', encoding=encoding)
+    else:
+        if zstandard is None:
+            raise ImportError('"' + str(full_filename) + '": zstandard package is required to read zstd files')
+
+        raw_stream = zstandard.ZstdDecompressor().stream_reader(open(full_filename, 'rb'), closefd=True)
+        return io.TextIOWrapper(raw_stream, encoding=encoding)
+
+
+def iter_json_object_items(json_file, chunk_size=JSON_READ_CHUNK_SIZE):
+    """
+    streams (key, value) items of the top-level json object from text stream,
+    without reading the whole stream to memory
+
+    :param json_file: text stream with json object
+    :param chunk_size: size of chunks to read from the stream
+    :return: generator of tuples (key, value)
+    """
+    decoder = json.JSONDecoder()
+    buf = ''
+    pos = 0
+    is_eof = False
+
+    def read_more():
+        nonlocal buf, pos, is_eof
+        chunk = json_file.read(chunk_size)
+        if not chunk:
+            is_eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    def skip_whitespaces():
+        nonlocal pos
+        while True:
+            while (pos < len(buf)) and buf[pos].isspace():
+                pos += 1
+            if (pos < len(buf)) or is_eof:
+                return
+            read_more()
+
+    def expect_char(char):
+        nonlocal pos
+        skip_whitespaces()
+        if (pos >= len(buf)) or (buf[pos] != char):
+            raise ValueError('Wrong json format: "' + char + '" expected')
+        pos += 1
+
+    def decode_value():
+        nonlocal pos
+        while True:
+            skip_whitespaces()
+            try:
+                value, end = decoder.raw_decode(buf, pos)
+                # value at the very end of the buffer could be truncated, e.g. number
+                if (end < len(buf)) or is_eof:
+                    pos = end
+                    return value
+            except json.JSONDecodeError:
+                if is_eof:
+                    raise
+            read_more()
+
+    expect_char('{')
+    skip_whitespaces()
+    if (pos < len(buf)) and (buf[pos] == '}'):
+        return
+
+    while True:
+        key = decode_value()
+        expect_char(':')
+        value = decode_value()
+        yield key, value
+
+        skip_whitespaces()
+        if (pos < len(buf)) and (buf[pos] == '}'):
+            return
+        expect_char(',')
+
+
+def parse_size_str(size_str):
+    """
+    converts human-readable size to bytes
+    :param size_str: string like "512", "200M" or "4G"
+    :return: size in bytes
+    """
+    size_str = str(size_str).strip().upper().rstrip('B')
+    if size_str and (size_str[-1] in SIZE_UNITS):
+        return int(float(size_str[:-1]) * SIZE_UNITS[size_str[-1]])
+
+    return int(size_str)
+
+
+def get_raw_file_uncompressed_size(full_filename, size):
+    """
+    :param full_filename: full name (including full path) of the raw file
+    :param size: size of the raw file in bytes
+    :return: size of the raw content in bytes, estimated for compressed file
+    """
+    if get_raw_file_compression(full_filename) is None:
+        return size
+
+    return size * COMPRESSION_RATIO_ESTIMATE
+
+
+def get_file_content_hash(full_filename, chunk_size=HASH_READ_CHUNK_SIZE):
+    """
+    calculates hash of the file content, reading the file by chunks
+    :param full_filename:
+    :param chunk_size: size of chunks to read from the file
+    :return: hex string with the hash
+    """
+    content_hash = hashlib.blake2b(digest_size=32)
+
+    with open(full_filename, 'rb') as hashed_file:
+        for chunk in iter(lambda: hashed_file.read(chunk_size), b''):
+            content_hash.update(chunk)
+
+    return content_hash.hexdigest()
+
+
+def add_raw_filename_suffix(suffix):
+    """
+    makes raw files with passed suffix recognizable by get_filename_parts
+    :param suffix: raw filename suffix, e.g. IPG
+    :return: None
+    """
+    if suffix not in RAW_FILENAME_SUFFIXES:
+        RAW_FILENAME_SUFFIXES.append(suffix)
+
+
+def get_raw_filename_suffixes_regex():
+    """
+    :return: regex alternation of all known raw filename suffixes
+    """
+    return '|'.join([re.escape(suffix) for suffix in RAW_FILENAME_SUFFIXES])
+
+
 def get_filename_parts(full_filename: str):
     """
     Function to parse filenames of the PG raw input files.
@@ -145,14 +507,16 @@ def get_filename_parts(full_filename: str):
     time_str = ''
     script_id_str = ''
 
-    filename_p = Path(full_filename)
+    # for compressed files, e.g. *.csv.gz, the inner file is parsed
+    filename_p = get_raw_inner_file_path(full_filename)
     file_ext_str = filename_p.suffix
 
     pure_filename = filename_p.stem
     logging.debug('Start analysis of filename ' + '"' + pure_filename + '"')
 
     # filename_regex = re.compile(r'(^(\w*))_(((\d\d\d\d)-(\d\d)-(\d\d))_((\d\d)-(\d\d)-(\d\d)(.*))_(IPG|Script2)$)')
-    regex_str = r'(^(\w*)(.*))__(((\d\d\d\d)-(\d\d)-(\d\d))_(.*))__' + '(((' + RAW_FILENAME_SUFFIXES_LIST + '))$)'
+    regex_str = r'(^(\w*)(.*))__(((\d\d\d\d)-(\d\d)-(\d\d))_(.*))__' + '(((' + get_raw_filename_suffixes_regex() \
+                + '))$)'
     filename_regex = re.compile(regex_str)
     filename_parts_re = filename_regex.search(pure_filename)
 
@@ -175,26 +539,142 @@ def get_filename_parts(full_filename: str):
     return filename_parts
 
 
-def get_std_raw_filename(PC_name, startdate, starttime, enddate, endtime, suffix, extension):
+def get_std_raw_filenames(outputs, taken_names=None, claim_func=None):
+    """
+    creates standardized filenames for a batch of outputs in one pass:
+    every distinct typed timestamp is formatted once (outputs of one raw file share their time range),
+    and names are made unique: the output getting already used name gets collision index in it,
+    see STD_FILENAME_COLLISION_DELIM
+    :param outputs: list of tuples (PC name, start datetime, end datetime, suffix),
+                    datetimes are datetime.datetime or pandas.Timestamp
+    :param taken_names: set of already used names (e.g. files of the output directory), None if there are no ones;
+                        created names are added to it
+    :param claim_func: function filename -> False if the name is already used by other raw file of the run,
+                       None to check only taken_names
+    :return: list of filenames in the order of outputs
+    """
+    datetime_strs = {}
+    for pc_name, start_datetime, end_datetime, suffix in outputs:
+        for datetime in (start_datetime, end_datetime):
+            if datetime not in datetime_strs:
+                datetime_strs[datetime] = datetime.strftime(STD_FILENAME_DATETIME_FORMAT)
+
+    stems = [str(pc_name) + RAW_FILENAME_DELIM + datetime_strs[start_datetime] + RAW_FILENAME_DELIM
+             + datetime_strs[end_datetime] + RAW_FILENAME_DELIM + suffix
+             for pc_name, start_datetime, end_datetime, suffix in outputs]
+
+    return get_unique_std_filenames(stems, taken_names, claim_func)
+
+
+def get_unique_std_filenames(stems, taken_names=None, claim_func=None):
     """
-    Creates standardized raw input filename from passed parts
-    :param PC_name:
-    :param startdate:
-    :param starttime:
-    :param enddate:
-    :param endtime:
-    :param suffix:
-    :param extension:
-    :return: constructed filename
+    makes standardized filenames unique by adding collision index to names, which are already used
+    :param stems: list of standardized filenames without extension
+    :param taken_names: set of already used names, None if there are no ones; created names are added to it
+    :param claim_func: function filename -> False if the name is already used by other raw file of the run,
+                       None to check only taken_names
+    :return: list of filenames in the order of stems
     """
-    filename = str(PC_name) + RAW_FILENAME_DELIM \
-               + str(startdate) + RAW_FILENAME_DELIM \
-               + str(starttime) + RAW_FILENAME_DELIM \
-               + str(enddate) + RAW_FILENAME_DELIM \
-               + str(endtime) + RAW_FILENAME_DELIM \
-               + suffix + '.' + extension
+    if taken_names is None:
+        taken_names = set()
+
+    filenames = []
+    for stem in stems:
+        filename = stem + '.' + STD_FILENAME_EXT
+        collision_idx = 0
+        while (filename in taken_names) or ((claim_func is not None) and not claim_func(filename)):
+            collision_idx += 1
+            filename = stem + STD_FILENAME_COLLISION_DELIM + str(collision_idx) + '.' + STD_FILENAME_EXT
 
-    return filename
+        if collision_idx:
+            logging.warning('Standardized filename "' + stem + '.' + STD_FILENAME_EXT + '" is already used, "'
+                            + filename + '" is used instead')
+
+        taken_names.add(filename)
+        filenames.append(filename)
+
+    return filenames
+
+
+def get_dir_filenames(dir_name):
+    """
+    :param dir_name: directory
+    :return: set of names of files in the directory, empty if there is no such directory
+    """
+    dir_p = Path(dir_name)
+    if not dir_p.is_dir():
+        return set()
+
+    return {file.name for file in dir_p.iterdir() if file.is_file()}
+
+
+@contextmanager
+def timed_stage(report: StdFileReport, stage_name):
+    """
+    measures duration of one stage of the raw file standardization, e.g.:
+        with timed_stage(report, STAGE_READ):
+            ...
+    :param report: StdFileReport structure to add the duration to
+    :param stage_name: name of the stage
+    :return: context manager
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        report.stage_seconds[stage_name] = report.stage_seconds.get(stage_name, 0.0) \
+                                           + time.perf_counter() - start_time
+
+
+def get_std_filename_parts(full_filename):
+    """
+    Parses standardized raw filename, created by get_std_raw_filenames
+    :param full_filename:
+    :return: StdFilenameParts structure, or None if the name is not in the standardized format
+    """
+    filename_p = Path(full_filename)
+    name_parts = filename_p.stem.split(RAW_FILENAME_DELIM, 5)
+
+    if len(name_parts) < 6:
+        logging.debug('"' + filename_p.name + '" is not a standardized raw filename')
+        return None
+
+    suffix, collision_delim, collision_idx = name_parts[5].partition(STD_FILENAME_COLLISION_DELIM)
+
+    return StdFilenameParts(PC_name=name_parts[0], StartDate=name_parts[1], StartTime=name_parts[2],
+                            EndDate=name_parts[3], EndTime=name_parts[4], Suffix=suffix,
+                            FileExt=filename_p.suffix, CollisionIdx=collision_idx)
+
+
+def get_std_filename_datetimes(std_parts):
+    """
+    gets start/end datetimes, encoded in the standardized raw filename
+    :param std_parts: StdFilenameParts structure
+    :return: tuple (start datetime, end datetime)
+    """
+    start_datetime = dt.datetime.strptime(std_parts.StartDate + std_parts.StartTime,
+                                          STD_FILENAME_DATE_FORMAT + STD_FILENAME_TIME_FORMAT)
+    end_datetime = dt.datetime.strptime(std_parts.EndDate + std_parts.EndTime,
+                                        STD_FILENAME_DATE_FORMAT + STD_FILENAME_TIME_FORMAT)
+
+    return start_datetime, end_datetime
+
+
+def store_std_df(df, out_dir, std_name, description):
+    """
+    stores standardized Dataframe to out dir
+    :param df: standardized Dataframe
+    :param out_dir: full path to the directory to store resulting file
+    :param std_name: standardized filename
+    :param description: human-readable description of the stored content, used for logging
+    :return: full name of the stored file
+    """
+    out_fullname = Path(out_dir) / std_name
+
+    logging.info('Standardized ' + description + ' is stored to "' + str(out_fullname) + '"')
+    df.to_csv(out_fullname, index=False)
+
+    return str(out_fullname)
 
 
 # =======================================
@@ -208,19 +688,58 @@ def get_cpu_load_per_core_column_name(core) -> str:
            + CORE_COLUMN_NAME_SUFFIX + COLUMN_NAME_DELIM + str(core)
 
 
-def convert_df_time_to_str(df_time_str):
+def get_start_align_state(first_meas_time, filename_parts):
     """
-    coverts time in pandas.Dataframe format to string, which will be used in filenames
-    :param df_time_str:
-    :return: converted string
+    calculates date of the first measurement, depends on passed filename parts
+
+    :param first_meas_time: time of the first measurement
+    :param filename_parts: parsed RawInputFilenameParts structure
+    :return: DatetimeAlignState structure to align the first chunk of measurements
     """
-    time_str = str(df_time_str)
-    # get HH MM SS from HH:MM:SS:MSEC string
-    time_list = time_str.split(PANDAS_TIME_DELIM)[:3]
+    # get datetime info stored in the filename
+    start_date = dt.date.fromisoformat(filename_parts.Date)
+    start_time = dt.datetime.strptime(filename_parts.Time, "%H-%M-%S").time()
+    logging.debug('Recognized start date from filename: ' + str(start_date))
+    logging.debug('Recognized start time from filename: ' + str(start_time))
+    logging.debug('Recognized start time from the table: ' + str(first_meas_time))
 
-    time_str = str(RAW_FILENAME_TIME_DELIM).join(time_list)
+    # calculate date of the first measurement:
+    #   - the same day as in start_date if start_time stored in filename is smaller than the first time in the table
+    #   - start_date + 1 day otherwise, as measurement seem to be started already on the next day
+    if (first_meas_time < start_time):
+        start_date = start_date + dt.timedelta(days=1)
+        logging.debug('As start time from the table is smaller than in the filename, startdate was increased tó: '
+                      + str(start_date))
+
+    return DatetimeAlignState(cur_date=start_date)
 
-    return time_str
+
+def align_datetime_chunk(orig_df, state):
+    """
+    calculates correct dates for the next chunk of measurements, considering possible day wraparound:
+    the date is increased every time, when time of a measurement is smaller than time of the previous one
+
+    :param orig_df: datetime Serie with inaligned dates
+    :param state: DatetimeAlignState structure, updated for the next chunk
+    :return: aligned Serie
+    """
+    day_times = orig_df - orig_df.dt.normalize()
+
+    prev_day_times = day_times.shift(1)
+    if state.prev_time is not None:
+        prev_day_times.iloc[0] = state.prev_time
+
+    day_wraps = (day_times < prev_day_times).cumsum()
+    if day_wraps.iloc[-1]:
+        logging.debug(str(day_wraps.iloc[-1]) + ' day wraparounds found after ' + str(state.cur_date))
+
+    aligned_df = pd.Timestamp(state.cur_date) + pd.to_timedelta(day_wraps, unit='D') + day_times
+    aligned_df.name = orig_df.name
+
+    state.cur_date = state.cur_date + dt.timedelta(days=int(day_wraps.iloc[-1]))
+    state.prev_time = day_times.iloc[-1]
+
+    return aligned_df
 
 
 def get_aligned_datetime_serie(orig_df, filename_parts):
@@ -233,44 +752,64 @@ def get_aligned_datetime_serie(orig_df, filename_parts):
     """
     logging.debug('start datetime alignment')
 
-    # times_df[0] = times_df[0].replace(2000)
-    aligned_df = orig_df
+    state = get_start_align_state(orig_df.iloc[0].time(), filename_parts)
 
-    # get datetime info stored in the filename
-    start_date = dt.date.fromisoformat(filename_parts.Date)
-    start_time = dt.datetime.strptime(filename_parts.Time, "%H-%M-%S").time()
-    logging.debug('Recognized start date from filename: ' + str(start_date))
-    logging.debug('Recognized start time from filename: ' + str(start_time))
+    return align_datetime_chunk(orig_df, state)
 
-    # calculate date of the first measurement:
-    #   - the same day as in start_date if start_time stored in filename is smaller than the first time in the table
-    #   - start_date + 1 day otherwise, as measurement seem to be started already on the next day
-    first_meas_time = aligned_df[0].time()
 
-    logging.debug('Recognized start time from the table: ' + str(first_meas_time))
+def is_time_window_set(options: StdOptions):
+    """
+    :param options: StdOptions structure
+    :return: True if only measurements within the time window must be standardized
+    """
+    return (options.time_from is not None) or (options.time_to is not None)
 
-    if (first_meas_time < start_time):
-        start_date = start_date + dt.timedelta(days=1)
-        logging.debug('As start time from the table is smaller than in the filename, startdate was increased tó: '
-                      + str(start_date))
 
-    # set aligned date to the 1st element
-    aligned_df[0] = aligned_df[0].replace(start_date.year, start_date.month, start_date.day)
+def is_in_time_window(datetime, options: StdOptions):
+    """
+    :param datetime: datetime of the measurement, without timezone
+    :param options: StdOptions structure
+    :return: True if the measurement is within the time window [options.time_from, options.time_to)
+    """
+    return ((options.time_from is None) or (datetime >= options.time_from)) \
+        and ((options.time_to is None) or (datetime < options.time_to))
 
-    # set aligned dates for all other element, considering possible day wraparound
-    cur_date = start_date
-    for i in range(1, len(aligned_df)):
-        cur_time = aligned_df[i].time()
-        prev_time = aligned_df[i - 1].time()
 
-        if (cur_time < prev_time):
-            cur_date = cur_date + dt.timedelta(days=1)
-            logging.debug(f'As df[{i}].time {cur_time} is smaller than df[{i - 1}].time {prev_time}, cur date was '
-                          f'increased to: {cur_date}')
+def get_time_window_slice(datetimes_serie, options: StdOptions):
+    """
+    finds measurements within the time window by binary search
+    :param datetimes_serie: aligned (so monotonic) datetime Serie of measurements
+    :param options: StdOptions structure
+    :return: tuple (start index, end index) of the measurements within [options.time_from, options.time_to)
+    """
+    start_idx = 0 if options.time_from is None \
+        else int(datetimes_serie.searchsorted(pd.Timestamp(options.time_from), side='left'))
+    end_idx = len(datetimes_serie) if options.time_to is None \
+        else int(datetimes_serie.searchsorted(pd.Timestamp(options.time_to), side='left'))
 
-        aligned_df[i] = aligned_df[i].replace(cur_date.year, cur_date.month, cur_date.day)
+    return start_idx, max(start_idx, end_idx)
 
-    return aligned_df
+
+def downcast_std_df(df):
+    """
+    converts columns of standardized Dataframe to the memory-efficient schema without any change of values:
+    integers to the smallest integer type, floats to float32 if all values are exactly representable in it,
+    and columns of STD_CATEGORY_COLUMN_NAMES to categories
+    :param df: standardized Dataframe, converted in place
+    :return: df
+    """
+    for column in df.columns:
+        serie = df[column]
+        if column in STD_CATEGORY_COLUMN_NAMES:
+            df[column] = serie.astype('category')
+        elif pd.api.types.is_integer_dtype(serie.dtype):
+            df[column] = pd.to_numeric(serie, downcast='integer')
+        elif pd.api.types.is_float_dtype(serie.dtype) and (serie.dtype != STD_DOWNCAST_FLOAT_DTYPE):
+            downcast_serie = serie.astype(STD_DOWNCAST_FLOAT_DTYPE)
+            if ((downcast_serie == serie) | serie.isna()).all():
+                df[column] = downcast_serie
+
+    return df
 
 
 def get_pc_name_serie(pc_name, serie_size):
@@ -296,11 +835,11 @@ def create_empty_cumulative_times_df():
     return empty_df
 
 
-def get_cumulative_times_df(timestamps):
+def get_cumulative_times_dict(timestamps):
     """
-    creates Dataframe with begin/end timestamps
+    creates dict with begin/end timestamps, keyed by the cumulative timestamps column names
     :param timestamps: MeasTimestamps structure with timestamps
-    :return: created Dataframe
+    :return: created dict
     """
     start_date = str(timestamps.startdate)
     start_time = str(timestamps.starttime)
@@ -310,7 +849,16 @@ def get_cumulative_times_df(timestamps):
     end_time = str(timestamps.endtime)
     end_datetime = get_date_time_str(end_date, end_time)
 
-    times_df = pd.DataFrame(columns=TIMESTAMPS_COLUMN_NAMES_CUM)
-    times_df.loc[0] = [start_datetime, start_date, start_time, end_datetime, end_date, end_time]
+    return dict(zip(TIMESTAMPS_COLUMN_NAMES_CUM,
+                    [start_datetime, start_date, start_time, end_datetime, end_date, end_time]))
+
+
+def get_cumulative_times_df(timestamps):
+    """
+    creates Dataframe with begin/end timestamps
+    :param timestamps: MeasTimestamps structure with timestamps
+    :return: created Dataframe
+    """
+    times_df = pd.DataFrame([get_cumulative_times_dict(timestamps)], columns=TIMESTAMPS_COLUMN_NAMES_CUM)
 
     return times_df
@@ -0,0 +1,119 @@
+import logging
+import json
+import shutil
+from pathlib import Path
+
+# =======================================
+# ============= CONSTANTS ===============
+QUARANTINE_REASON_FILE_SUFFIX = '.reason.txt'
+QUARANTINE_BAD_RECORDS_FILE_SUFFIX = '.bad_records.jsonl'
+
+NUMBER_TYPES = (int, float)
+SCALAR_TYPES = (str, int, float)
+# =======================================
+
+
+# =======================================
+# ========== Records validation =========
+
+def compile_record_schema(schema):
+    """
+    compiles record schema to a validator, which checks all schema paths in one pass over the record:
+    common prefixes of the paths are visited only once
+
+    :param schema: list of tuples (path, expected types, min length):
+        - path: tuple of dict keys / list indexes to the checked value
+        - expected types: tuple of allowed types of the value, None for any type
+        - min length: min number of items for list value, None if not checked;
+                      all items of list value must be numbers
+    :return: validator function(record) -> reason string for bad record, None for valid one
+    """
+    # build tree of paths: step -> (subtree, list of checks at this node)
+    schema_tree = {}
+    for path, expected_types, min_len in schema:
+        node = schema_tree
+        for step in path[:-1]:
+            node = node.setdefault(step, ({}, []))[0]
+        node.setdefault(path[-1], ({}, []))[1].append((path, expected_types, min_len))
+
+    def validate_node(value, node):
+        for step, (subtree, checks) in node.items():
+            try:
+                sub_value = value[step]
+            except (KeyError, IndexError, TypeError):
+                return 'missing "' + str(step) + '"'
+
+            for path, expected_types, min_len in checks:
+                if (expected_types is not None) and (not isinstance(sub_value, expected_types)):
+                    return '"' + '/'.join([str(x) for x in path]) + '" has wrong type ' + type(sub_value).__name__
+                if min_len is not None:
+                    if len(sub_value) < min_len:
+                        return '"' + '/'.join([str(x) for x in path]) + '" has less than ' + str(min_len) + ' items'
+                    if not all([isinstance(item, NUMBER_TYPES) for item in sub_value]):
+                        return '"' + '/'.join([str(x) for x in path]) + '" has not numeric items'
+
+            if subtree:
+                reason = validate_node(sub_value, subtree)
+                if reason is not None:
+                    return reason
+
+        return None
+
+    def validate_record(rec):
+        return validate_node(rec, schema_tree)
+
+    return validate_record
+
+
+# =======================================
+
+
+# =======================================
+# ============== Quarantine =============
+
+def quarantine_raw_file(full_filename, quarantine_dir, reason):
+    """
+    copies bad raw file to quarantine dir, together with the reason of the quarantine
+    :param full_filename: full name (including full path) of the raw file
+    :param quarantine_dir: directory to store quarantined files, nothing is stored if empty
+    :param reason: string with the reason
+    :return: None
+    """
+    logging.error('"' + str(full_filename) + '" is quarantined: ' + reason)
+
+    if not quarantine_dir:
+        return
+
+    Path(quarantine_dir).mkdir(parents=True, exist_ok=True)
+    quarantine_fullname = Path(quarantine_dir) / Path(full_filename).name
+    shutil.copy2(full_filename, quarantine_fullname)
+
+    with open(str(quarantine_fullname) + QUARANTINE_REASON_FILE_SUFFIX, 'w') as reason_file:
+        reason_file.write(reason + '\n')
+
+
+def quarantine_records(full_filename, quarantine_dir, bad_records):
+    """
+    stores bad records of the raw file to quarantine dir
+    :param full_filename: full name (including full path) of the raw file
+    :param quarantine_dir: directory to store quarantined records, nothing is stored if empty
+    :param bad_records: list of tuples (record id, record, reason)
+    :return: None
+    """
+    if not bad_records:
+        return
+
+    logging.warning('"' + str(full_filename) + '": ' + str(len(bad_records)) + ' bad records are skipped, 1st one: "'
+                    + str(bad_records[0][0]) + '": ' + bad_records[0][2])
+
+    if not quarantine_dir:
+        return
+
+    Path(quarantine_dir).mkdir(parents=True, exist_ok=True)
+    quarantine_fullname = Path(quarantine_dir) / (Path(full_filename).name + QUARANTINE_BAD_RECORDS_FILE_SUFFIX)
+
+    with open(quarantine_fullname, 'w') as records_file:
+        for record_id, rec, reason in bad_records:
+            records_file.write(json.dumps({'record': record_id, 'reason': reason, 'data': rec}, default=str) + '\n')
+
+# =======================================
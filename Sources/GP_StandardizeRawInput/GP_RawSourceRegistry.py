@@ -0,0 +1,124 @@
+import importlib
+from dataclasses import dataclass
+
+import GP_RawInputUtils as rawu
+
+# =======================================
+# ============= CONSTANTS ===============
+RAW_SOURCE_IPG = rawu.RAW_IPG_FILENAME_SUFFIX
+RAW_SOURCE_SCRIPT2 = rawu.RAW_SCRIPT2_FILENAME_SUFFIX
+
+# estimated peak memory of standardization per byte of the raw file, for sources without estimate_memory function
+DEF_MEMORY_PER_RAW_BYTE = 10
+# =======================================
+
+
+# =======================================
+# ============= STD TYPES ===============
+@dataclass()
+class RawSourceParser:
+    """
+    Description of one raw source format: the engine finds raw files of the source and dispatches them
+    to its functions; reading, timestamp alignment, naming and storing of outputs are done by the source module.
+    Functions are referenced by names in the module module_name, so the module (and its dependencies)
+    is imported only when files of the source are really handled:
+        - standardize_file(full_filename, out_dir, options) stores standardized file(s) of one raw file,
+          and returns StdFileReport structure
+        - estimate_memory(full_filename, size, options) estimates peak memory in bytes of standardize_file;
+          optional, DEF_MEMORY_PER_RAW_BYTE per byte of the raw file is assumed without it
+    """
+    name: str = ''
+    filename_suffix: str = ''
+    module_name: str = ''
+    standardize_file_name: str = ''
+    estimate_memory_name: str = ''
+
+
+# =======================================
+
+# registered raw sources: source name -> RawSourceParser
+RAW_SOURCE_PARSERS = {}
+
+
+def register_raw_source(parser: RawSourceParser):
+    """
+    registers raw source, so it is handled by the shared standardization engine
+    :param parser: RawSourceParser structure
+    :return: None
+    """
+    RAW_SOURCE_PARSERS[parser.name] = parser
+    rawu.add_raw_filename_suffix(parser.filename_suffix)
+
+
+def get_raw_source(name) -> RawSourceParser:
+    """
+    :param name: name of registered raw source
+    :return: RawSourceParser structure of the source
+    """
+    return RAW_SOURCE_PARSERS[name]
+
+
+def get_raw_source_names() -> list:
+    """
+    :return: names of all registered raw sources, in order of registration
+    """
+    return list(RAW_SOURCE_PARSERS.keys())
+
+
+def get_raw_source_glob_pattern(parser: RawSourceParser) -> str:
+    """
+    :param parser: RawSourceParser structure
+    :return: glob pattern of the raw files of the source
+    """
+    return '*' + rawu.RAW_FILENAME_DELIM + parser.filename_suffix + '.*'
+
+
+def get_raw_source_func(parser: RawSourceParser, func_name):
+    """
+    imports module of the raw source and gets its function
+    :param parser: RawSourceParser structure
+    :param func_name: name of the function in the module of the source
+    :return: function object
+    """
+    module = importlib.import_module(parser.module_name)
+
+    return getattr(module, func_name)
+
+
+def get_standardize_file_func(parser: RawSourceParser):
+    """
+    :param parser: RawSourceParser structure
+    :return: function to standardize one raw file of the source
+    """
+    return get_raw_source_func(parser, parser.standardize_file_name)
+
+
+def estimate_raw_file_memory(parser: RawSourceParser, full_filename, size, options: rawu.StdOptions):
+    """
+    estimates peak memory of standardization of one raw file of the source
+    :param parser: RawSourceParser structure
+    :param full_filename: full name (including full path) of the raw file
+    :param size: size of the raw file in bytes
+    :param options: StdOptions structure
+    :return: estimated memory in bytes
+    """
+    if not parser.estimate_memory_name:
+        return rawu.get_raw_file_uncompressed_size(full_filename, size) * DEF_MEMORY_PER_RAW_BYTE
+
+    return get_raw_source_func(parser, parser.estimate_memory_name)(full_filename, size, options)
+
+
+# =======================================
+# ========= Built-in raw sources ========
+register_raw_source(RawSourceParser(name=RAW_SOURCE_IPG,
+                                    filename_suffix=rawu.RAW_IPG_FILENAME_SUFFIX,
+                                    module_name='GP_StandardizeRawIPG',
+                                    standardize_file_name='standardize_raw_IPG_file',
+                                    estimate_memory_name='estimate_IPG_file_memory'))
+
+register_raw_source(RawSourceParser(name=RAW_SOURCE_SCRIPT2,
+                                    filename_suffix=rawu.RAW_SCRIPT2_FILENAME_SUFFIX,
+                                    module_name='GP_StandardizeRawScript2',
+                                    standardize_file_name='standardize_raw_Script2_file',
+                                    estimate_memory_name='estimate_Script2_file_memory'))
+# =======================================
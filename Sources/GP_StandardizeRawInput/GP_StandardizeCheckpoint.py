@@ -0,0 +1,381 @@
+import logging
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import uuid
+from pathlib import Path
+from dataclasses import asdict
+from contextlib import contextmanager
+import pandas as pd
+
+import GP_RawInputUtils as rawu
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: the lock file is locked by msvcrt
+    fcntl = None
+    import msvcrt
+
+# =======================================
+# ============= CONSTANTS ===============
+# checkpoints are stored next to the standardized files, in a hidden dir, which is skipped by all std files scans
+CHECKPOINT_DIR_NAME = '.gp_std_checkpoint'
+CHECKPOINT_JOURNAL_NAME = 'journal.jsonl'
+CHECKPOINT_SUMMARIES_DIR_NAME = 'summaries'
+CHECKPOINT_CHUNKS_DIR_NAME = 'chunks'
+# standardized filenames, claimed by raw files of the run, so two raw files never get the same name
+CHECKPOINT_NAMES_DIR_NAME = 'names'
+# lock of the run, stored next to the checkpoint dir, as the dir itself is removed by a new run
+CHECKPOINT_LOCK_FILE_SUFFIX = '.lock'
+CHECKPOINT_TMP_FILE_PREFIX = '.tmp_'
+CHECKPOINT_FILE_EXT = '.pkl'
+CHECKPOINT_PICKLE_PROTOCOL = 5
+CHECKPOINT_NAME_HASH_SIZE = 16
+CHECKPOINT_FILE_ENCODING = 'utf-8'
+
+JOURNAL_OPTIONS_KEY = 'options'
+JOURNAL_PROCESS_SUMMARY_KEY = 'process_summary'
+# fields of StdFileReport, stored to the journal as is
+JOURNAL_REPORT_FIELDS = ['full_filename', 'records_total', 'records_bad', 'is_quarantined', 'error', 'out_files',
+                         'seconds', 'stage_seconds']
+# options, which don't change the standardized files, so a run could be resumed with other values of them
+CHECKPOINT_IGNORED_OPTIONS = ['quarantine_dir', 'cache_dir', 'cache_max_bytes', 'metrics_file',
+                              'metrics_interval_sec', 'checkpoint_dir', 'resume', 'memory_budget']
+# =======================================
+
+
+def get_checkpoint_dir(out_dir):
+    """
+    :param out_dir: root directory of standardized files
+    :return: full name of the checkpoint directory of the run
+    """
+    return str(Path(out_dir) / CHECKPOINT_DIR_NAME)
+
+
+def get_checkpoint_lock_fullname(checkpoint_dir):
+    """
+    :param checkpoint_dir: checkpoint directory of the run
+    :return: full name of the lock file of the run
+    """
+    return Path(str(checkpoint_dir) + CHECKPOINT_LOCK_FILE_SUFFIX)
+
+
+@contextmanager
+def locked_checkpoint_dir(checkpoint_dir):
+    """
+    holds the lock of the checkpoint directory for the whole run, so concurrent runs with the same out dir
+    never remove checkpoints and name claims of each other; the lock is taken on the opened lock file,
+    so it's released by the OS even if the run is killed, and the lock file itself is never removed
+    :param checkpoint_dir: checkpoint directory of the run, nothing is locked if empty
+    :return: context manager, which yields True if the lock is taken, False if it's held by another run
+    """
+    if not checkpoint_dir:
+        yield True
+        return
+
+    lock_fullname = get_checkpoint_lock_fullname(checkpoint_dir)
+    lock_fullname.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_fullname, 'a+b') as lock_file:
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            yield False
+            return
+
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def get_checkpoint_name(full_filename):
+    """
+    :param full_filename: full name of the raw (or temporary) file
+    :return: name of the checkpoint file, unique for the full name
+    """
+    return hashlib.blake2b(str(Path(full_filename).resolve()).encode(),
+                           digest_size=CHECKPOINT_NAME_HASH_SIZE).hexdigest() + CHECKPOINT_FILE_EXT
+
+
+def get_raw_file_signature(full_filename):
+    """
+    :param full_filename: full name (including full path) of the raw file
+    :return: tuple (size, modification time in ns), a changed file is standardized again on resume
+    """
+    stat = Path(full_filename).stat()
+
+    return stat.st_size, stat.st_mtime_ns
+
+
+def get_checkpoint_options(options: rawu.StdOptions):
+    """
+    :param options: StdOptions structure
+    :return: dict of options, which change the standardized files, with values as they are read from the journal
+    """
+    checkpoint_options = {name: value for name, value in asdict(options).items()
+                          if name not in CHECKPOINT_IGNORED_OPTIONS}
+
+    return json.loads(json.dumps(checkpoint_options, default=str))
+
+
+def sync_file(full_filename):
+    """
+    flushes the file content to the disk, so it survives a reboot
+    :param full_filename: full name of the file
+    :return: None
+    """
+    with open(full_filename, 'ab') as file:
+        os.fsync(file.fileno())
+
+
+def store_checkpoint_file(full_filename, write_func):
+    """
+    stores the file atomically: it's written to a temporary file, flushed to the disk and renamed
+    :param full_filename: full name of the file
+    :param write_func: function, which writes the content to the passed opened binary file
+    :return: None
+    """
+    tmp_fullname = Path(full_filename).parent / (CHECKPOINT_TMP_FILE_PREFIX + Path(full_filename).name)
+    with open(tmp_fullname, 'wb') as file:
+        write_func(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_fullname, full_filename)
+
+
+# =======================================
+# ======= Journal of completed files ====
+
+def get_journal_line(record):
+    """
+    :param record: dict with the journal record
+    :return: encoded json line of the record
+    """
+    return (json.dumps(record) + '\n').encode(CHECKPOINT_FILE_ENCODING)
+
+
+def read_checkpoint_journal(checkpoint_dir):
+    """
+    reads records of the journal; a line, torn by interruption of the run, is skipped
+    :param checkpoint_dir: checkpoint directory of the run
+    :return: list of dicts with journal records, options record is the first one; empty list if there is no journal
+    """
+    journal_fullname = Path(checkpoint_dir) / CHECKPOINT_JOURNAL_NAME
+    if not journal_fullname.exists():
+        return []
+
+    records = []
+    with open(journal_fullname, encoding=CHECKPOINT_FILE_ENCODING) as journal_file:
+        for line in journal_file:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                logging.warning('Torn record of checkpoint journal "' + str(journal_fullname) + '" is skipped')
+
+    return records
+
+
+def start_checkpoint_journal(options: rawu.StdOptions):
+    """
+    starts the journal of completed raw files: on resume, records of the previous run are kept,
+    if it was started with the same options; otherwise all checkpoints are removed,
+    so the caller must hold the lock of the checkpoint dir, see locked_checkpoint_dir
+    :param options: StdOptions structure with checkpoint_dir
+    :return: dict full filename -> journal record of the completed raw file
+    """
+    checkpoint_options = get_checkpoint_options(options)
+
+    records = read_checkpoint_journal(options.checkpoint_dir) if options.resume else []
+    if records and (records[0].get(JOURNAL_OPTIONS_KEY) != checkpoint_options):
+        logging.warning('Checkpoints in "' + options.checkpoint_dir + '" are created with other options, '
+                        'standardization starts from the beginning')
+        records = []
+
+    if not records:
+        shutil.rmtree(options.checkpoint_dir, ignore_errors=True)
+        records = [{JOURNAL_OPTIONS_KEY: checkpoint_options}]
+
+    Path(options.checkpoint_dir, CHECKPOINT_SUMMARIES_DIR_NAME).mkdir(parents=True, exist_ok=True)
+    Path(options.checkpoint_dir, CHECKPOINT_CHUNKS_DIR_NAME).mkdir(parents=True, exist_ok=True)
+    Path(options.checkpoint_dir, CHECKPOINT_NAMES_DIR_NAME).mkdir(parents=True, exist_ok=True)
+
+    # the journal is rewritten without torn lines, so new records are appended to the valid ones
+    store_checkpoint_file(Path(options.checkpoint_dir) / CHECKPOINT_JOURNAL_NAME,
+                          lambda file: file.writelines([get_journal_line(record) for record in records]))
+
+    return {record['full_filename']: record for record in records[1:]}
+
+
+def add_to_checkpoint_journal(checkpoint_dir, source_name, report: rawu.StdFileReport):
+    """
+    adds the completed raw file to the journal; process summary of the file is stored next to the journal,
+    as it's needed for summaries of all files of the PC
+    :param checkpoint_dir: checkpoint directory of the run
+    :param source_name: name of the raw source
+    :param report: StdFileReport structure of the completed file
+    :return: None
+    """
+    record = {name: getattr(report, name) for name in JOURNAL_REPORT_FIELDS}
+    record['source_name'] = source_name
+    record['signature'] = get_raw_file_signature(report.full_filename)
+    record[JOURNAL_PROCESS_SUMMARY_KEY] = ''
+
+    if report.process_summary is not None:
+        summary_fullname = Path(checkpoint_dir) / CHECKPOINT_SUMMARIES_DIR_NAME \
+                           / get_checkpoint_name(report.full_filename)
+        store_checkpoint_file(summary_fullname, lambda file: report.process_summary.to_pickle(
+            file, protocol=CHECKPOINT_PICKLE_PROTOCOL))
+        record[JOURNAL_PROCESS_SUMMARY_KEY] = str(summary_fullname)
+
+    with open(Path(checkpoint_dir) / CHECKPOINT_JOURNAL_NAME, 'ab') as journal_file:
+        journal_file.write(get_journal_line(record))
+        journal_file.flush()
+        os.fsync(journal_file.fileno())
+
+
+def get_journaled_report(journal, full_filename, source_name):
+    """
+    :param journal: dict, returned by start_checkpoint_journal
+    :param full_filename: full name (including full path) of the raw file
+    :param source_name: name of the raw source
+    :return: StdFileReport structure of the raw file, completed by the previous run;
+             None if the file must be standardized (again)
+    """
+    record = journal.get(full_filename)
+    if (record is None) or (record['source_name'] != source_name) \
+            or (tuple(record['signature']) != get_raw_file_signature(full_filename)) \
+            or not all([Path(out_file).exists() for out_file in record['out_files']]):
+        return None
+
+    report = rawu.StdFileReport(**{name: record[name] for name in JOURNAL_REPORT_FIELDS})
+    if record[JOURNAL_PROCESS_SUMMARY_KEY]:
+        report.process_summary = pd.read_pickle(record[JOURNAL_PROCESS_SUMMARY_KEY])
+
+    return report
+
+
+# =======================================
+# ====== Chunked (out-of-core) files ====
+
+def get_chunk_checkpoint_fullname(checkpoint_dir, out_fullname):
+    """
+    :param checkpoint_dir: checkpoint directory of the run
+    :param out_fullname: full name of the temporary file, chunks are appended to
+    :return: full name of the checkpoint of the chunked file
+    """
+    return Path(checkpoint_dir) / CHECKPOINT_CHUNKS_DIR_NAME / get_checkpoint_name(out_fullname)
+
+
+def store_chunk_checkpoint(checkpoint_dir, full_filename, out_fullname, state):
+    """
+    commits the chunks, appended to out_fullname so far: the file is flushed to the disk,
+    and its size is stored together with the state of the chunked standardization
+    :param checkpoint_dir: checkpoint directory of the run
+    :param full_filename: full name (including full path) of the raw file
+    :param out_fullname: full name of the temporary file, chunks are appended to
+    :param state: picklable state of the chunked standardization, e.g. number of consumed raw lines
+    :return: None
+    """
+    sync_file(out_fullname)
+
+    checkpoint = {'signature': get_raw_file_signature(full_filename), 'out_size': Path(out_fullname).stat().st_size,
+                  'state': state}
+    store_checkpoint_file(get_chunk_checkpoint_fullname(checkpoint_dir, out_fullname),
+                          lambda file: pickle.dump(checkpoint, file, protocol=CHECKPOINT_PICKLE_PROTOCOL))
+
+
+def load_chunk_checkpoint(checkpoint_dir, full_filename, out_fullname):
+    """
+    restores the last committed chunk: out_fullname is truncated to its committed size,
+    so rows of the chunk, which was interrupted, are neither duplicated nor dropped
+    :param checkpoint_dir: checkpoint directory of the run
+    :param full_filename: full name (including full path) of the raw file
+    :param out_fullname: full name of the temporary file, chunks are appended to
+    :return: state of the chunked standardization, stored by store_chunk_checkpoint; None if there is no checkpoint
+    """
+    checkpoint_fullname = get_chunk_checkpoint_fullname(checkpoint_dir, out_fullname)
+    if not checkpoint_fullname.exists():
+        return None
+
+    with open(checkpoint_fullname, 'rb') as checkpoint_file:
+        checkpoint = pickle.load(checkpoint_file)
+
+    if (tuple(checkpoint['signature']) != get_raw_file_signature(full_filename)) \
+            or (not Path(out_fullname).exists()) or (Path(out_fullname).stat().st_size < checkpoint['out_size']):
+        logging.warning('Checkpoint of "' + full_filename + '" is outdated, '
+                        'the file is standardized from the beginning')
+        return None
+
+    with open(out_fullname, 'r+b') as out_file:
+        out_file.truncate(checkpoint['out_size'])
+
+    return checkpoint['state']
+
+
+def remove_chunk_checkpoint(checkpoint_dir, out_fullname):
+    """
+    removes the checkpoint of the completed chunked file
+    :param checkpoint_dir: checkpoint directory of the run
+    :param out_fullname: full name of the temporary file, chunks are appended to
+    :return: None
+    """
+    get_chunk_checkpoint_fullname(checkpoint_dir, out_fullname).unlink(missing_ok=True)
+
+
+# =======================================
+# ===== Standardized filenames of run ===
+
+def claim_std_filename(checkpoint_dir, full_filename, out_fullname, keep_existing=False):
+    """
+    claims standardized filename for the raw file till the end of the run (including resumed runs):
+    the claim is created atomically with its owner by hard link, so parallel workers never claim the same name
+    :param checkpoint_dir: checkpoint directory of the run
+    :param full_filename: full name (including full path) of the raw file
+    :param out_fullname: full name of the standardized file
+    :param keep_existing: True if the existing file, not claimed by the run, is taken, e.g. output of previous run
+    :return: True if the name is claimed by the raw file, now or by the interrupted run; False if it's taken
+    """
+    claim_fullname = Path(checkpoint_dir) / CHECKPOINT_NAMES_DIR_NAME / get_checkpoint_name(out_fullname)
+    owner = str(Path(full_filename).resolve())
+
+    if keep_existing and Path(out_fullname).exists() and not claim_fullname.exists():
+        return False
+
+    tmp_fullname = claim_fullname.parent / (CHECKPOINT_TMP_FILE_PREFIX + uuid.uuid4().hex)
+    tmp_fullname.write_text(owner, encoding=CHECKPOINT_FILE_ENCODING)
+    try:
+        os.link(tmp_fullname, claim_fullname)
+        return True
+    except FileExistsError:
+        return claim_fullname.read_text(encoding=CHECKPOINT_FILE_ENCODING) == owner
+    finally:
+        tmp_fullname.unlink()
+
+
+def get_std_filename_claimer(options: rawu.StdOptions, full_filename, out_dir, keep_existing=False):
+    """
+    :param options: StdOptions structure
+    :param full_filename: full name (including full path) of the raw file
+    :param out_dir: directory to store standardized files of the raw file
+    :param keep_existing: True if existing files, not claimed by the run, must not be replaced
+    :return: function filename -> True if the name in out_dir is claimed by the raw file, see claim_std_filename;
+             None for runs without checkpoints, names are unique only within the raw file then
+    """
+    if not options.checkpoint_dir:
+        return None
+
+    return lambda filename: claim_std_filename(options.checkpoint_dir, full_filename, Path(out_dir) / filename,
+                                               keep_existing)
+
+# =======================================
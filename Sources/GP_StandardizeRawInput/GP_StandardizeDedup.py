@@ -0,0 +1,344 @@
+import logging
+import os
+import re
+from pathlib import Path
+import pandas as pd
+
+import GP_RawInputUtils as rawu
+import GP_StandardizeRawIPG as ipg
+
+# =======================================
+# ============= CONSTANTS ===============
+# standardized time series files, trimmed on overlaps: suffix -> (column with row datetimes, its format),
+# None format for ISO datetimes
+STD_DATETIME_COLUMNS = {
+    rawu.RAW_IPG_REALMEAS_FILENAME_SUFFIX: (rawu.RAW_DATETIME_COLUMN_NAME, None),
+    # energy windows are trimmed by their starts, so the window overlapping the previous file is dropped
+    rawu.RAW_IPG_ENERGY_FILENAME_SUFFIX: (rawu.RAW_START_DATETIME_COLUMN_NAME, None),
+    rawu.RAW_SCRIPT2_SYS_FILENAME_SUFFIX: (rawu.RAW_START_DATETIME_COLUMN_NAME, rawu.STD_SCRIPT2_DATETIME_FORMAT),
+    rawu.RAW_SCRIPT2_PROCESSES_LONG_FILENAME_SUFFIX: (rawu.RAW_START_DATETIME_COLUMN_NAME,
+                                                      rawu.STD_SCRIPT2_DATETIME_FORMAT)}
+
+# files, which belong to the trimmed file, and are renamed or removed together with it: suffix -> companion suffixes
+STD_COMPANION_SUFFIXES = {
+    rawu.RAW_IPG_REALMEAS_FILENAME_SUFFIX: [rawu.RAW_IPG_CUMMEAS_FILENAME_SUFFIX],
+    rawu.RAW_SCRIPT2_PROCESSES_LONG_FILENAME_SUFFIX: [rawu.RAW_SCRIPT2_PROCESSES_NAMES_FILENAME_SUFFIX]}
+
+# IPG cumulative columns of real-time measurements, e.g. "Cumulative Processor Energy_0(Joules)", continue
+# the dropped rows, so they are rebased to the last dropped row, and cumulative measurements are recomputed from it
+IPG_CUMULATIVE_COLUMN_MARKER = 'Cumulative'
+IPG_CUM_MEAS_ELAPSED_TIME_NAME = 'Total Elapsed Time (sec)'
+# e.g. "Integrated Processor Energy_0 (Joules)" of cumulative measurements
+IPG_CUM_MEAS_INTEGRATED_ENERGY_REGEX = re.compile(r'^Integrated (?P<name>.+) Energy_(?P<idx>\d+) \(Joules\)$')
+# e.g. "Average Processor Power_0 (Watt)" of cumulative measurements
+IPG_CUM_MEAS_AVERAGE_POWER_REGEX = re.compile(r'^Average (?P<name>.+) Power_(?P<idx>\d+) \(Watt\)$')
+# rebased values are rounded, so subtraction doesn't add float noise to stored values
+DEDUP_REBASE_DECIMALS = 6
+
+# rows of the trimmed file are read and written by chunks, as process tables could be large
+DEDUP_CHUNK_ROWS = 100000
+DEDUP_TMP_FILE_PREFIX = '.tmp_'
+# =======================================
+
+
+def get_std_datetime_column_name(suffix):
+    """
+    gets name of the column with row datetimes in standardized files with passed suffix
+    :param suffix: standardized filename suffix
+    :return: column name, None for standardized files, which are not trimmed on overlaps
+    """
+    if suffix not in STD_DATETIME_COLUMNS:
+        return None
+
+    return STD_DATETIME_COLUMNS[suffix][0]
+
+
+def read_std_datetimes(full_filename, suffix):
+    """
+    reads only datetime column of the standardized file
+    :param full_filename:
+    :param suffix: standardized filename suffix of the file
+    :return: datetime Serie
+    """
+    datetime_column = get_std_datetime_column_name(suffix)
+    datetimes_serie = pd.read_csv(full_filename, usecols=[datetime_column])[datetime_column]
+
+    return parse_std_datetimes(datetimes_serie, suffix)
+
+
+def parse_std_datetimes(datetimes_serie, suffix):
+    """
+    converts stored standardized datetimes strings to datetimes
+    :param datetimes_serie: Serie of strings
+    :param suffix: standardized filename suffix of the file
+    :return: datetime Serie
+    """
+    return pd.to_datetime(datetimes_serie, format=STD_DATETIME_COLUMNS[suffix][1])
+
+
+def get_std_files_by_pc_and_suffix(std_dir):
+    """
+    finds standardized time series files in std_dir (including subdirs) and groups them by PC and suffix
+    :param std_dir: directory with standardized files
+    :return: dict (PC name, suffix) -> list of tuples (start datetime, end datetime, full filename), sorted by start
+    """
+    files_by_group = {}
+
+    for file in Path(std_dir).rglob('*.csv'):
+        std_parts = rawu.get_std_filename_parts(str(file))
+        if (std_parts is None) or (get_std_datetime_column_name(std_parts.Suffix) is None):
+            continue
+
+        try:
+            start_datetime, end_datetime = rawu.get_std_filename_datetimes(std_parts)
+        except ValueError:
+            logging.debug('"' + file.name + '" has no standardized timestamps in its name')
+            continue
+
+        files_by_group.setdefault((std_parts.PC_name, std_parts.Suffix), []).append(
+            (start_datetime, end_datetime, str(file)))
+
+    for files in files_by_group.values():
+        files.sort()
+
+    return files_by_group
+
+
+def get_std_companion_name(std_name, companion_suffix):
+    """
+    :param std_name: standardized filename
+    :param companion_suffix: suffix of the companion file, e.g. PROCESSES__Script2__NAMES for process table
+    :return: name of the companion file with the same PC, timestamps and collision index
+    """
+    std_parts = rawu.get_std_filename_parts(std_name)
+    collision = (rawu.STD_FILENAME_COLLISION_DELIM + std_parts.CollisionIdx) if std_parts.CollisionIdx else ''
+
+    return rawu.RAW_FILENAME_DELIM.join([std_parts.PC_name, std_parts.StartDate, std_parts.StartTime,
+                                         std_parts.EndDate, std_parts.EndTime, companion_suffix]) \
+           + collision + std_parts.FileExt
+
+
+def move_std_companion_files(full_filename, trimmed_fullname):
+    """
+    renames companion files of the trimmed file to match its new name, or removes them if the file is removed
+    :param full_filename: full name of the file before trimming
+    :param trimmed_fullname: full name of the trimmed file, None if all its rows are dropped
+    :return: None
+    """
+    suffix = rawu.get_std_filename_parts(full_filename).Suffix
+    for companion_suffix in STD_COMPANION_SUFFIXES.get(suffix, []):
+        companion_fullname = Path(full_filename).parent / get_std_companion_name(full_filename, companion_suffix)
+        if not companion_fullname.exists():
+            continue
+
+        if trimmed_fullname is None:
+            companion_fullname.unlink()
+        else:
+            os.replace(companion_fullname, Path(trimmed_fullname).parent
+                       / get_std_companion_name(trimmed_fullname, companion_suffix))
+
+
+def get_IPG_real_meas_cumulative_column_name(cum_meas_name):
+    """
+    :param cum_meas_name: name of IPG cumulative measurement, e.g. "Cumulative Processor Energy_0 (Joules)"
+    :return: name of the column of real-time measurements, which has the value of the measurement in every row,
+             e.g. "Cumulative Processor Energy_0(Joules)"; it's not checked, that such column exists
+    """
+    match = IPG_CUM_MEAS_INTEGRATED_ENERGY_REGEX.match(cum_meas_name)
+    if match is not None:
+        return ipg.IPG_CUM_ENERGY_COLUMN_FORMAT.format(name=match.group('name'), idx=match.group('idx'))
+
+    return cum_meas_name.replace(' (', '(')
+
+
+def rebase_IPG_real_meas_df(meas_df, dropped_row):
+    """
+    rebases cumulative columns of IPG real-time measurements to the last dropped row,
+    so they accumulate only the kept rows
+    :param meas_df: Dataframe with kept rows, converted in place
+    :param dropped_row: Serie with the last dropped row
+    :return: meas_df
+    """
+    for column in meas_df.columns:
+        if IPG_CUMULATIVE_COLUMN_MARKER in column:
+            meas_df[column] = (pd.to_numeric(meas_df[column], errors='coerce')
+                               - pd.to_numeric(dropped_row[column], errors='coerce')).round(DEDUP_REBASE_DECIMALS)
+
+    return meas_df
+
+
+def rebase_std_IPG_cum_file(cum_fullname, first_row, dropped_row):
+    """
+    recomputes IPG cumulative measurements of the trimmed real-time measurements, so they don't count dropped rows:
+    start is taken from the first kept row, elapsed time and energies are counted from the last dropped row,
+    average powers are recomputed from them; other measurements are kept as is
+    :param cum_fullname: full name of standardized IPG cumulative measurements, rewritten in place
+    :param first_row: Serie with the first kept row of real-time measurements
+    :param dropped_row: Serie with the last dropped row of real-time measurements
+    :return: None
+    """
+    cum_df = pd.read_csv(cum_fullname, dtype=str)
+
+    start_dict = rawu.get_cumulative_times_dict(rawu.CumMeasTimestamps(
+        first_row[rawu.RAW_DATE_COLUMN_NAME], first_row[rawu.RAW_TIME_COLUMN_NAME],
+        cum_df.at[0, rawu.RAW_END_DATE_COLUMN_NAME], cum_df.at[0, rawu.RAW_END_TIME_COLUMN_NAME]))
+    for column, value in start_dict.items():
+        cum_df.at[0, column] = value
+
+    rebased = {}
+    for column in cum_df.columns:
+        meas_column = ipg.IPG_ELAPSED_TIME_COLUMN_NAME if column == IPG_CUM_MEAS_ELAPSED_TIME_NAME \
+            else get_IPG_real_meas_cumulative_column_name(column)
+        if (IPG_CUMULATIVE_COLUMN_MARKER in meas_column) or (meas_column == ipg.IPG_ELAPSED_TIME_COLUMN_NAME):
+            if meas_column in dropped_row.index:
+                rebased[column] = round(float(cum_df.at[0, column]) - float(dropped_row[meas_column]),
+                                        DEDUP_REBASE_DECIMALS)
+
+    for column in cum_df.columns:
+        match = IPG_CUM_MEAS_AVERAGE_POWER_REGEX.match(column)
+        if match is None:
+            continue
+
+        energy_name = ipg.IPG_CUM_MEAS_ENERGY_NAME_FORMAT.format(name=match.group('name'), idx=match.group('idx'))
+        elapsed = rebased.get(IPG_CUM_MEAS_ELAPSED_TIME_NAME)
+        if (energy_name in rebased) and elapsed:
+            rebased[column] = round(rebased[energy_name] / elapsed, DEDUP_REBASE_DECIMALS)
+
+    for column, value in rebased.items():
+        cum_df.at[0, column] = str(value)
+
+    cum_df.to_csv(cum_fullname, index=False)
+
+
+def trim_std_file(full_filename, suffix, last_datetime):
+    """
+    drops rows of the standardized file, which are not later than last_datetime,
+    and stores the rest under the name matching its new start; the file is read by chunks;
+    for IPG real-time measurements, cumulative columns and cumulative measurements are rebased to the dropped rows
+    :param full_filename:
+    :param suffix: standardized filename suffix of the file
+    :param last_datetime: last datetime, already present in previous files
+    :return: tuple (full name of the trimmed file or None if all rows are dropped, max datetime of the file rows)
+    """
+    datetime_column = get_std_datetime_column_name(suffix)
+    tmp_fullname = Path(full_filename).parent / (DEDUP_TMP_FILE_PREFIX + Path(full_filename).name)
+    is_IPG_real_meas = (suffix == rawu.RAW_IPG_REALMEAS_FILENAME_SUFFIX)
+
+    num_rows = 0
+    num_dropped = 0
+    max_datetime = None
+    new_start = None
+    # rows of IPG real-time measurements are sorted by time, so the dropped ones precede the kept ones
+    first_row = None
+    dropped_row = None
+    tmp_fullname.unlink(missing_ok=True)
+    with pd.read_csv(full_filename, chunksize=DEDUP_CHUNK_ROWS) as chunks:
+        for chunk_df in chunks:
+            datetimes_serie = parse_std_datetimes(chunk_df[datetime_column], suffix)
+            chunk_max = datetimes_serie.max()
+            max_datetime = chunk_max if (max_datetime is None) or (chunk_max > max_datetime) else max_datetime
+
+            is_new_row = datetimes_serie > last_datetime
+            num_rows += len(chunk_df)
+            num_dropped += int((~is_new_row).sum())
+            if is_new_row.any():
+                chunk_start = datetimes_serie[is_new_row].min()
+                new_start = chunk_start if (new_start is None) or (chunk_start < new_start) else new_start
+
+            kept_df = chunk_df[is_new_row].copy()
+            if is_IPG_real_meas:
+                if (~is_new_row).any():
+                    dropped_row = chunk_df[~is_new_row].iloc[-1]
+                if (first_row is None) and (not kept_df.empty):
+                    first_row = kept_df.iloc[0]
+                if dropped_row is not None:
+                    rebase_IPG_real_meas_df(kept_df, dropped_row)
+
+            kept_df.to_csv(tmp_fullname, mode='a', header=not tmp_fullname.exists(), index=False)
+
+    if num_dropped == 0:
+        tmp_fullname.unlink(missing_ok=True)
+        return full_filename, max_datetime
+
+    logging.info('"' + full_filename + '": ' + str(num_dropped) + ' rows overlap with previous files and are dropped')
+    Path(full_filename).unlink()
+
+    if num_dropped == num_rows:
+        tmp_fullname.unlink(missing_ok=True)
+        move_std_companion_files(full_filename, None)
+        return None, max_datetime
+
+    std_parts = rawu.get_std_filename_parts(full_filename)
+    end_datetime = rawu.get_std_filename_datetimes(std_parts)[1]
+    trimmed_name = rawu.get_std_raw_filenames([(std_parts.PC_name, new_start, end_datetime, std_parts.Suffix)],
+                                              rawu.get_dir_filenames(Path(full_filename).parent))[0]
+    trimmed_fullname = str(Path(full_filename).parent / trimmed_name)
+    os.replace(tmp_fullname, trimmed_fullname)
+
+    cum_fullname = Path(full_filename).parent / get_std_companion_name(full_filename,
+                                                                       rawu.RAW_IPG_CUMMEAS_FILENAME_SUFFIX)
+    if is_IPG_real_meas and cum_fullname.exists():
+        rebase_std_IPG_cum_file(cum_fullname, first_row, dropped_row)
+    move_std_companion_files(full_filename, trimmed_fullname)
+
+    return trimmed_fullname, max_datetime
+
+
+def trim_overlapping_std_files(files, suffix):
+    """
+    trims rows overlapping in time between time-sorted standardized files of one PC and source;
+    overlaps are detected by timestamps in filenames, so only overlapping files are read, one at a time
+
+    :param files: list of tuples (start datetime, end datetime, full filename), sorted by start
+    :param suffix: standardized filename suffix of the files
+    :return: list of full names of changed files (removed ones included)
+    """
+    changed_files = []
+
+    # exact max datetime is known only for read files, otherwise it's taken from the name when needed
+    last_file = None
+    last_end = None
+    last_max_datetime = None
+
+    for start_datetime, end_datetime, full_filename in files:
+        if (last_file is not None) and (start_datetime <= last_end + rawu.STD_FILENAME_TIME_RESOLUTION):
+            if last_max_datetime is None:
+                last_max_datetime = read_std_datetimes(last_file, suffix).max()
+
+            trimmed_fullname, max_datetime = trim_std_file(full_filename, suffix, last_max_datetime)
+            if trimmed_fullname != full_filename:
+                changed_files.append(full_filename)
+
+            if max_datetime <= last_max_datetime:
+                # the file is fully covered by the previous one
+                continue
+
+            last_file = trimmed_fullname
+            last_end = end_datetime
+            last_max_datetime = max_datetime
+        else:
+            last_file = full_filename
+            last_end = end_datetime
+            last_max_datetime = None
+
+    return changed_files
+
+
+def trim_overlapping_std_outputs(std_dir):
+    """
+    finds standardized time series files in std_dir and trims rows overlapping in time
+    between files of the same PC and source, e.g. from restarted IPG sessions:
+    IPG real-time measurements and energy windows, Script2 overall system and process tables;
+    IPG cumulative measurements of trimmed real-time measurements are recomputed, so they count no overlap
+    :param std_dir: directory with standardized files
+    :return: list of full names of changed files
+    """
+    logging.info('Start trimming of overlapping standardized files in "' + str(std_dir) + '"')
+
+    changed_files = []
+    for (pc_name, suffix), files in sorted(get_std_files_by_pc_and_suffix(std_dir).items()):
+        changed_files += trim_overlapping_std_files(files, suffix)
+
+    logging.info(str(len(changed_files)) + ' standardized files are trimmed')
+
+    return changed_files
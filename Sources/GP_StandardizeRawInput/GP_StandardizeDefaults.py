@@ -0,0 +1,27 @@
+# default options of the standardization, shared by the CLI and the standardizers;
+# the module must stay free of heavy imports (pandas), as the CLI imports it on start
+
+# =======================================
+# ============= CONSTANTS ===============
+# number of parallel processes of the engine
+DEF_NUM_JOBS = 1
+
+# number of heaviest processes per metric in process summaries, 0 to skip the summaries
+DEF_TOP_PROCESSES = 10
+
+# length of the windows of IPG energy totals
+DEF_ENERGY_WINDOW_SEC = 60.0
+
+# min interval between stores of the metrics file
+DEF_METRICS_INTERVAL_SEC = 10.0
+
+JOIN_DIRECTION_NEAREST = 'nearest'
+JOIN_DIRECTION_BACKWARD = 'backward'
+JOIN_DIRECTIONS_LIST = [JOIN_DIRECTION_NEAREST, JOIN_DIRECTION_BACKWARD]
+
+DEF_JOIN_DIRECTION = JOIN_DIRECTION_NEAREST
+DEF_JOIN_TOLERANCE_SEC = 5.0
+
+# target size of files merged by compaction
+DEF_COMPACT_TARGET_SIZE = '128M'
+# =======================================
@@ -0,0 +1,436 @@
+import logging
+from pathlib import Path
+from dataclasses import dataclass
+import collections
+import concurrent.futures
+import fnmatch
+import time
+import traceback
+
+import GP_RawInputUtils as rawu
+import GP_RawInputValidation as rawv
+import GP_RawSourceRegistry as reg
+import GP_StandardizeMetrics as metr
+import GP_StandardizeCheckpoint as chkp
+import GP_StandardizeDefaults as dflt
+
+# =======================================
+# ============= CONSTANTS ===============
+# estimated memory of a worker process itself (interpreter with pandas), added to the estimate of each raw file
+WORKER_BASE_MEMORY = 96 * 1024 ** 2
+# =======================================
+
+
+# =======================================
+# ============= STD TYPES ===============
+@dataclass()
+class RawFileJob:
+    source_name: str = ''
+    full_filename: str = ''
+    size: int = 0
+    PC_name: str = ''
+    out_dir: str = ''
+
+
+# =======================================
+
+
+def is_raw_file_selected(file: Path, include=None, exclude=None):
+    """
+    checks file against include/exclude glob patterns, matched to the filename or to the full path
+    :param file: Path of the file
+    :param include: list of patterns, file must match at least one of them; None to include all files
+    :param exclude: list of patterns, file must match none of them; None to exclude nothing
+    :return: True if the file is selected
+    """
+    def is_matched(patterns):
+        return any([fnmatch.fnmatch(file.name, pattern) or fnmatch.fnmatch(file.as_posix(), pattern)
+                    for pattern in patterns])
+
+    if include and not is_matched(include):
+        return False
+    if exclude and is_matched(exclude):
+        return False
+
+    return True
+
+
+def get_skipped_dirs(parse_path: Path, skip_dirs):
+    """
+    :param parse_path: Path of the parsing directory
+    :param skip_dirs: list of directories, which must not be parsed, empty names are ignored
+    :return: list of resolved Paths of skip_dirs; directories, which contain the parsing directory itself
+             (e.g. output directory equal to the input one), are not skipped
+    """
+    resolved_parse_path = parse_path.resolve()
+    skipped_dirs = [Path(skip_dir).resolve() for skip_dir in (skip_dirs or []) if skip_dir]
+
+    return [skip_path for skip_path in skipped_dirs if not resolved_parse_path.is_relative_to(skip_path)]
+
+
+def is_hidden_raw_file(file: Path, parse_path: Path):
+    """
+    :param file: Path of the found file
+    :param parse_path: Path of the parsing directory
+    :return: True if the file or one of its directories in the parsing directory is hidden, e.g. temporary output
+             .tmp_<raw filename>.csv or checkpoint directory
+    """
+    return any([part.startswith('.') for part in file.relative_to(parse_path).parts])
+
+
+def find_raw_files(parsing_dirs, source_name, recursive=False, include=None, exclude=None, skip_dirs=None):
+    """
+    finds all raw files of the registered raw source in parsing_dirs; hidden files and directories are skipped
+    :param parsing_dirs: directory or list of directories to parse
+    :param source_name: name of registered raw source
+    :param recursive: True to parse also all subdirectories, e.g. RawOutput/<PC_NAME>/
+    :param include: list of glob patterns of files to handle, None for all files
+    :param exclude: list of glob patterns of files to skip
+    :param skip_dirs: list of directories, which must not be parsed, e.g. output, quarantine and cache ones
+    :return: list of RawFileJob structures
+    """
+    if isinstance(parsing_dirs, (str, Path)):
+        parsing_dirs = [parsing_dirs]
+
+    parser = reg.get_raw_source(source_name)
+    pattern = reg.get_raw_source_glob_pattern(parser)
+
+    jobs = []
+    found_files = set()
+    for parsing_dir in parsing_dirs:
+        parse_path = Path(parsing_dir)
+        skipped_dirs = get_skipped_dirs(parse_path, skip_dirs)
+        file_list = parse_path.rglob(pattern) if recursive else parse_path.glob(pattern)
+
+        for file in file_list:
+            # the same file could be found via several (nested) dirs
+            resolved_file = file.resolve()
+            if (resolved_file in found_files) or (not file.is_file()) or is_hidden_raw_file(file, parse_path) \
+                    or any([resolved_file.is_relative_to(skip_path) for skip_path in skipped_dirs]) \
+                    or (not is_raw_file_selected(file, include, exclude)):
+                continue
+            found_files.add(resolved_file)
+
+            filename_parts = rawu.get_filename_parts(str(file))
+            jobs.append(RawFileJob(source_name, str(file), file.stat().st_size, filename_parts.PC_name))
+
+    return jobs
+
+
+def get_raw_file_jobs(parsing_dirs, source_names=None, recursive=False, include=None, exclude=None, skip_dirs=None):
+    """
+    finds raw files of all passed raw sources in parsing_dirs
+    and puts them to one queue, ordered largest-first to minimize the tail of parallel runs
+    :param parsing_dirs: directory or list of directories to parse
+    :param source_names: names of registered raw sources, None for all registered sources
+    :param recursive: True to parse also all subdirectories
+    :param include: list of glob patterns of files to handle, None for all files
+    :param exclude: list of glob patterns of files to skip
+    :param skip_dirs: list of directories, which must not be parsed, e.g. output, quarantine and cache ones
+    :return: list of RawFileJob structures
+    """
+    if source_names is None:
+        source_names = reg.get_raw_source_names()
+
+    jobs = []
+    for source_name in source_names:
+        jobs += find_raw_files(parsing_dirs, source_name, recursive, include, exclude, skip_dirs)
+
+    jobs.sort(key=lambda job: job.size, reverse=True)
+
+    return jobs
+
+
+def drop_duplicate_raw_file_jobs(jobs):
+    """
+    drops raw files with exactly the same content (e.g. the same capture uploaded twice) before any parsing;
+    only files of the same size are hashed, the file with the smallest name of the duplicates is kept
+    :param jobs: list of RawFileJob structures
+    :return: list of RawFileJob structures without duplicates, in the original order
+    """
+    jobs_by_size = {}
+    for job in jobs:
+        jobs_by_size.setdefault((job.source_name, job.size), []).append(job)
+
+    dropped_jobs = set()
+    for same_size_jobs in jobs_by_size.values():
+        if len(same_size_jobs) < 2:
+            continue
+
+        kept_by_hash = {}
+        for job in sorted(same_size_jobs, key=lambda x: x.full_filename):
+            content_hash = rawu.get_file_content_hash(job.full_filename)
+            if content_hash in kept_by_hash:
+                logging.info('"' + job.full_filename + '" is skipped as duplicate of "'
+                             + kept_by_hash[content_hash].full_filename + '"')
+                dropped_jobs.add(id(job))
+            else:
+                kept_by_hash[content_hash] = job
+
+    return [job for job in jobs if id(job) not in dropped_jobs]
+
+
+def group_raw_file_jobs_by_pc(jobs):
+    """
+    groups raw files by PC name from their filenames
+    :param jobs: list of RawFileJob structures
+    :return: dict PC name -> list of RawFileJob structures
+    """
+    jobs_by_pc = {}
+    for job in jobs:
+        jobs_by_pc.setdefault(job.PC_name, []).append(job)
+
+    return jobs_by_pc
+
+
+def run_raw_file_job(job: RawFileJob, out_dir, options: rawu.StdOptions = None):
+    """
+    standardizes one raw file with the parser of its raw source
+    :param job: RawFileJob structure
+    :param out_dir: full path to the directory to store resulting file(s)
+    :param options: StdOptions structure, None for default options
+    :return: StdFileReport structure
+    """
+    parser = reg.get_raw_source(job.source_name)
+    standardize_file = reg.get_standardize_file_func(parser)
+
+    if job.out_dir:
+        out_dir = job.out_dir
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+
+    start_time = time.perf_counter()
+    report = standardize_file(job.full_filename, out_dir, options)
+    report.seconds = time.perf_counter() - start_time
+
+    return report
+
+
+def get_raw_file_job_memory(job: RawFileJob, options: rawu.StdOptions):
+    """
+    :param job: RawFileJob structure
+    :param options: StdOptions structure
+    :return: estimated peak memory in bytes of the worker, which standardizes the raw file;
+             0 if there is no memory budget
+    """
+    if not options.memory_budget:
+        return 0
+
+    parser = reg.get_raw_source(job.source_name)
+
+    return WORKER_BASE_MEMORY + reg.estimate_raw_file_memory(parser, job.full_filename, job.size, options)
+
+
+def submit_raw_file_jobs(executor, queued_jobs, futures, out_dir, num_jobs, options: rawu.StdOptions):
+    """
+    submits queued raw files, while there are idle workers and their total estimated memory fits
+    options.memory_budget; files are submitted in the queue order, so a large file isn't overtaken by small ones
+    forever; the file is submitted anyway, if nothing else is running
+    :param executor: ProcessPoolExecutor
+    :param queued_jobs: deque of tuples (RawFileJob structure, estimated memory), submitted ones are popped
+    :param futures: dict future -> tuple (RawFileJob structure, estimated memory) of running files, updated
+    :param out_dir: full path to the directory to store resulting file(s)
+    :param num_jobs: number of parallel processes
+    :param options: StdOptions structure
+    :return: None
+    """
+    running_memory = sum([memory for job, memory in futures.values()])
+
+    while queued_jobs and (len(futures) < num_jobs):
+        job, memory = queued_jobs[0]
+        if options.memory_budget and (running_memory + memory > options.memory_budget):
+            if futures:
+                logging.debug('"' + job.full_filename + '" waits for memory budget, '
+                              + str(len(futures)) + ' raw files are running')
+                break
+            logging.warning('"' + job.full_filename + '": estimated memory ' + str(memory)
+                            + ' bytes exceeds memory budget ' + str(options.memory_budget) + ' bytes')
+
+        queued_jobs.popleft()
+        futures[executor.submit(run_raw_file_job, job, out_dir, options)] = (job, memory)
+        running_memory += memory
+
+
+def handle_failed_raw_file_job(job: RawFileJob, options: rawu.StdOptions):
+    """
+    logs failure of the raw file standardization and quarantines the file
+    :param job: RawFileJob structure
+    :param options: StdOptions structure
+    :return: StdFileReport structure of the failed file
+    """
+    logging.exception('"' + job.full_filename + '": standardization failed')
+
+    error = traceback.format_exc(limit=1).strip().splitlines()[-1]
+    rawv.quarantine_raw_file(job.full_filename, options.quarantine_dir, 'standardization failed: ' + error)
+
+    return rawu.StdFileReport(full_filename=job.full_filename, is_quarantined=True, error=error)
+
+
+def handle_done_raw_file_job(job: RawFileJob, report: rawu.StdFileReport, metrics: metr.StdMetrics,
+                             progress: metr.StdProgress, options: rawu.StdOptions):
+    """
+    updates metrics and progress with the result of one raw file, and stores metrics if it's time to;
+    the file is added to the checkpoint journal, unless it failed (then it's retried on resume)
+    :param job: RawFileJob structure
+    :param report: StdFileReport structure of the file
+    :param metrics: StdMetrics structure
+    :param progress: StdProgress structure
+    :param options: StdOptions structure
+    :return: report
+    """
+    if options.checkpoint_dir and not report.error:
+        chkp.add_to_checkpoint_journal(options.checkpoint_dir, job.source_name, report)
+
+    metr.add_report_to_metrics(metrics, report, job.source_name, job.size)
+    metr.update_progress(progress, metrics, job.size)
+    metr.store_metrics_periodically(metrics, progress, options.metrics_file, options.metrics_interval_sec)
+
+    return report
+
+
+def skip_journaled_raw_file_jobs(jobs, options: rawu.StdOptions):
+    """
+    starts the checkpoint journal and, on resume, skips raw files, completed by the previous run
+    :param jobs: list of RawFileJob structures
+    :param options: StdOptions structure
+    :return: tuple (list of RawFileJob structures to run, list of StdFileReport structures of skipped files)
+    """
+    if not options.checkpoint_dir:
+        return jobs, []
+
+    journal = chkp.start_checkpoint_journal(options)
+
+    left_jobs = []
+    skipped_reports = []
+    for job in jobs:
+        report = chkp.get_journaled_report(journal, job.full_filename, job.source_name)
+        if report is None:
+            left_jobs.append(job)
+        else:
+            skipped_reports.append(report)
+
+    if options.resume:
+        logging.info(str(len(skipped_reports)) + ' raw files are skipped as completed by the previous run, '
+                     + str(len(left_jobs)) + ' raw files are left')
+
+    return left_jobs, skipped_reports
+
+
+def run_raw_file_jobs(jobs, out_dir, num_jobs=dflt.DEF_NUM_JOBS, options: rawu.StdOptions = None):
+    """
+    standardizes all passed raw files, in parallel processes if num_jobs > 1;
+    failure of one file is logged, the file is quarantined, and it doesn't stop handling of other files;
+    progress with ETA is logged after every file, metrics are stored to options.metrics_file periodically;
+    completed files are journaled to options.checkpoint_dir, and skipped if options.resume is set;
+    parallel files are limited by options.memory_budget, if it's set
+
+    :param jobs: list of RawFileJob structures
+    :param out_dir: full path to the directory to store resulting file(s)
+    :param num_jobs: number of parallel processes
+    :param options: StdOptions structure, None for default options
+    :return: list of StdFileReport structures
+    """
+    if options is None:
+        options = rawu.StdOptions()
+
+    jobs, reports = skip_journaled_raw_file_jobs(jobs, options)
+    metrics = metr.StdMetrics()
+    progress = metr.start_progress(jobs)
+
+    if num_jobs <= 1:
+        for job in jobs:
+            try:
+                report = run_raw_file_job(job, out_dir, options)
+            except Exception:
+                report = handle_failed_raw_file_job(job, options)
+            reports.append(handle_done_raw_file_job(job, report, metrics, progress, options))
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=num_jobs) as executor:
+            queued_jobs = collections.deque([(job, get_raw_file_job_memory(job, options)) for job in jobs])
+            futures = {}
+            submit_raw_file_jobs(executor, queued_jobs, futures, out_dir, num_jobs, options)
+            while futures:
+                # wake up periodically even if no file is done, to keep the metrics file fresh
+                done, pending = concurrent.futures.wait(futures.keys(), timeout=options.metrics_interval_sec,
+                                                        return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    job, memory = futures.pop(future)
+                    try:
+                        report = future.result()
+                    except Exception:
+                        report = handle_failed_raw_file_job(job, options)
+                    reports.append(handle_done_raw_file_job(job, report, metrics, progress, options))
+                submit_raw_file_jobs(executor, queued_jobs, futures, out_dir, num_jobs, options)
+
+                if not done:
+                    metr.store_metrics_periodically(metrics, progress, options.metrics_file,
+                                                    options.metrics_interval_sec)
+
+    metr.store_metrics(metrics, options.metrics_file)
+
+    return reports
+
+
+def log_raw_file_reports(reports):
+    """
+    logs per-file error counts and overall summary of the standardization
+    :param reports: list of StdFileReport structures
+    :return: number of quarantined files
+    """
+    num_quarantined = 0
+    num_bad_records = 0
+    for report in reports:
+        if report.records_bad or report.is_quarantined:
+            logging.warning('"' + report.full_filename + '": ' + str(report.records_bad) + ' of '
+                            + str(report.records_total) + ' records are bad'
+                            + (', file is quarantined' if report.is_quarantined else ''))
+        num_quarantined += int(report.is_quarantined)
+        num_bad_records += report.records_bad
+
+    logging.info('Standardized ' + str(len(reports) - num_quarantined) + ' of ' + str(len(reports))
+                 + ' raw files, ' + str(num_bad_records) + ' bad records skipped')
+    if num_quarantined:
+        logging.error(str(num_quarantined) + ' of ' + str(len(reports)) + ' raw files are quarantined')
+
+    return num_quarantined
+
+
+def standardize_raw_sources_in_dir(parsing_dirs, out_dir, source_names=None, num_jobs=dflt.DEF_NUM_JOBS,
+                                   recursive=False, include=None, exclude=None, group_by_pc=False,
+                                   options: rawu.StdOptions = None, drop_duplicates=False):
+    """
+    finds raw files of all passed raw sources in parsing_dirs and stores standardized files in out_dir;
+    out_dir, quarantine and cache dirs are not parsed, even if they are in parsing_dirs
+    :param parsing_dirs: directory or list of directories to parse
+    :param out_dir:
+    :param source_names: names of registered raw sources, None for all registered sources
+    :param num_jobs: number of parallel processes
+    :param recursive: True to parse also all subdirectories
+    :param include: list of glob patterns of files to handle, None for all files
+    :param exclude: list of glob patterns of files to skip
+    :param group_by_pc: True to store standardized files of each PC to its own subdirectory out_dir/<PC_NAME>
+    :param options: StdOptions structure, None for default options
+    :param drop_duplicates: True to skip raw files with the same content as other found files
+    :return: list of StdFileReport structures
+    """
+    logging.info('Start standardization of raw files from "' + str(parsing_dirs) + '" to "' + str(out_dir) + '"')
+
+    # outputs of this and previous runs could be in the parsing dirs, e.g. with default in/out dirs
+    skip_dirs = [out_dir] + ([options.quarantine_dir, options.cache_dir] if options is not None else [])
+    jobs = get_raw_file_jobs(parsing_dirs, source_names, recursive, include, exclude, skip_dirs)
+    logging.info('Found ' + str(len(jobs)) + ' raw files')
+
+    if drop_duplicates:
+        jobs = drop_duplicate_raw_file_jobs(jobs)
+        logging.info(str(len(jobs)) + ' raw files left after dropping of duplicates')
+
+    jobs_by_pc = group_raw_file_jobs_by_pc(jobs)
+    for pc_name, pc_jobs in jobs_by_pc.items():
+        logging.info('PC "' + pc_name + '": ' + str(len(pc_jobs)) + ' raw files')
+        if group_by_pc:
+            for job in pc_jobs:
+                job.out_dir = str(Path(out_dir) / pc_name)
+
+    reports = run_raw_file_jobs(jobs, out_dir, num_jobs, options)
+    log_raw_file_reports(reports)
+
+    return reports
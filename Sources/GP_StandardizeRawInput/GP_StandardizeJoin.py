@@ -0,0 +1,203 @@
+import logging
+from pathlib import Path
+import datetime as dt
+import pandas as pd
+
+import GP_RawInputUtils as rawu
+import GP_StandardizeLayout as layout
+import GP_StandardizeDefaults as dflt
+
+
+def read_std_IPG_real_meas(full_filename):
+    """
+    reads standardized IPG real-meas file
+    :param full_filename:
+    :return: Dataframe with parsed Raw_DateTime column
+    """
+    ipg_df = pd.read_csv(full_filename)
+    ipg_df[rawu.RAW_DATETIME_COLUMN_NAME] = pd.to_datetime(ipg_df[rawu.RAW_DATETIME_COLUMN_NAME])
+
+    return ipg_df
+
+
+def read_std_Script2_sys(full_filename):
+    """
+    reads standardized Script2 overall system file
+    :param full_filename:
+    :return: Dataframe with parsed Start_Raw_DateTime column
+    """
+    sc2_df = pd.read_csv(full_filename)
+    sc2_df[rawu.RAW_START_DATETIME_COLUMN_NAME] = pd.to_datetime(sc2_df[rawu.RAW_START_DATETIME_COLUMN_NAME],
+                                                                 format=rawu.STD_SCRIPT2_DATETIME_FORMAT)
+
+    return sc2_df
+
+
+def join_IPG_with_Script2_df(ipg_df, sc2_df, direction=dflt.DEF_JOIN_DIRECTION,
+                             tolerance_sec=dflt.DEF_JOIN_TOLERANCE_SEC):
+    """
+    as-of joins standardized IPG real-meas samples with Script2 system samples of the same PC:
+    every IPG sample gets the Script2 sample nearest to it (or the last one before it)
+
+    :param ipg_df: standardized IPG real-meas Dataframe
+    :param sc2_df: standardized Script2 overall system Dataframe
+    :param direction: 'nearest' or 'backward'
+    :param tolerance_sec: max distance in seconds between joined samples, None for unlimited
+    :return: joined Dataframe, IPG samples without matching Script2 sample get empty system columns
+    """
+    tolerance = None if tolerance_sec is None else pd.Timedelta(seconds=tolerance_sec)
+
+    ipg_df = ipg_df.sort_values(rawu.RAW_DATETIME_COLUMN_NAME, kind='mergesort')
+    sc2_df = sc2_df.sort_values(rawu.RAW_START_DATETIME_COLUMN_NAME, kind='mergesort')
+
+    joined_df = pd.merge_asof(ipg_df, sc2_df,
+                              left_on=rawu.RAW_DATETIME_COLUMN_NAME, right_on=rawu.RAW_START_DATETIME_COLUMN_NAME,
+                              by=rawu.RAW_PC_NAME_COLUMN_NAME, direction=direction, tolerance=tolerance)
+
+    return joined_df
+
+
+def get_std_join_name(joined_df, taken_names=None):
+    """
+    Construct standardized IPG + Script2 joined filename
+    :param joined_df: joined Dataframe
+    :param taken_names: set of filenames, already used in the directory of the joined file, None for empty set
+    :return: constructed filename
+    """
+    datetimes = joined_df[rawu.RAW_DATETIME_COLUMN_NAME]
+
+    return rawu.get_std_raw_filenames([(joined_df[rawu.RAW_PC_NAME_COLUMN_NAME].iat[0], datetimes.iat[0],
+                                        datetimes.iat[-1], rawu.RAW_IPG_SCRIPT2_JOIN_FILENAME_SUFFIX)],
+                                      taken_names)[0]
+
+
+def get_std_join_out_dir(std_dir, out_dir, ipg_file):
+    """
+    joined file is stored to the same subdirectory of out_dir, as its IPG file in std_dir,
+    e.g. to out_dir/<PC_NAME> for outputs grouped by PC; files from partitions are stored to out_dir itself,
+    partitioning moves them to their own partitions
+    :param std_dir: directory with standardized files
+    :param out_dir: directory to store joined files
+    :param ipg_file: full name of the standardized IPG real-meas file
+    :return: Path of the directory to store the joined file
+    """
+    relative_dir = Path(ipg_file).parent.relative_to(std_dir)
+    if any([layout.is_partition_dir_name(part) for part in relative_dir.parts]):
+        return Path(out_dir)
+
+    return Path(out_dir) / relative_dir
+
+
+def get_std_files_by_pc(std_dir, suffix):
+    """
+    finds standardized files with passed suffix in std_dir (including subdirs and partitions)
+    and groups them by PC name; hidden files and dirs (e.g. temporary ones) are skipped
+    :param std_dir: directory with standardized files
+    :param suffix: standardized filename suffix, e.g. IPG__RM
+    :return: dict PC name -> list of tuples (start datetime, end datetime, full filename), sorted by start
+    """
+    files_by_pc = {}
+
+    for file in Path(std_dir).rglob('*.csv'):
+        if any([part.startswith('.') for part in file.relative_to(std_dir).parts]):
+            continue
+
+        std_parts = rawu.get_std_filename_parts(str(file))
+        if (std_parts is None) or (std_parts.Suffix != suffix):
+            continue
+
+        start_datetime, end_datetime = rawu.get_std_filename_datetimes(std_parts)
+        files_by_pc.setdefault(std_parts.PC_name, []).append((start_datetime, end_datetime, str(file)))
+
+    for files in files_by_pc.values():
+        files.sort()
+
+    return files_by_pc
+
+
+def join_std_IPG_with_Script2_for_pc(pc_name, ipg_files, sc2_files, std_dir, out_dir,
+                                     direction=dflt.DEF_JOIN_DIRECTION, tolerance_sec=dflt.DEF_JOIN_TOLERANCE_SEC):
+    """
+    streams through time-sorted standardized IPG and Script2 files of one PC and stores joined files:
+    one joined file per IPG file, only Script2 files overlapping its time window are read
+
+    :param pc_name:
+    :param ipg_files: sorted list of tuples (start, end, filename) of IPG real-meas files
+    :param sc2_files: sorted list of tuples (start, end, filename) of Script2 overall system files
+    :param std_dir: directory with standardized files
+    :param out_dir: directory to store joined files, see get_std_join_out_dir
+    :param direction: 'nearest' or 'backward'
+    :param tolerance_sec: max distance in seconds between joined samples, None for unlimited
+    :return: list of stored filenames
+    """
+    logging.info('Start join of IPG and Script2 files of PC "' + pc_name + '"')
+
+    slack = rawu.STD_FILENAME_TIME_RESOLUTION
+    if tolerance_sec is not None:
+        slack = slack + dt.timedelta(seconds=tolerance_sec)
+
+    stored_list = []
+    # IPG files with the same start/end (e.g. indexed on collision) give joined files with the same name
+    taken_names_by_dir = {}
+    first_sc2_idx = 0
+    for ipg_start, ipg_end, ipg_file in ipg_files:
+        # Script2 files, which end before current IPG window, are not needed for any later window too
+        while (first_sc2_idx < len(sc2_files)) and (sc2_files[first_sc2_idx][1] + slack < ipg_start) \
+                and (tolerance_sec is not None):
+            first_sc2_idx += 1
+
+        overlap_files = []
+        for sc2_start, sc2_end, sc2_file in sc2_files[first_sc2_idx:]:
+            if (tolerance_sec is not None) and (sc2_start - slack > ipg_end):
+                break
+            overlap_files.append(sc2_file)
+
+        if not overlap_files:
+            logging.info('"' + ipg_file + '": no overlapping Script2 files, join is skipped')
+            continue
+
+        ipg_df = read_std_IPG_real_meas(ipg_file)
+        if ipg_df.empty:
+            continue
+        sc2_df = pd.concat([read_std_Script2_sys(file) for file in overlap_files], ignore_index=True)
+
+        joined_df = join_IPG_with_Script2_df(ipg_df, sc2_df, direction, tolerance_sec)
+
+        join_out_dir = get_std_join_out_dir(std_dir, out_dir, ipg_file)
+        join_out_dir.mkdir(parents=True, exist_ok=True)
+        taken_names = taken_names_by_dir.setdefault(join_out_dir, set())
+        joined_fullname = join_out_dir / get_std_join_name(joined_df, taken_names)
+        logging.info('Joined IPG and Script2 is stored to "' + str(joined_fullname) + '"')
+        joined_df.to_csv(joined_fullname, index=False)
+        stored_list.append(str(joined_fullname))
+
+    return stored_list
+
+
+def join_std_IPG_with_Script2_in_dir(std_dir, out_dir,
+                                     direction=dflt.DEF_JOIN_DIRECTION, tolerance_sec=dflt.DEF_JOIN_TOLERANCE_SEC):
+    """
+    finds all standardized IPG real-meas and Script2 overall system files in std_dir
+    and stores per-PC joined power + system load files in out_dir
+    :param std_dir:
+    :param out_dir:
+    :param direction: 'nearest' or 'backward'
+    :param tolerance_sec: max distance in seconds between joined samples, None for unlimited
+    :return: list of stored filenames
+    """
+    logging.info('Start join of standardized IPG and Script2 files from "' + str(std_dir) + '" to "'
+                 + str(out_dir) + '"')
+
+    ipg_by_pc = get_std_files_by_pc(std_dir, rawu.RAW_IPG_REALMEAS_FILENAME_SUFFIX)
+    sc2_by_pc = get_std_files_by_pc(std_dir, rawu.RAW_SCRIPT2_SYS_FILENAME_SUFFIX)
+
+    stored_list = []
+    for pc_name in sorted(ipg_by_pc.keys()):
+        if pc_name not in sc2_by_pc:
+            logging.info('PC "' + pc_name + '": no standardized Script2 files, join is skipped')
+            continue
+
+        stored_list += join_std_IPG_with_Script2_for_pc(pc_name, ipg_by_pc[pc_name], sc2_by_pc[pc_name], std_dir,
+                                                        out_dir, direction, tolerance_sec)
+
+    return stored_list
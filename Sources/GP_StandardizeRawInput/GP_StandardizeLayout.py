@@ -0,0 +1,187 @@
+import logging
+import os
+from pathlib import Path
+import pandas as pd
+
+import GP_RawInputUtils as rawu
+
+# =======================================
+# ============= CONSTANTS ===============
+# Hive-style partitions: <out_dir>/source=<suffix>/pc=<PC name>/date=<start date>/<standardized filename>
+PARTITION_DELIM = '='
+PARTITION_SOURCE_KEY = 'source'
+PARTITION_PC_KEY = 'pc'
+PARTITION_DATE_KEY = 'date'
+
+COMPACT_TMP_FILE_PREFIX = '.tmp_'
+# =======================================
+
+
+def is_partition_dir_name(name):
+    """
+    :param name: name of the directory
+    :return: True if it's a name of the partition directory, e.g. date=2022-07-14
+    """
+    return PARTITION_DELIM in name
+
+
+def get_std_partition_dir(out_dir, std_parts: rawu.StdFilenameParts):
+    """
+    :param out_dir: root directory of standardized files
+    :param std_parts: StdFilenameParts structure of the standardized file
+    :return: Path of the partition directory of the file
+    """
+    return Path(out_dir) / (PARTITION_SOURCE_KEY + PARTITION_DELIM + std_parts.Suffix) \
+           / (PARTITION_PC_KEY + PARTITION_DELIM + std_parts.PC_name) \
+           / (PARTITION_DATE_KEY + PARTITION_DELIM + std_parts.StartDate)
+
+
+def partition_std_outputs(out_dir):
+    """
+    moves standardized files, which are not in partitions yet, to their partitions in out_dir;
+    files are renamed, not copied, so it's cheap on the same filesystem
+    :param out_dir: root directory of standardized files
+    :return: list of full names of moved files
+    """
+    logging.info('Start partitioning of standardized files in "' + str(out_dir) + '"')
+
+    moved_list = []
+    for file in sorted(Path(out_dir).rglob('*')):
+        relative_parts = file.relative_to(out_dir).parts
+        if (not file.is_file()) or file.name.startswith('.') \
+                or any([is_partition_dir_name(part) for part in relative_parts[:-1]]):
+            continue
+
+        std_parts = rawu.get_std_filename_parts(str(file))
+        if std_parts is None:
+            continue
+
+        partition_dir = get_std_partition_dir(out_dir, std_parts)
+        partition_dir.mkdir(parents=True, exist_ok=True)
+
+        moved_fullname = partition_dir / file.name
+        os.replace(file, moved_fullname)
+        moved_list.append(str(moved_fullname))
+
+    logging.info(str(len(moved_list)) + ' standardized files are moved to partitions')
+
+    return moved_list
+
+
+# =======================================
+# ============== Compaction =============
+
+def get_compactable_std_files(std_dir):
+    """
+    finds standardized files in std_dir (including subdirs and partitions), which could be merged together,
+    and groups them by directory, PC and suffix
+    :param std_dir: root directory of standardized files
+    :return: dict (directory, PC name, suffix) -> list of tuples (std filename parts, full filename),
+             sorted by start
+    """
+    files_by_group = {}
+
+    for file in Path(std_dir).rglob('*.csv'):
+        if file.name.startswith('.'):
+            continue
+
+        std_parts = rawu.get_std_filename_parts(str(file))
+        if (std_parts is None) or (std_parts.Suffix not in rawu.STD_COMPACTABLE_FILENAME_SUFFIXES):
+            continue
+
+        try:
+            start_datetime, end_datetime = rawu.get_std_filename_datetimes(std_parts)
+        except ValueError:
+            logging.debug('"' + file.name + '" has no standardized timestamps in its name')
+            continue
+
+        files_by_group.setdefault((str(file.parent), std_parts.PC_name, std_parts.Suffix), []).append(
+            (start_datetime, end_datetime, std_parts, str(file)))
+
+    for files in files_by_group.values():
+        files.sort(key=lambda item: (item[0], item[1], item[3]))
+
+    return {group: [(std_parts, full_filename) for start, end, std_parts, full_filename in files]
+            for group, files in files_by_group.items()}
+
+
+def merge_std_files(files):
+    """
+    merges time-sorted standardized files of the same PC and suffix to one file, and removes merged files
+    :param files: list of tuples (std filename parts, full filename), sorted by start
+    :return: full name of the merged file
+    """
+    first_parts = files[0][0]
+    last_parts = max([std_parts for std_parts, full_filename in files],
+                     key=lambda std_parts: rawu.get_std_filename_datetimes(std_parts)[1])
+
+    out_dir = Path(files[0][1]).parent
+    # merged files are removed, so their names could be reused
+    taken_names = rawu.get_dir_filenames(out_dir) - {Path(full_filename).name for std_parts, full_filename in files}
+    merged_name = rawu.get_std_raw_filenames([(first_parts.PC_name, rawu.get_std_filename_datetimes(first_parts)[0],
+                                               rawu.get_std_filename_datetimes(last_parts)[1], first_parts.Suffix)],
+                                             taken_names)[0]
+    merged_fullname = out_dir / merged_name
+    tmp_fullname = out_dir / (COMPACT_TMP_FILE_PREFIX + merged_name)
+
+    merged_df = pd.concat([pd.read_csv(full_filename) for std_parts, full_filename in files], ignore_index=True)
+    merged_df.to_csv(tmp_fullname, index=False)
+
+    # the merged file is in place before any merged file is removed, so a killed run never loses data;
+    # the merged file could reuse the name of one of them, which is replaced then
+    os.replace(tmp_fullname, merged_fullname)
+    for std_parts, full_filename in files:
+        if Path(full_filename).name != merged_name:
+            Path(full_filename).unlink()
+
+    logging.info(str(len(files)) + ' standardized files are merged to "' + str(merged_fullname) + '"')
+
+    return str(merged_fullname)
+
+
+def compact_std_files(files, target_bytes):
+    """
+    merges consecutive small standardized files of one group to files of about target_bytes
+    :param files: list of tuples (std filename parts, full filename), sorted by start
+    :param target_bytes: target size of the merged files in bytes
+    :return: list of full names of the merged files
+    """
+    merged_list = []
+
+    group = []
+    group_bytes = 0
+    for std_parts, full_filename in files + [(None, None)]:
+        size = Path(full_filename).stat().st_size if full_filename is not None else 0
+
+        if (full_filename is None) or (group_bytes + size > target_bytes):
+            if len(group) > 1:
+                merged_list.append(merge_std_files(group))
+            group = []
+            group_bytes = 0
+
+        if (full_filename is not None) and (size < target_bytes):
+            group.append((std_parts, full_filename))
+            group_bytes += size
+
+    return merged_list
+
+
+def compact_std_outputs(std_dir, target_bytes):
+    """
+    merges small standardized time series files in every directory (partition) of std_dir,
+    so downstream scans open far fewer files
+    :param std_dir: root directory of standardized files
+    :param target_bytes: target size of the merged files in bytes
+    :return: list of full names of the merged files
+    """
+    logging.info('Start compaction of standardized files in "' + str(std_dir) + '"')
+
+    merged_list = []
+    for group, files in sorted(get_compactable_std_files(std_dir).items()):
+        merged_list += compact_std_files(files, target_bytes)
+
+    logging.info(str(len(merged_list)) + ' merged standardized files are stored')
+
+    return merged_list
+
+# =======================================
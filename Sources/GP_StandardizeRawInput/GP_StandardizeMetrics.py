@@ -0,0 +1,312 @@
+import logging
+import json
+import os
+import time
+import datetime as dt
+from pathlib import Path
+from dataclasses import dataclass, field
+
+import GP_RawInputUtils as rawu
+
+# =======================================
+# ============= CONSTANTS ===============
+METRICS_PREFIX = 'gp_std_'
+
+METRIC_FILES = 'files_total'
+METRIC_ROWS = 'rows_total'
+METRIC_BAD_ROWS = 'bad_rows_total'
+METRIC_READ_BYTES = 'read_bytes_total'
+METRIC_WRITTEN_BYTES = 'written_bytes_total'
+METRIC_ERRORS = 'errors_total'
+METRIC_FILE_SECONDS = 'file_seconds'
+METRIC_STAGE_SECONDS = 'stage_seconds'
+METRIC_PENDING_FILES = 'pending_files'
+METRIC_PENDING_BYTES = 'pending_bytes'
+METRIC_ETA_SECONDS = 'eta_seconds'
+
+FILE_STATUS_OK = 'ok'
+FILE_STATUS_QUARANTINED = 'quarantined'
+ERROR_TYPE_QUARANTINED = 'Quarantined'
+
+# upper bounds of latency histogram buckets in seconds, the last one is +Inf
+LATENCY_BUCKETS_SEC = [0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, float('inf')]
+
+METRICS_JSON_FILE_EXT = '.json'
+METRICS_TMP_FILE_SUFFIX = '.tmp'
+# =======================================
+
+
+# =======================================
+# ============= STD TYPES ===============
+@dataclass()
+class StdMetrics:
+    """
+    in-process metrics of the standardization;
+    every metric is dict of sorted tuples of (label, value) pairs -> value
+    """
+    counters: dict = field(default_factory=dict)
+    gauges: dict = field(default_factory=dict)
+    # histogram values are lists [bucket counts..., sum, count]
+    histograms: dict = field(default_factory=dict)
+
+
+@dataclass()
+class StdProgress:
+    files_total: int = 0
+    bytes_total: int = 0
+    files_done: int = 0
+    bytes_done: int = 0
+    start_time: float = 0.0
+    last_store_time: float = 0.0
+
+
+# =======================================
+
+
+def get_labels_key(labels: dict):
+    """
+    :param labels: dict label name -> value
+    :return: hashable key of the labels
+    """
+    return tuple(sorted([(name, str(value)) for name, value in labels.items()]))
+
+
+def inc_counter(metrics: StdMetrics, name, labels: dict, value=1):
+    """
+    increases counter
+    :param metrics: StdMetrics structure
+    :param name: metric name
+    :param labels: dict label name -> value
+    :param value: increment
+    :return: None
+    """
+    metric = metrics.counters.setdefault(name, {})
+    key = get_labels_key(labels)
+    metric[key] = metric.get(key, 0) + value
+
+
+def set_gauge(metrics: StdMetrics, name, labels: dict, value):
+    """
+    sets gauge value
+    :param metrics: StdMetrics structure
+    :param name: metric name
+    :param labels: dict label name -> value
+    :param value: new value
+    :return: None
+    """
+    metrics.gauges.setdefault(name, {})[get_labels_key(labels)] = value
+
+
+def observe_histogram(metrics: StdMetrics, name, labels: dict, value):
+    """
+    adds observed value to histogram with LATENCY_BUCKETS_SEC buckets
+    :param metrics: StdMetrics structure
+    :param name: metric name
+    :param labels: dict label name -> value
+    :param value: observed value
+    :return: None
+    """
+    metric = metrics.histograms.setdefault(name, {})
+    key = get_labels_key(labels)
+    if key not in metric:
+        metric[key] = [0] * len(LATENCY_BUCKETS_SEC) + [0.0, 0]
+
+    hist = metric[key]
+    for i, bucket in enumerate(LATENCY_BUCKETS_SEC):
+        if value <= bucket:
+            hist[i] += 1
+    hist[-2] += value
+    hist[-1] += 1
+
+
+def get_written_bytes(report: rawu.StdFileReport):
+    """
+    :param report: StdFileReport structure
+    :return: total size of the files, stored for the raw file
+    """
+    written_bytes = 0
+    for out_file in report.out_files:
+        try:
+            written_bytes += Path(out_file).stat().st_size
+        except OSError:
+            continue
+
+    return written_bytes
+
+
+def add_report_to_metrics(metrics: StdMetrics, report: rawu.StdFileReport, source_name, size):
+    """
+    updates metrics with the result of standardization of one raw file
+    :param metrics: StdMetrics structure
+    :param report: StdFileReport structure
+    :param source_name: name of the raw source of the file
+    :param size: size of the raw file in bytes
+    :return: None
+    """
+    source_labels = {'source': source_name}
+
+    status = FILE_STATUS_QUARANTINED if report.is_quarantined else FILE_STATUS_OK
+    inc_counter(metrics, METRIC_FILES, dict(source_labels, status=status))
+    inc_counter(metrics, METRIC_ROWS, source_labels, report.records_total - report.records_bad)
+    inc_counter(metrics, METRIC_BAD_ROWS, source_labels, report.records_bad)
+    inc_counter(metrics, METRIC_READ_BYTES, source_labels, size)
+    inc_counter(metrics, METRIC_WRITTEN_BYTES, source_labels, get_written_bytes(report))
+
+    if report.error:
+        # error is formatted as "<exception type>: <message>"
+        inc_counter(metrics, METRIC_ERRORS, dict(source_labels, type=report.error.split(':')[0]))
+    elif report.is_quarantined:
+        inc_counter(metrics, METRIC_ERRORS, dict(source_labels, type=ERROR_TYPE_QUARANTINED))
+
+    if report.seconds:
+        observe_histogram(metrics, METRIC_FILE_SECONDS, source_labels, report.seconds)
+    for stage, seconds in report.stage_seconds.items():
+        observe_histogram(metrics, METRIC_STAGE_SECONDS, dict(source_labels, stage=stage), seconds)
+
+
+# =======================================
+# =============== Progress ==============
+
+def start_progress(jobs):
+    """
+    :param jobs: list of RawFileJob structures to be handled
+    :return: StdProgress structure
+    """
+    return StdProgress(files_total=len(jobs), bytes_total=sum([job.size for job in jobs]),
+                       start_time=time.monotonic())
+
+
+def get_eta_seconds(progress: StdProgress):
+    """
+    estimates remaining time from the throughput in bytes so far
+    :param progress: StdProgress structure
+    :return: remaining seconds, None if not known yet
+    """
+    if progress.bytes_done <= 0:
+        return None
+
+    elapsed = time.monotonic() - progress.start_time
+
+    return elapsed * (progress.bytes_total - progress.bytes_done) / progress.bytes_done
+
+
+def update_progress(progress: StdProgress, metrics: StdMetrics, size):
+    """
+    marks one more raw file as done, updates progress gauges and logs progress with ETA
+    :param progress: StdProgress structure
+    :param metrics: StdMetrics structure
+    :param size: size of the done raw file in bytes
+    :return: None
+    """
+    progress.files_done += 1
+    progress.bytes_done += size
+
+    eta_seconds = get_eta_seconds(progress)
+
+    set_gauge(metrics, METRIC_PENDING_FILES, {}, progress.files_total - progress.files_done)
+    set_gauge(metrics, METRIC_PENDING_BYTES, {}, progress.bytes_total - progress.bytes_done)
+    if eta_seconds is not None:
+        set_gauge(metrics, METRIC_ETA_SECONDS, {}, round(eta_seconds, 3))
+
+    percent = 100 * progress.bytes_done / progress.bytes_total if progress.bytes_total else 100
+    logging.info('Progress: ' + str(progress.files_done) + ' of ' + str(progress.files_total) + ' raw files, '
+                 + str(round(percent)) + '% of bytes'
+                 + ('' if eta_seconds is None else ', ETA ' + str(dt.timedelta(seconds=round(eta_seconds)))))
+
+
+# =======================================
+# ================ Export ===============
+
+def format_labels(labels_key, extra_labels=()):
+    """
+    :param labels_key: key of the labels, see get_labels_key
+    :param extra_labels: additional tuple of (label, value) pairs
+    :return: labels in Prometheus text format, e.g. {source="IPG"}
+    """
+    pairs = list(labels_key) + list(extra_labels)
+    if not pairs:
+        return ''
+
+    return '{' + ','.join([name + '="' + value + '"' for name, value in pairs]) + '}'
+
+
+def format_metrics_prometheus(metrics: StdMetrics):
+    """
+    :param metrics: StdMetrics structure
+    :return: metrics in Prometheus text exposition format
+    """
+    lines = []
+    for metric_type, metric_dicts in [('counter', metrics.counters), ('gauge', metrics.gauges)]:
+        for name, metric in sorted(metric_dicts.items()):
+            lines.append('# TYPE ' + METRICS_PREFIX + name + ' ' + metric_type)
+            for labels_key, value in sorted(metric.items()):
+                lines.append(METRICS_PREFIX + name + format_labels(labels_key) + ' ' + str(value))
+
+    for name, metric in sorted(metrics.histograms.items()):
+        lines.append('# TYPE ' + METRICS_PREFIX + name + ' histogram')
+        for labels_key, hist in sorted(metric.items()):
+            for bucket, count in zip(LATENCY_BUCKETS_SEC, hist):
+                le = '+Inf' if bucket == float('inf') else str(bucket)
+                lines.append(METRICS_PREFIX + name + '_bucket' + format_labels(labels_key, [('le', le)]) + ' '
+                             + str(count))
+            lines.append(METRICS_PREFIX + name + '_sum' + format_labels(labels_key) + ' ' + str(hist[-2]))
+            lines.append(METRICS_PREFIX + name + '_count' + format_labels(labels_key) + ' ' + str(hist[-1]))
+
+    return '\n'.join(lines) + '\n'
+
+
+def get_metrics_dict(metrics: StdMetrics):
+    """
+    :param metrics: StdMetrics structure
+    :return: json-serializable dict with all metrics
+    """
+    def get_items(metric_dicts):
+        return [{'name': METRICS_PREFIX + name, 'labels': dict(labels_key), 'value': value}
+                for name, metric in sorted(metric_dicts.items()) for labels_key, value in sorted(metric.items())]
+
+    histograms = [{'name': METRICS_PREFIX + name, 'labels': dict(labels_key),
+                   'buckets': {str(bucket): count for bucket, count in zip(LATENCY_BUCKETS_SEC, hist)},
+                   'sum': hist[-2], 'count': hist[-1]}
+                  for name, metric in sorted(metrics.histograms.items()) for labels_key, hist in sorted(metric.items())]
+
+    return {'counters': get_items(metrics.counters), 'gauges': get_items(metrics.gauges), 'histograms': histograms}
+
+
+def store_metrics(metrics: StdMetrics, metrics_file):
+    """
+    stores metrics to the file atomically, so readers never see it partially written:
+    json for .json files, Prometheus text format (e.g. for textfile collectors) otherwise
+    :param metrics: StdMetrics structure
+    :param metrics_file: full name of the metrics file, nothing is stored if empty
+    :return: None
+    """
+    if not metrics_file:
+        return
+
+    if Path(metrics_file).suffix == METRICS_JSON_FILE_EXT:
+        content = json.dumps(get_metrics_dict(metrics), indent=1)
+    else:
+        content = format_metrics_prometheus(metrics)
+
+    Path(metrics_file).parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = str(metrics_file) + METRICS_TMP_FILE_SUFFIX
+    with open(tmp_file, 'w') as out_file:
+        out_file.write(content)
+    os.replace(tmp_file, metrics_file)
+
+
+def store_metrics_periodically(metrics: StdMetrics, progress: StdProgress, metrics_file, interval_sec):
+    """
+    stores metrics, if they were not stored during the last interval_sec
+    :param metrics: StdMetrics structure
+    :param progress: StdProgress structure
+    :param metrics_file: full name of the metrics file, nothing is stored if empty
+    :param interval_sec: min interval between stores in seconds
+    :return: None
+    """
+    now = time.monotonic()
+    if now - progress.last_store_time >= interval_sec:
+        store_metrics(metrics, metrics_file)
+        progress.last_store_time = now
+
+# =======================================
@@ -1,12 +1,54 @@
 import logging
 from pathlib import Path
 import io
+import mmap
+import re
+import datetime as dt
+from dataclasses import dataclass, field
+import os
 import pandas as pd
 from pprint import pprint as pp
 
 import GP_RawInputUtils as rawu
+import GP_RawInputValidation as rawv
+import GP_ParsedCache as cache
+import GP_RawSourceRegistry as reg
+import GP_StandardizeEngine as engine
+import GP_StandardizeCheckpoint as chkp
+
+# version of IPG parsing, must be increased on every change of the parsed tables
+IPG_PARSER_VERSION = 2
+
+CACHE_REAL_MEAS_TABLE_NAME = 'real_meas'
+CACHE_CUM_MEAS_TABLE_NAME = 'cum_meas'
+CACHE_REPORT_TABLE_NAME = 'report'
 
 IPG_TIME_COLUMN_NAME = "System Time"
+IPG_ELAPSED_TIME_COLUMN_NAME = "Elapsed Time (sec)"
+IPG_TIME_FORMAT = "%H:%M:%S:%f"
+
+IPG_CSV_DELIM = ','
+IPG_CUM_MEAS_DELIM = '='
+IPG_FILE_ENCODING = 'utf-8'
+
+IPG_TIME_REGEX = re.compile(r'^\d{1,2}:\d{2}:\d{2}:\d{1,6}$')
+
+# e.g. "Processor Power_0(Watt)" -> energy "Cumulative Processor Energy_0 (Joules)" in cumulative measurements
+IPG_POWER_COLUMN_REGEX = re.compile(r'^(?P<name>.+) Power_(?P<idx>\d+)\s*\(Watt\)$')
+IPG_INTERVAL_ENERGY_COLUMN_FORMAT = 'Integrated {name} Energy_{idx}(Joules)'
+IPG_CUM_ENERGY_COLUMN_FORMAT = 'Integrated Cumulative {name} Energy_{idx}(Joules)'
+IPG_CUM_MEAS_ENERGY_NAME_FORMAT = 'Cumulative {name} Energy_{idx} (Joules)'
+IPG_CUM_MEAS_INTEGRATED_ENERGY_NAME_FORMAT = 'Integrated {name} Energy_{idx} (Joules)'
+IPG_INTERVAL_ENERGY_COLUMN_REGEX = re.compile(r'^Integrated (?P<name>.+) Energy_(?P<idx>\d+)\(Joules\)$')
+
+# max relative difference between integrated and reported energy, which is not reported as mismatch
+IPG_ENERGY_CHECK_TOLERANCE = 0.05
+
+IPG_TMP_FILE_PREFIX = '.tmp_'
+
+# estimated peak memory of standardization per byte of raw real-time measurements: whole file, and one chunk
+IPG_MEMORY_PER_RAW_BYTE = 10
+IPG_CHUNK_MEMORY_PER_RAW_BYTE = 50
 
 
 def get_delimiter_pos_in_IPG(lines):
@@ -28,84 +70,340 @@ def get_delimiter_pos_in_IPG(lines):
     return pos
 
 
+def read_IPG_sections(full_filename):
+    """
+    reads raw IPG file and splits it to sections
+    :param full_filename: full name (including full path) of the raw IPG file
+    :return: tuple (real-time measurements lines, cumulative measurements lines),
+             None if no sections delimiter found
+    """
+    # read original (possibly compressed) file to strings, line by line
+    with rawu.open_raw_file(full_filename) as IPG_file:
+        real_meas_lines = []
+        for line in IPG_file:
+            if line.strip() == '':
+                break
+            real_meas_lines.append(line)
+        else:
+            return None
+
+        cum_meas_lines = IPG_file.readlines()
+
+    return real_meas_lines, cum_meas_lines
+
+
+def validate_IPG_real_meas_lines(meas_lines):
+    """
+    checks csv-lines of IPG real measurements: every row must have the same number of fields as the header
+    and a valid system time
+    :param meas_lines: array of strings in csv-format, starting with the header
+    :return: tuple (list of valid lines, starting with the header; list of tuples (line number, line, reason)),
+             None instead of lists if the header itself is wrong
+    """
+    header_fields = meas_lines[0].strip().split(IPG_CSV_DELIM) if meas_lines else []
+    if IPG_TIME_COLUMN_NAME not in header_fields:
+        return None
+
+    time_idx = header_fields.index(IPG_TIME_COLUMN_NAME)
+    num_fields = len(header_fields)
+
+    good_lines = [meas_lines[0]]
+    bad_lines = []
+    for i in range(1, len(meas_lines)):
+        reason = get_IPG_real_meas_line_error(meas_lines[i], num_fields, time_idx)
+        if reason is None:
+            good_lines.append(meas_lines[i])
+        else:
+            bad_lines.append((i, meas_lines[i], reason))
+
+    return good_lines, bad_lines
+
+
+def get_IPG_real_meas_line_error(line, num_fields, time_idx):
+    """
+    checks one csv-line of IPG real measurements
+    :param line: csv-line
+    :param num_fields: number of fields in the header
+    :param time_idx: index of the system time field
+    :return: reason string for bad line, None for valid one
+    """
+    fields = line.strip().split(IPG_CSV_DELIM)
+    if len(fields) != num_fields:
+        return 'wrong number of fields ' + str(len(fields))
+    elif not IPG_TIME_REGEX.match(fields[time_idx]):
+        return 'wrong system time'
+
+    return None
+
+
+def get_IPG_time_window_slice(meas_lines, time_idx, filename_parts, align_state, options: rawu.StdOptions):
+    """
+    aligns only system times of csv-lines of IPG real measurements, and finds the lines within the time window
+    by binary search on the aligned datetimes, so other fields of the lines out of the window are never parsed
+
+    :param meas_lines: list of valid csv-lines without the header
+    :param time_idx: index of the system time field
+    :param filename_parts: parsed RawInputFilenameParts structure
+    :param align_state: DatetimeAlignState structure, updated as by rawu.align_datetime_chunk;
+                        None to align dates from the filename
+    :param options: StdOptions structure with the time window
+    :return: tuple (start index, end index of the lines within the window,
+                    DatetimeAlignState structure to align the lines within the window, None if there are no such lines)
+    """
+    times_serie = pd.to_datetime(pd.Series([line.rstrip().split(IPG_CSV_DELIM)[time_idx] for line in meas_lines]),
+                                 format=IPG_TIME_FORMAT)
+    if align_state is None:
+        datetimes_serie = rawu.get_aligned_datetime_serie(times_serie, filename_parts)
+    else:
+        datetimes_serie = rawu.align_datetime_chunk(times_serie, align_state)
+
+    start_idx, end_idx = rawu.get_time_window_slice(datetimes_serie, options)
+    if start_idx == end_idx:
+        return start_idx, end_idx, None
+
+    return start_idx, end_idx, rawu.DatetimeAlignState(cur_date=datetimes_serie.iat[start_idx].date())
+
+
 def get_IPG_timestamps(real_meas_df):
     """
     extract start/end timestamps from IPG real-time measurement Dataframe
     :param real_meas_df: real-tiIPG meas dataframe
     :return: MeasTimestamps structure
     """
-    start_date = real_meas_df.at[0, rawu.RAW_DATE_COLUMN_NAME]
-    start_time = real_meas_df.at[0, rawu.RAW_TIME_COLUMN_NAME]
-    end_date = real_meas_df.iloc[-1].at[rawu.RAW_DATE_COLUMN_NAME]
-    end_time = real_meas_df.iloc[-1].at[rawu.RAW_TIME_COLUMN_NAME]
+    start_date = real_meas_df[rawu.RAW_DATE_COLUMN_NAME].iat[0].date()
+    start_time = real_meas_df[rawu.RAW_TIME_COLUMN_NAME].iat[0]
+    end_date = real_meas_df[rawu.RAW_DATE_COLUMN_NAME].iat[-1].date()
+    end_time = real_meas_df[rawu.RAW_TIME_COLUMN_NAME].iat[-1]
 
     meas_timestamps = rawu.CumMeasTimestamps(str(start_date), str(start_time), str(end_date), str(end_time))
 
     return meas_timestamps
 
 
-def transform_IPG_real_meas_to_df(meas_lines, filename_parts):
+def transform_IPG_real_meas_to_df(meas_lines, filename_parts, energy=False, align_state=None):
     """
     transforms list of csv-lines, read from IPG for real measurements, to pandas Dataframe
 
     :param meas_lines: array of strings in csv-format
     :param filename_parts: parsed RawInputFilenameParts structure
+    :param energy: True to add columns with integrated energy, see add_IPG_energy_columns
+    :param align_state: DatetimeAlignState structure, if meas_lines is not the first chunk of measurements;
+                        None to align dates from the filename
 
     :return: converted pandas Dataframe
     """
     # covert IPG csv to Dataframe
     # see https://stackoverflow.com/questions/42171709/creating-pandas-dataframe-from-a-list-of-strings
-    meas_df = pd.read_csv(io.StringIO('\n'.join(meas_lines)), delim_whitespace=False)
+    # lines are parsed as encoded bytes, as StringIO keeps 4 bytes per character;
+    # numeric columns are downcast at once, before other columns are added
+    csv_bytes = io.BytesIO('\n'.join(meas_lines).encode(IPG_FILE_ENCODING))
+    meas_df = rawu.downcast_std_df(pd.read_csv(csv_bytes, delim_whitespace=False, encoding=IPG_FILE_ENCODING))
+    del csv_bytes
 
     # set type of 'System Time' column to datetime manually, as it could not be recognized automatically
     # And then rename the resulting Datetime column accordingly
-    times_serie = pd.to_datetime(meas_df['System Time'], format="%H:%M:%S:%f")
-    datetimes_serie = rawu.get_aligned_datetime_serie(times_serie, filename_parts)
+    times_serie = pd.to_datetime(meas_df[IPG_TIME_COLUMN_NAME], format=IPG_TIME_FORMAT)
+    if align_state is None:
+        datetimes_serie = rawu.get_aligned_datetime_serie(times_serie, filename_parts)
+    else:
+        datetimes_serie = rawu.align_datetime_chunk(times_serie, align_state)
     datetimes_serie.name = rawu.RAW_DATETIME_COLUMN_NAME
 
-    # get raw date column from calculated datetime and rename the column accordingly
-    dates_serie = datetimes_serie.dt.date
+    # get raw date column from calculated datetime and rename the column accordingly;
+    # it's kept as native datetime64 (at midnight) instead of Python date objects, and it's stored as date only
+    dates_serie = datetimes_serie.dt.normalize()
     dates_serie.name = rawu.RAW_DATE_COLUMN_NAME
 
     # set standard column name for reported system times
     meas_df.rename(columns={IPG_TIME_COLUMN_NAME: rawu.RAW_TIME_COLUMN_NAME}, inplace=True)
 
     # create column with PC NAME
-    pc_name_serie = rawu.get_pc_name_serie(filename_parts.PC_name, len(dates_serie.index))
+    pc_name_serie = rawu.get_pc_name_serie(filename_parts.PC_name, len(dates_serie.index)).astype('category')
     # pp(pc_name_serie)
 
-    # concat all data to one table
-    meas_df = pd.concat([pc_name_serie, datetimes_serie, dates_serie, meas_df], axis=1)
+    # put all data to one table; columns are inserted in place, so the measurements are not copied
+    for serie in [dates_serie, datetimes_serie, pc_name_serie]:
+        meas_df.insert(0, serie.name, serie)
 
     # set DateTime as Index column
     # meas_df.set_index(rawu.RAW_DATETIME_COLUMN_NAME, inplace=True)
 
+    if energy:
+        meas_df = add_IPG_energy_columns(meas_df)
+
     # finally return the result
     return meas_df
 
 
-def get_std_IPG_real_meas_name(meas_timestamps, filename_parts):
+def get_IPG_power_columns(meas_df):
+    """
+    finds columns with instantaneous power in IPG real-time measurements
+    :param meas_df: IPG real-time measurements Dataframe
+    :return: list of tuples (column name, measured domain name, domain index), e.g. ("IA Power_0(Watt)", "IA", "0")
+    """
+    power_columns = []
+    for column in meas_df.columns:
+        match = IPG_POWER_COLUMN_REGEX.match(str(column))
+        if match is not None:
+            power_columns.append((column, match.group('name'), match.group('idx')))
+
+    return power_columns
+
+
+def get_IPG_interval_seconds(meas_df):
+    """
+    gets length of the interval between every row and the previous one
+    :param meas_df: standardized IPG real-time measurements Dataframe
+    :return: float Serie with interval lengths in seconds, 0 for the 1st row
+    """
+    # downcast columns are integrated in float64, as they were parsed
+    if IPG_ELAPSED_TIME_COLUMN_NAME in meas_df.columns:
+        elapsed_serie = pd.to_numeric(meas_df[IPG_ELAPSED_TIME_COLUMN_NAME], errors='coerce').astype('float64')
+        interval_serie = elapsed_serie.diff()
+    else:
+        interval_serie = meas_df[rawu.RAW_DATETIME_COLUMN_NAME].diff().dt.total_seconds()
+
+    return interval_serie.fillna(0.0)
+
+
+def add_IPG_energy_columns(meas_df):
+    """
+    integrates every power column of IPG real-time measurements by trapezoidal rule:
+    adds energy of the interval till every row and cumulative energy since the 1st row
+    :param meas_df: standardized IPG real-time measurements Dataframe
+    :return: Dataframe with added energy columns
+    """
+    interval_serie = get_IPG_interval_seconds(meas_df)
+
+    energy_columns = {}
+    for column, name, idx in get_IPG_power_columns(meas_df):
+        power_serie = pd.to_numeric(meas_df[column], errors='coerce').astype('float64')
+        interval_energy_serie = ((power_serie + power_serie.shift(1)) / 2 * interval_serie).fillna(0.0)
+
+        energy_columns[IPG_INTERVAL_ENERGY_COLUMN_FORMAT.format(name=name, idx=idx)] = interval_energy_serie
+        energy_columns[IPG_CUM_ENERGY_COLUMN_FORMAT.format(name=name, idx=idx)] = interval_energy_serie.cumsum()
+
+    # columns are added to a shallow copy, so the measurements are not copied
+    energy_df = meas_df.copy(deep=False)
+    for energy_column, energy_serie in energy_columns.items():
+        energy_df[energy_column] = energy_serie
+
+    return energy_df
+
+
+def get_IPG_energy_windows_df(meas_df, window_sec):
+    """
+    sums integrated energy of IPG real-time measurements by time windows
+    :param meas_df: standardized IPG real-time measurements Dataframe with energy columns
+    :param window_sec: length of the windows in seconds
+    :return: Dataframe with one row per window: start and end of the window, number of rows and energy totals
+    """
+    energy_columns = [IPG_INTERVAL_ENERGY_COLUMN_FORMAT.format(name=name, idx=idx)
+                      for column, name, idx in get_IPG_power_columns(meas_df)]
+
+    window = pd.Timedelta(seconds=window_sec)
+    window_starts = meas_df[rawu.RAW_DATETIME_COLUMN_NAME].dt.floor(window)
+    window_starts.name = rawu.RAW_START_DATETIME_COLUMN_NAME
+
+    grouped = meas_df[energy_columns].groupby(window_starts, sort=True)
+    windows_df = grouped.sum()
+    windows_df.insert(0, rawu.SAMPLES_COLUMN_NAME, grouped.size())
+    windows_df = windows_df.reset_index()
+
+    windows_df.insert(1, rawu.RAW_END_DATETIME_COLUMN_NAME, windows_df[rawu.RAW_START_DATETIME_COLUMN_NAME] + window)
+    windows_df.insert(0, rawu.RAW_PC_NAME_COLUMN_NAME, meas_df[rawu.RAW_PC_NAME_COLUMN_NAME].iloc[0])
+
+    return windows_df
+
+
+def merge_IPG_energy_windows_dfs(windows_dfs):
+    """
+    merges energy windows of chunks of IPG real-time measurements: totals of the same window are added
+    :param windows_dfs: list of Dataframes, created by get_IPG_energy_windows_df
+    :return: merged Dataframe with the same columns
+    """
+    windows_df = pd.concat(windows_dfs, ignore_index=True)
+
+    return windows_df.groupby([rawu.RAW_PC_NAME_COLUMN_NAME, rawu.RAW_START_DATETIME_COLUMN_NAME,
+                               rawu.RAW_END_DATETIME_COLUMN_NAME], sort=True, as_index=False).sum()
+
+
+def check_IPG_energy_totals(windows_df, cum_meas_dict, full_filename=''):
     """
-     Construct standardized raw real-meas IPG filename
-    :param meas_timestamps: MeasTimestamps structure with timestamps
+    cross-checks integrated energy totals with the energy, reported in IPG cumulative measurements
+    :param windows_df: Dataframe with energy windows, created by get_IPG_energy_windows_df
+    :param cum_meas_dict: dict with cumulative measurements
+    :param full_filename: name of the raw file, used for logging
+    :return: dict cumulative measurement name -> integrated energy total, to be added to cumulative measurements
+    """
+    totals_dict = {}
+    for column in windows_df.columns:
+        match = IPG_INTERVAL_ENERGY_COLUMN_REGEX.match(str(column))
+        if match is None:
+            continue
+
+        name, idx = match.group('name'), match.group('idx')
+        total = float(windows_df[column].sum())
+        totals_dict[IPG_CUM_MEAS_INTEGRATED_ENERGY_NAME_FORMAT.format(name=name, idx=idx)] = total
+
+        reported_name = IPG_CUM_MEAS_ENERGY_NAME_FORMAT.format(name=name, idx=idx)
+        try:
+            reported = float(cum_meas_dict[reported_name])
+        except (KeyError, TypeError, ValueError):
+            continue
+
+        if abs(total - reported) > IPG_ENERGY_CHECK_TOLERANCE * abs(reported):
+            logging.warning('"' + str(full_filename) + '": integrated ' + name + ' energy ' + str(round(total, 3))
+                            + ' J differs from reported ' + str(reported) + ' J')
+
+    return totals_dict
+
+
+def get_std_IPG_filenames(start_datetime, end_datetime, filename_parts, suffixes, claim_func=None):
+    """
+    creates standardized CSV-filenames of all outputs of one raw IPG file in one pass
+    :param start_datetime: typed datetime of the first real-time measurement
+    :param end_datetime: typed datetime of the last real-time measurement
     :param filename_parts: RawInputFilenameParts structure with parsed original filename
-    :return: constructed filename
+    :param suffixes: list of standardized filename suffixes of the outputs
+    :param claim_func: function, which claims the name for the raw file in the run, see get_std_filename_claimer
+    :return: dict suffix -> filename
     """
-    # get start/end measurement dates to be used in resulting filenames
+    filenames = rawu.get_std_raw_filenames([(filename_parts.PC_name, start_datetime, end_datetime, suffix)
+                                            for suffix in suffixes], claim_func=claim_func)
 
-    start_date_str = str(meas_timestamps.startdate)
-    end_date_str = str(meas_timestamps.enddate)
-    start_time_str = rawu.convert_df_time_to_str(meas_timestamps.starttime)
-    end_time_str = rawu.convert_df_time_to_str(meas_timestamps.endtime)
+    return dict(zip(suffixes, filenames))
 
-    # store standardized real-time measurements to file
-    csv_name = rawu.get_std_raw_filename(filename_parts.PC_name,
-                                                   start_date_str, start_time_str,
-                                                   end_date_str, end_time_str,
-                                                   rawu.RAW_IPG_REALMEAS_FILENAME_SUFFIX,
-                                                   'csv')
 
-    return csv_name
+def get_IPG_std_suffixes(options: rawu.StdOptions):
+    """
+    :param options: StdOptions structure
+    :return: list of standardized filename suffixes of all outputs of one raw IPG file
+    """
+    suffixes = [rawu.RAW_IPG_REALMEAS_FILENAME_SUFFIX, rawu.RAW_IPG_CUMMEAS_FILENAME_SUFFIX]
+    if options.ipg_energy:
+        suffixes.append(rawu.RAW_IPG_ENERGY_FILENAME_SUFFIX)
+
+    return suffixes
+
+
+def get_IPG_cum_meas_dict(meas_lines):
+    """
+    converts list of lines with IPG cumulative measurements to dict
+    :param meas_lines:
+    :return: dict "measurement name" -> "measurement value"
+    """
+    meas_dict = {}
+    for line in meas_lines:
+        # skip empty strings
+        line = line.strip()
+        if not line:
+            continue
+
+        name, _, value = line.partition(IPG_CUM_MEAS_DELIM)
+        meas_dict[name.strip()] = value.strip()
+
+    return meas_dict
 
 
 def convert_IPG_cum_meas_lines_to_df(meas_lines):
@@ -114,17 +412,7 @@ def convert_IPG_cum_meas_lines_to_df(meas_lines):
     :param meas_lines:
     :return: converted Dataframe
     """
-    # get measurement without empty strings
-    cleaned_lines = [line.strip() for line in meas_lines if line.strip()]
-
-    # convert list of lines to dict
-    meas_dict = {}
-    for line in cleaned_lines:
-        item = line.split('=')
-        meas_dict[item[0].strip()] = item[1].strip()
-
-    cum_df = pd.DataFrame(columns=list(meas_dict.keys()))
-    cum_df.loc[0] = list(meas_dict.values())
+    cum_df = pd.DataFrame([get_IPG_cum_meas_dict(meas_lines)])
 
     return cum_df
 
@@ -137,8 +425,19 @@ def transform_IPG_cum_meas_lines_to_df(meas_lines, filename_parts, timestamps):
     :param timestamps: MeasTimestamps structure with timestamps
     :return: transformed dataframe
     """
-    # convert lines to dataframe
-    cum_df = convert_IPG_cum_meas_lines_to_df(meas_lines)
+    return transform_IPG_cum_meas_dict_to_df(get_IPG_cum_meas_dict(meas_lines), filename_parts, timestamps)
+
+
+def transform_IPG_cum_meas_dict_to_df(meas_dict, filename_parts, timestamps):
+    """
+    converts dict with IPG cumulative measurements to Dataframe, and adds standard columns
+    :param meas_dict: dict "measurement name" -> "measurement value"
+    :param filename_parts: RawInputFilenameParts structure with parsed original filename
+    :param timestamps: MeasTimestamps structure with timestamps
+    :return: transformed dataframe
+    """
+    # convert dict to dataframe
+    cum_df = pd.DataFrame([meas_dict])
 
     # prepare std columns
     pc_name_serie = rawu.get_pc_name_serie(filename_parts.PC_name, len(cum_df))
@@ -151,95 +450,688 @@ def transform_IPG_cum_meas_lines_to_df(meas_lines, filename_parts, timestamps):
     return cum_df
 
 
-def get_std_IPG_cum_meas_name(meas_timestamps, filename_parts):
+def standardize_raw_IPG_file(full_filename, out_dir, options: rawu.StdOptions = None):
+    """
+    create the following files from the raw IPG file, created by Intel Power Gadget utility (
+    https://www.intel.com/content/www/us/en/developer/articles/tool/power-gadget.html):
+        - csv-file with real-time measurements (copied from raw file)
+        - csv-file with cumulative measurements (converted from text format, present in raw file)
+
+    :param full_filename: full name (including full path) of the raw IPG file
+    :param out_dir: full path to the directory to store resulting file(s)
+    :param options: StdOptions structure, None for default options
+    :return: StdFileReport structure
+    """
+    logging.info('Start handling of file ' + '"' + full_filename + '"')
+
+    if options is None:
+        options = rawu.StdOptions()
+    report = rawu.StdFileReport(full_filename=full_filename)
+
+    # get info from full filename and check, if the file can be handled
+    filename_parts = rawu.get_filename_parts(full_filename)
+
+    # oversized files are handled by chunks, without the cache, as their parsed tables don't fit to memory
+    if is_IPG_file_chunked(full_filename, options):
+        with rawu.timed_stage(report, rawu.STAGE_CHUNKED):
+            return standardize_raw_IPG_file_chunked(full_filename, out_dir, options, report, filename_parts)
+
+    # parsed tables of the same content could be already cached; the cache holds tables of whole files,
+    # so it's not used for time slices
+    cache_key = None
+    if options.cache_dir and not rawu.is_time_window_set(options):
+        cache_key = cache.get_cache_key(full_filename, reg.RAW_SOURCE_IPG, IPG_PARSER_VERSION)
+        with rawu.timed_stage(report, rawu.STAGE_CACHE_LOAD):
+            cached_tables = cache.load_cached_tables(options.cache_dir, cache_key)
+        if cached_tables is not None:
+            report_row = cached_tables[CACHE_REPORT_TABLE_NAME].iloc[0]
+            report.records_total = int(report_row['records_total'])
+            report.records_bad = int(report_row['records_bad'])
+            cum_meas_dict = cached_tables[CACHE_CUM_MEAS_TABLE_NAME].iloc[0].to_dict()
+
+            with rawu.timed_stage(report, rawu.STAGE_STORE):
+                store_std_IPG_tables(cached_tables[CACHE_REAL_MEAS_TABLE_NAME], cum_meas_dict, filename_parts,
+                                     out_dir, report, options)
+            return report
+
+    with rawu.timed_stage(report, rawu.STAGE_READ):
+        IPG_sections = read_IPG_sections(full_filename)
+    if IPG_sections is None:
+        rawv.quarantine_raw_file(full_filename, options.quarantine_dir, 'wrong format: no sections delimiter found')
+        report.is_quarantined = True
+        return report
+
+    # get parts of the IPG raw file; the tuples are released, so the lines are freed right after parsing
+    real_meas_lines, cum_meas_lines = IPG_sections
+    del IPG_sections
+
+    # validate rows in one pass, bad ones go to quarantine
+    with rawu.timed_stage(report, rawu.STAGE_VALIDATE):
+        validated_lines = validate_IPG_real_meas_lines(real_meas_lines)
+    if validated_lines is None:
+        rawv.quarantine_raw_file(full_filename, options.quarantine_dir,
+                                 'wrong format: no "' + IPG_TIME_COLUMN_NAME + '" column')
+        report.is_quarantined = True
+        return report
+
+    real_meas_lines, bad_lines = validated_lines
+    del validated_lines
+    report.records_total = len(real_meas_lines) - 1 + len(bad_lines)
+    report.records_bad = len(bad_lines)
+    rawv.quarantine_records(full_filename, options.quarantine_dir, bad_lines)
+
+    if len(real_meas_lines) < 2:
+        rawv.quarantine_raw_file(full_filename, options.quarantine_dir, 'no valid real-time measurements')
+        report.is_quarantined = True
+        return report
+
+    # only measurements within the time window are parsed
+    align_state = None
+    is_sliced = False
+    if rawu.is_time_window_set(options):
+        time_idx = real_meas_lines[0].strip().split(IPG_CSV_DELIM).index(IPG_TIME_COLUMN_NAME)
+        with rawu.timed_stage(report, rawu.STAGE_VALIDATE):
+            start_idx, end_idx, align_state = get_IPG_time_window_slice(real_meas_lines[1:], time_idx,
+                                                                        filename_parts, None, options)
+        if align_state is None:
+            logging.info('"' + full_filename + '" has no real-time measurements in the time window')
+            return report
+
+        is_sliced = (end_idx - start_idx) < (len(real_meas_lines) - 1)
+        real_meas_lines = [real_meas_lines[0]] + real_meas_lines[1 + start_idx:1 + end_idx]
+
+    # standardize real-time measurements content;
+    # cumulative measurements are totals of the whole file, so they are not stored for its time slice
+    with rawu.timed_stage(report, rawu.STAGE_TRANSFORM):
+        real_meas_df = transform_IPG_real_meas_to_df(real_meas_lines, filename_parts, align_state=align_state)
+        cum_meas_dict = None if is_sliced else get_IPG_cum_meas_dict(cum_meas_lines)
+    del real_meas_lines
+
+    if cache_key is not None:
+        report_df = pd.DataFrame([{'records_total': report.records_total, 'records_bad': report.records_bad}])
+        cache.store_cached_tables(options.cache_dir, cache_key,
+                                  {CACHE_REAL_MEAS_TABLE_NAME: real_meas_df,
+                                   CACHE_CUM_MEAS_TABLE_NAME: pd.DataFrame([cum_meas_dict]),
+                                   CACHE_REPORT_TABLE_NAME: report_df})
+        cache.evict_cache(options.cache_dir, options.cache_max_bytes)
+
+    with rawu.timed_stage(report, rawu.STAGE_STORE):
+        store_std_IPG_tables(real_meas_df, cum_meas_dict, filename_parts, out_dir, report, options)
+
+    return report
+
+
+def store_std_IPG_tables(real_meas_df, cum_meas_dict, filename_parts, out_dir, report, options: rawu.StdOptions):
     """
-     Construct standardized raw cumulative-meas IPG filename
-    :param meas_timestamps: MeasTimestamps structure with timestamps
+    stores standardized real-time and cumulative measurements of one raw IPG file
+    :param real_meas_df: standardized real-time measurements Dataframe
+    :param cum_meas_dict: dict with cumulative measurements, None for a time slice of the file
     :param filename_parts: RawInputFilenameParts structure with parsed original filename
-    :return: constructed filename
+    :param out_dir: full path to the directory to store resulting files
+    :param report: StdFileReport structure to add stored files to
+    :param options: StdOptions structure
+    :return: None
     """
-    # get start/end measurement dates to be used in resulting filenames
+    # get timestamps from real-time measurement
+    # it will be used for both: standardized real-time and cumulative measurements
+    meas_timestamps = get_IPG_timestamps(real_meas_df)
+    datetimes = real_meas_df[rawu.RAW_DATETIME_COLUMN_NAME]
+    std_names = get_std_IPG_filenames(datetimes.iat[0], datetimes.iat[-1], filename_parts,
+                                      get_IPG_std_suffixes(options),
+                                      chkp.get_std_filename_claimer(options, report.full_filename, out_dir))
 
-    start_date_str = str(meas_timestamps.startdate)
-    end_date_str = str(meas_timestamps.enddate)
-    start_time_str = rawu.convert_df_time_to_str(meas_timestamps.starttime)
-    end_time_str = rawu.convert_df_time_to_str(meas_timestamps.endtime)
+    # energy is integrated after the cache, so cached tables don't depend on the options
+    if options.ipg_energy:
+        real_meas_df = add_IPG_energy_columns(real_meas_df)
+        windows_df = get_IPG_energy_windows_df(real_meas_df, options.energy_window_sec)
+        cum_meas_dict = store_std_IPG_energy(windows_df, cum_meas_dict, std_names[rawu.RAW_IPG_ENERGY_FILENAME_SUFFIX],
+                                             out_dir, report)
 
-    # store standardized real-time measurements to file
-    csv_name = rawu.get_std_raw_filename(filename_parts.PC_name,
-                                                   start_date_str, start_time_str,
-                                                   end_date_str, end_time_str,
-                                                   rawu.RAW_IPG_CUMMEAS_FILENAME_SUFFIX,
-                                                   'csv')
+    # store std real-time IPG measurements to file
+    report.out_files.append(rawu.store_std_df(real_meas_df, out_dir, std_names[rawu.RAW_IPG_REALMEAS_FILENAME_SUFFIX],
+                                              'IPG Real Meas'))
 
-    return csv_name
+    if cum_meas_dict is not None:
+        cum_meas_df = transform_IPG_cum_meas_dict_to_df(cum_meas_dict, filename_parts, meas_timestamps)
+        report.out_files.append(rawu.store_std_df(cum_meas_df, out_dir,
+                                                  std_names[rawu.RAW_IPG_CUMMEAS_FILENAME_SUFFIX],
+                                                  'IPG Cumulative Meas'))
 
 
-def standardize_raw_IPG_file(full_filename, out_dir):
+def store_std_IPG_energy(windows_df, cum_meas_dict, std_name, out_dir, report):
     """
-    create the following files from the raw IPG file, created by Intel Power Gadget utility (
-    https://www.intel.com/content/www/us/en/developer/articles/tool/power-gadget.html):
-        - csv-file with real-time measurements (copied from raw file)
-        - csv-file with cumulative measurements (converted from text format, present in raw file)
+    stores standardized energy windows of one raw IPG file, and cross-checks their totals
+    :param windows_df: Dataframe with energy windows, created by get_IPG_energy_windows_df
+    :param cum_meas_dict: dict with cumulative measurements, None for a time slice of the file
+    :param std_name: standardized filename of energy windows
+    :param out_dir: full path to the directory to store resulting file
+    :param report: StdFileReport structure to add stored file to
+    :return: dict with cumulative measurements, extended by integrated energy totals; None for a time slice
+    """
+    report.out_files.append(rawu.store_std_df(windows_df, out_dir, std_name, 'IPG Energy'))
+
+    if cum_meas_dict is None:
+        return None
+
+    return dict(cum_meas_dict, **check_IPG_energy_totals(windows_df, cum_meas_dict, report.full_filename))
+
 
+def estimate_IPG_file_memory(full_filename, size, options: rawu.StdOptions):
+    """
+    estimates peak memory of standardization of the raw IPG file: it's proportional to the file size,
+    or to the size of one chunk for the files, handled by chunks
     :param full_filename: full name (including full path) of the raw IPG file
-    :param out_dir: full path to the directory to store resulting file(s)
+    :param size: size of the raw file in bytes
+    :param options: StdOptions structure
+    :return: estimated memory in bytes
+    """
+    raw_size = rawu.get_raw_file_uncompressed_size(full_filename, size)
+    if not is_IPG_file_chunked(full_filename, options):
+        return raw_size * IPG_MEMORY_PER_RAW_BYTE
+
+    # size of a chunk is estimated by the length of the 1st row
+    with rawu.open_raw_file(full_filename, IPG_FILE_ENCODING) as IPG_file:
+        IPG_file.readline()
+        row_size = len(IPG_file.readline())
+
+    return min(raw_size, row_size * options.chunk_rows) * IPG_CHUNK_MEMORY_PER_RAW_BYTE
+
+
+# =======================================
+# ====== Chunked (out-of-core) mode =====
+
+@dataclass()
+class IPGChunkedTable:
+    """
+    state of IPG real-time measurements, standardized by chunks and appended to one file
+    """
+    out_fullname: str = ''
+    align_state: rawu.DatetimeAlignState = None
+    num_rows: int = 0
+    start_date: str = ''
+    start_time: str = ''
+    end_date: str = ''
+    end_time: str = ''
+    start_datetime: pd.Timestamp = None
+    end_datetime: pd.Timestamp = None
+    # last row of the previous chunk and its cumulative energy, to integrate energy across chunk boundaries
+    last_row_df: pd.DataFrame = None
+    cum_energy_offsets: dict = field(default_factory=dict)
+    windows_dfs: list = field(default_factory=list)
+    # True if lines out of the time window are skipped; True for the end of the window, when the rest is skipped
+    is_sliced: bool = False
+    is_window_passed: bool = False
+
+
+def is_IPG_file_chunked(full_filename, options: rawu.StdOptions):
+    """
+    :param full_filename: full name (including full path) of the raw IPG file
+    :param options: StdOptions structure
+    :return: True if the file must be handled by chunks
+    """
+    return (options.chunk_rows > 0) and (Path(full_filename).stat().st_size >= options.chunk_min_bytes)
+
+
+def add_IPG_real_meas_chunk(table: IPGChunkedTable, header_line, chunk_lines, filename_parts,
+                            options: rawu.StdOptions, align_state=None):
+    """
+    standardizes the next chunk of IPG real-time measurements and appends it to the file
+    :param table: IPGChunkedTable structure
+    :param header_line: csv header of real-time measurements
+    :param chunk_lines: list of valid csv-lines of the chunk
+    :param filename_parts: RawInputFilenameParts structure with parsed original filename
+    :param options: StdOptions structure
+    :param align_state: DatetimeAlignState structure of the chunk lines, if the table state is already aligned
+                        over them; None to align the chunk with the table state
     :return: None
     """
-    logging.info('Start handling of file ' + '"' + full_filename + '"')
+    chunk_df = transform_IPG_real_meas_to_df([header_line] + chunk_lines, filename_parts,
+                                             align_state=table.align_state if align_state is None else align_state)
 
-    # get info from full filename and check, if the file can be handled
-    filename = Path(full_filename).name
-    filename_parts = rawu.get_filename_parts(full_filename)
+    if options.ipg_energy:
+        if table.last_row_df is None:
+            energy_df = add_IPG_energy_columns(chunk_df)
+        else:
+            energy_df = add_IPG_energy_columns(pd.concat([table.last_row_df, chunk_df], ignore_index=True))
+            energy_df = energy_df.iloc[1:].reset_index(drop=True)
+            for column, offset in table.cum_energy_offsets.items():
+                energy_df[column] += offset
+
+        table.last_row_df = chunk_df.iloc[-1:]
+        table.cum_energy_offsets = {IPG_CUM_ENERGY_COLUMN_FORMAT.format(name=name, idx=idx):
+                                    energy_df[IPG_CUM_ENERGY_COLUMN_FORMAT.format(name=name, idx=idx)].iloc[-1]
+                                    for column, name, idx in get_IPG_power_columns(chunk_df)}
+        table.windows_dfs.append(get_IPG_energy_windows_df(energy_df, options.energy_window_sec))
+        chunk_df = energy_df
+
+    if table.num_rows == 0:
+        table.start_date = str(chunk_df[rawu.RAW_DATE_COLUMN_NAME].iat[0].date())
+        table.start_time = str(chunk_df[rawu.RAW_TIME_COLUMN_NAME].iat[0])
+        table.start_datetime = chunk_df[rawu.RAW_DATETIME_COLUMN_NAME].iat[0]
+    table.end_date = str(chunk_df[rawu.RAW_DATE_COLUMN_NAME].iat[-1].date())
+    table.end_time = str(chunk_df[rawu.RAW_TIME_COLUMN_NAME].iat[-1])
+    table.end_datetime = chunk_df[rawu.RAW_DATETIME_COLUMN_NAME].iat[-1]
+
+    chunk_df.to_csv(table.out_fullname, mode='w' if table.num_rows == 0 else 'a', header=(table.num_rows == 0),
+                    index=False)
+    table.num_rows += len(chunk_df)
+
+
+def add_IPG_real_meas_lines(table: IPGChunkedTable, header_line, chunk_lines, time_idx, filename_parts,
+                            options: rawu.StdOptions):
+    """
+    appends the next chunk of IPG real-time measurements to the file;
+    with the time window, only lines of the chunk within the window are parsed
+    :param table: IPGChunkedTable structure
+    :param header_line: csv header of real-time measurements
+    :param chunk_lines: list of valid csv-lines of the chunk
+    :param time_idx: index of the system time field
+    :param filename_parts: RawInputFilenameParts structure with parsed original filename
+    :param options: StdOptions structure
+    :return: None
+    """
+    if not rawu.is_time_window_set(options):
+        add_IPG_real_meas_chunk(table, header_line, chunk_lines, filename_parts, options)
+        return
+
+    start_idx, end_idx, align_state = get_IPG_time_window_slice(chunk_lines, time_idx, filename_parts,
+                                                                table.align_state, options)
+    table.is_sliced = table.is_sliced or ((end_idx - start_idx) < len(chunk_lines))
+    # aligned datetimes are monotonic, so all the next lines are out of the window too
+    table.is_window_passed = end_idx < len(chunk_lines)
+
+    if align_state is not None:
+        add_IPG_real_meas_chunk(table, header_line, chunk_lines[start_idx:end_idx], filename_parts, options,
+                                align_state)
+
+
+def close_IPG_chunked_table(table: IPGChunkedTable, cum_meas_dict, filename_parts, out_dir, report,
+                            options: rawu.StdOptions):
+    """
+    stores chunked real-time measurements under the standardized name, and stores the other standardized tables
+    :param table: IPGChunkedTable structure
+    :param cum_meas_dict: dict with cumulative measurements, None for a time slice of the file
+    :param filename_parts: RawInputFilenameParts structure with parsed original filename
+    :param out_dir: full path to the directory to store resulting files
+    :param report: StdFileReport structure to add stored files to
+    :param options: StdOptions structure
+    :return: None
+    """
+    meas_timestamps = rawu.CumMeasTimestamps(table.start_date, table.start_time, table.end_date, table.end_time)
+    std_names = get_std_IPG_filenames(table.start_datetime, table.end_datetime, filename_parts,
+                                      get_IPG_std_suffixes(options),
+                                      chkp.get_std_filename_claimer(options, report.full_filename, out_dir))
+
+    real_meas_fullname = str(Path(out_dir) / std_names[rawu.RAW_IPG_REALMEAS_FILENAME_SUFFIX])
+    os.replace(table.out_fullname, real_meas_fullname)
+    logging.info('Standardized IPG Real Meas (' + str(table.num_rows) + ' rows) is stored to "'
+                 + real_meas_fullname + '"')
+    report.out_files.append(real_meas_fullname)
+
+    if options.ipg_energy:
+        cum_meas_dict = store_std_IPG_energy(merge_IPG_energy_windows_dfs(table.windows_dfs), cum_meas_dict,
+                                             std_names[rawu.RAW_IPG_ENERGY_FILENAME_SUFFIX], out_dir, report)
+
+    if cum_meas_dict is not None:
+        cum_meas_df = transform_IPG_cum_meas_dict_to_df(cum_meas_dict, filename_parts, meas_timestamps)
+        report.out_files.append(rawu.store_std_df(cum_meas_df, out_dir,
+                                                  std_names[rawu.RAW_IPG_CUMMEAS_FILENAME_SUFFIX],
+                                                  'IPG Cumulative Meas'))
+
+
+def store_IPG_chunk_checkpoint(table: IPGChunkedTable, full_filename, line_num, bad_lines, options: rawu.StdOptions):
+    """
+    commits chunks of IPG real-time measurements, standardized so far, so the file could be resumed from here
+    :param table: IPGChunkedTable structure
+    :param full_filename: full name (including full path) of the raw IPG file
+    :param line_num: number of real-time measurements lines, consumed from the raw file
+    :param bad_lines: list of bad lines, found so far
+    :param options: StdOptions structure with checkpoint_dir
+    :return: None
+    """
+    # energy windows are merged, so the checkpoint doesn't grow with every chunk
+    if len(table.windows_dfs) > 1:
+        table.windows_dfs = [merge_IPG_energy_windows_dfs(table.windows_dfs)]
+
+    chkp.store_chunk_checkpoint(options.checkpoint_dir, full_filename, table.out_fullname,
+                                {'table': table, 'line_num': line_num, 'bad_lines': bad_lines})
+
+
+def standardize_raw_IPG_file_chunked(full_filename, out_dir, options: rawu.StdOptions, report, filename_parts):
+    """
+    standardizes the raw IPG file by chunks of options.chunk_rows rows:
+    memory usage doesn't depend on the file size, dates alignment and energy integration are carried between chunks;
+    with options.checkpoint_dir every chunk is committed, and an interrupted file is continued after its last
+    committed chunk if options.resume is set; with the time window, reading stops at the end of the window
+
+    :param full_filename: full name (including full path) of the raw IPG file
+    :param out_dir: full path to the directory to store resulting file(s)
+    :param options: StdOptions structure
+    :param report: StdFileReport structure to fill
+    :param filename_parts: RawInputFilenameParts structure with parsed original filename
+    :return: StdFileReport structure
+    """
+    logging.info('"' + full_filename + '" is handled by chunks of ' + str(options.chunk_rows) + ' rows')
+
+    tmp_fullname = Path(out_dir) / (IPG_TMP_FILE_PREFIX + Path(full_filename).name + '.csv')
+    table = IPGChunkedTable(out_fullname=str(tmp_fullname))
+    bad_lines = []
+    committed_line_num = 0
+
+    if options.checkpoint_dir and options.resume:
+        state = chkp.load_chunk_checkpoint(options.checkpoint_dir, full_filename, table.out_fullname)
+        if state is not None:
+            table, committed_line_num, bad_lines = state['table'], state['line_num'], state['bad_lines']
+            logging.info('"' + full_filename + '" is resumed after ' + str(table.num_rows) + ' standardized rows')
+
+    with rawu.open_raw_file(full_filename) as IPG_file:
+        header_line = IPG_file.readline()
+        header_fields = header_line.strip().split(IPG_CSV_DELIM)
+        if IPG_TIME_COLUMN_NAME not in header_fields:
+            rawv.quarantine_raw_file(full_filename, options.quarantine_dir,
+                                     'wrong format: no "' + IPG_TIME_COLUMN_NAME + '" column')
+            report.is_quarantined = True
+            return report
+
+        time_idx = header_fields.index(IPG_TIME_COLUMN_NAME)
+        num_fields = len(header_fields)
+
+        is_delimiter_found = False
+        chunk_lines = []
+        line_num = 0
+        # lines of the committed chunks are skipped on resume
+        while line_num < committed_line_num:
+            IPG_file.readline()
+            line_num += 1
+
+        for line in IPG_file:
+            if line.strip() == '':
+                is_delimiter_found = True
+                break
+
+            line_num += 1
+            reason = get_IPG_real_meas_line_error(line, num_fields, time_idx)
+            if reason is not None:
+                bad_lines.append((line_num, line, reason))
+                continue
+
+            if table.align_state is None:
+                first_time = dt.datetime.strptime(line.split(IPG_CSV_DELIM)[time_idx], IPG_TIME_FORMAT).time()
+                table.align_state = rawu.get_start_align_state(first_time, filename_parts)
+
+            chunk_lines.append(line)
+            if len(chunk_lines) >= options.chunk_rows:
+                add_IPG_real_meas_lines(table, header_line, chunk_lines, time_idx, filename_parts, options)
+                chunk_lines = []
+                if options.checkpoint_dir:
+                    store_IPG_chunk_checkpoint(table, full_filename, line_num, bad_lines, options)
+                if table.is_window_passed:
+                    break
+
+        if chunk_lines:
+            add_IPG_real_meas_lines(table, header_line, chunk_lines, time_idx, filename_parts, options)
+
+        cum_meas_lines = IPG_file.readlines() if is_delimiter_found else []
+
+    report.records_total = line_num
+    report.records_bad = len(bad_lines)
+
+    if options.checkpoint_dir:
+        chkp.remove_chunk_checkpoint(options.checkpoint_dir, table.out_fullname)
 
-    # read original file to strings
-    IPG_file = open(full_filename)
-    IPG_content = IPG_file.readlines()
-    IPG_file.close()
+    is_read = is_delimiter_found or table.is_window_passed
+    if is_read and (table.num_rows == 0) and rawu.is_time_window_set(options):
+        Path(table.out_fullname).unlink(missing_ok=True)
+        logging.info('"' + full_filename + '" has no real-time measurements in the time window')
+        return report
 
-    delim_pos = get_delimiter_pos_in_IPG(IPG_content)
-    if (delim_pos == -1):
-        logging.error('"' + filename + '": wrong format: no sections delimiter found')
+    if (not is_read) or (table.num_rows == 0):
+        Path(table.out_fullname).unlink(missing_ok=True)
+        rawv.quarantine_raw_file(full_filename, options.quarantine_dir,
+                                 'wrong format: no sections delimiter found' if not is_read
+                                 else 'no valid real-time measurements')
+        report.is_quarantined = True
+        return report
+
+    rawv.quarantine_records(full_filename, options.quarantine_dir, bad_lines)
+
+    close_IPG_chunked_table(table, None if table.is_sliced else get_IPG_cum_meas_dict(cum_meas_lines),
+                            filename_parts, out_dir, report, options)
+
+    return report
+
+
+# =======================================
+
+
+def iter_lines_backwards(mm):
+    """
+    iterates lines of memory-mapped file from its end, without reading the rest of the file
+    :param mm: mmap object
+    :return: generator of lines (bytes, without line ends)
+    """
+    pos = len(mm)
+    while pos > 0:
+        nl_pos = mm.rfind(b'\n', 0, pos)
+        yield mm[nl_pos + 1:pos].rstrip(b'\r')
+        pos = max(nl_pos, 0)
+
+
+def read_IPG_edges_mmap(full_filename):
+    """
+    memory-maps raw IPG file and gets only its edges:
+    header and first row of real measurements from the file beginning,
+    last row of real measurements and cumulative measurements (trailer) by seeking backwards from the file end
+
+    :param full_filename: full name (including full path) of the raw IPG file
+    :return: tuple (header line, first row line, last row line, list of cumulative meas lines),
+             None if the file has wrong format
+    """
+    with open(full_filename, 'rb') as IPG_file:
+        if Path(full_filename).stat().st_size == 0:
+            return None
+
+        with mmap.mmap(IPG_file.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            header_end = mm.find(b'\n')
+            first_end = mm.find(b'\n', header_end + 1)
+            if (header_end == -1) or (first_end == -1):
+                return None
+
+            header_line = mm[:header_end].decode(IPG_FILE_ENCODING, errors='replace').strip()
+            first_line = mm[header_end + 1:first_end].decode(IPG_FILE_ENCODING, errors='replace').strip()
+
+            # trailer lines never contain csv delimiters, so the 1st such line from the end is the last row;
+            # it must be followed by the sections delimiter
+            cum_lines = []
+            last_line = None
+            for line in iter_lines_backwards(mm):
+                line = line.decode(IPG_FILE_ENCODING, errors='replace').strip()
+                if IPG_CSV_DELIM in line:
+                    last_line = line
+                    break
+                cum_lines.append(line)
+
+    if (last_line is None) or (not cum_lines) or (cum_lines[-1] != '') or (first_line == ''):
+        return None
+
+    cum_lines.reverse()
+
+    return header_line, first_line, last_line, cum_lines
+
+
+def read_IPG_edges_stream(full_filename):
+    """
+    gets the same edges of raw IPG file as read_IPG_edges_mmap, by streaming through the whole file
+    :param full_filename: full name (including full path) of the raw IPG file
+    :return: tuple (header line, first row line, last row line, list of cumulative meas lines),
+             None if the file has wrong format
+    """
+    IPG_sections = read_IPG_sections(full_filename)
+    if (IPG_sections is None) or (len(IPG_sections[0]) < 2):
+        return None
+
+    real_meas_lines, cum_meas_lines = IPG_sections
+
+    return real_meas_lines[0].strip(), real_meas_lines[1].strip(), real_meas_lines[-1].strip(), cum_meas_lines
+
+
+def get_IPG_timestamps_from_edges(header_line, first_line, last_line, filename_parts):
+    """
+    calculates start/end timestamps of IPG real-time measurements from their first and last rows only
+    :param header_line: csv header of real-time measurements
+    :param first_line: first csv row of real-time measurements
+    :param last_line: last csv row of real-time measurements
+    :param filename_parts: parsed RawInputFilenameParts structure
+    :return: MeasTimestamps structure
+    """
+    edges_df = pd.read_csv(io.StringIO('\n'.join([header_line, first_line, last_line])))
+    times_serie = pd.to_datetime(edges_df[IPG_TIME_COLUMN_NAME], format=IPG_TIME_FORMAT)
+
+    if IPG_ELAPSED_TIME_COLUMN_NAME in edges_df.columns:
+        start_datetime = rawu.get_aligned_datetime_serie(times_serie[:1].copy(), filename_parts)[0]
+
+        # number of passed days is not known without reading all rows, so derive it from the elapsed time
+        elapsed = edges_df[IPG_ELAPSED_TIME_COLUMN_NAME]
+        approx_end = start_datetime + dt.timedelta(seconds=float(elapsed[1] - elapsed[0]))
+        end_datetime = dt.datetime.combine(approx_end.date(), times_serie[1].time())
+        if end_datetime - approx_end > dt.timedelta(hours=12):
+            end_datetime = end_datetime - dt.timedelta(days=1)
+        elif approx_end - end_datetime > dt.timedelta(hours=12):
+            end_datetime = end_datetime + dt.timedelta(days=1)
     else:
-        # get parts of the IPG raw file
-        real_meas_lines = IPG_content[:delim_pos]
-        cum_meas_lines = IPG_content[delim_pos + 1:]
+        datetimes_serie = rawu.get_aligned_datetime_serie(times_serie.copy(), filename_parts)
+        start_datetime = datetimes_serie[0]
+        end_datetime = datetimes_serie[1]
+
+    meas_timestamps = rawu.CumMeasTimestamps(start_datetime.date().isoformat(),
+                                             str(edges_df.at[0, IPG_TIME_COLUMN_NAME]),
+                                             end_datetime.date().isoformat(),
+                                             str(edges_df.at[1, IPG_TIME_COLUMN_NAME]))
+
+    return meas_timestamps
+
+
+def get_IPG_cum_only_row(full_filename):
+    """
+    gets standardized cumulative measurements of the raw IPG file without parsing its real-time measurements
+    :param full_filename: full name (including full path) of the raw IPG file
+    :return: dict with standardized cumulative measurements row, None if the file has no sections delimiter;
+             ValueError is raised for truncated cumulative measurements
+    """
+    logging.info('Start cumulative-only handling of file ' + '"' + full_filename + '"')
+
+    filename_parts = rawu.get_filename_parts(full_filename)
+
+    if rawu.get_raw_file_compression(full_filename) is None:
+        edges = read_IPG_edges_mmap(full_filename)
+    else:
+        # compressed files could not be memory-mapped, so get edges by streaming through the file
+        edges = read_IPG_edges_stream(full_filename)
+
+    if edges is None:
+        return None
+
+    header_line, first_line, last_line, cum_lines = edges
+    bad_lines = [line.strip() for line in cum_lines if line.strip() and (IPG_CUM_MEAS_DELIM not in line)]
+    if bad_lines:
+        raise ValueError('cumulative measurement "' + bad_lines[0] + '" has no value, the file is truncated')
+    meas_timestamps = get_IPG_timestamps_from_edges(header_line, first_line, last_line, filename_parts)
+
+    cum_row = {rawu.RAW_PC_NAME_COLUMN_NAME: filename_parts.PC_name}
+    cum_row.update(rawu.get_cumulative_times_dict(meas_timestamps))
+    cum_row.update(get_IPG_cum_meas_dict(cum_lines))
+
+    return cum_row
 
-        # standardize real-time measurements content
-        real_meas_df = transform_IPG_real_meas_to_df(real_meas_lines, filename_parts)
 
-        # get timestamps from real-time measurement
-        # it will be used for both: standardized real-time and cumulative measurements
-        meas_timestamps = get_IPG_timestamps(real_meas_df)
+def get_std_IPG_cum_all_name(cum_df, taken_names=None):
+    """
+     Construct standardized filename for cumulative measurements of many IPG files
+    :param cum_df: Dataframe with standardized cumulative measurements rows
+    :param taken_names: set of already used names, e.g. files of the output directory, None if there are no ones
+    :return: constructed filename
+    """
+    pc_names = cum_df[rawu.RAW_PC_NAME_COLUMN_NAME].unique()
+    pc_name = pc_names[0] if len(pc_names) == 1 else rawu.RAW_MULTI_PC_NAME
 
-        # store std real-time IPG measurements to file
-        real_meas_csv_name = get_std_IPG_real_meas_name(meas_timestamps, filename_parts)
-        real_meas_csv_fullname = Path(out_dir) / real_meas_csv_name
-        logging.info('Standardized IPG Real Meas is stored to "' + str(real_meas_csv_fullname) + '"')
-        real_meas_df.to_csv(real_meas_csv_fullname, index=False)
+    start_datetimes = pd.to_datetime(cum_df[rawu.RAW_START_DATETIME_COLUMN_NAME], format='%Y-%m-%d ' + IPG_TIME_FORMAT)
+    end_datetimes = pd.to_datetime(cum_df[rawu.RAW_END_DATETIME_COLUMN_NAME], format='%Y-%m-%d ' + IPG_TIME_FORMAT)
 
-        cum_meas_df = transform_IPG_cum_meas_lines_to_df(cum_meas_lines, filename_parts, meas_timestamps)
-        cum_meas_csv_name = get_std_IPG_cum_meas_name(meas_timestamps, filename_parts)
-        cum_meas_csv_fullname = Path(out_dir) / cum_meas_csv_name
-        logging.info('Standardized IPG Cumulative Meas is stored to "' + str(cum_meas_csv_fullname) + '"')
-        cum_meas_df.to_csv(cum_meas_csv_fullname, index=False)
+    return rawu.get_std_raw_filenames([(pc_name, start_datetimes.min(), end_datetimes.max(),
+                                        rawu.RAW_IPG_CUMMEAS_ALL_FILENAME_SUFFIX)], taken_names)[0]
 
 
-def standardize_raw_IPG_in_dir(parsing_dir, out_dir):
+def standardize_raw_IPG_cum_only_in_dir(parsing_dir, out_dir, recursive=False, include=None, exclude=None,
+                                        quarantine_dir=''):
+    """
+    finds all raw IPG files in parsing_dir and stores cumulative measurements of all of them
+    to one standardized file in out_dir; real-time measurements are not parsed;
+    as in the engine, failure of one file is logged, the file is quarantined, and other files are still handled;
+    the stored file never replaces a file of a previous run, it gets a collision index in its name instead
+    :param parsing_dir: directory or list of directories to parse
+    :param out_dir:
+    :param recursive: True to parse also all subdirectories
+    :param include: list of glob patterns of files to handle, None for all files
+    :param exclude: list of glob patterns of files to skip
+    :param quarantine_dir: directory to store bad raw files, nothing is stored if empty
+    :return: list of StdFileReport structures
     """
-    finds all raw IPG files in parsing_dir and stores standardized files in out_dir
+    logging.info('Start cumulative-only standardization of raw IPG files from "' + str(parsing_dir) + '" to "'
+                 + str(out_dir) + '"')
+
+    options = rawu.StdOptions(quarantine_dir=quarantine_dir)
+    jobs = engine.find_raw_files(parsing_dir, reg.RAW_SOURCE_IPG, recursive, include, exclude,
+                                 [out_dir, quarantine_dir])
+
+    cum_rows = []
+    reports = []
+    for job in jobs:
+        try:
+            cum_row = get_IPG_cum_only_row(job.full_filename)
+        except Exception:
+            reports.append(engine.handle_failed_raw_file_job(job, options))
+            continue
+
+        if cum_row is None:
+            rawv.quarantine_raw_file(job.full_filename, quarantine_dir, 'wrong format: no sections delimiter found')
+            reports.append(rawu.StdFileReport(full_filename=job.full_filename, is_quarantined=True))
+            continue
+
+        cum_rows.append(cum_row)
+        reports.append(rawu.StdFileReport(full_filename=job.full_filename))
+
+    engine.log_raw_file_reports(reports)
+    if not cum_rows:
+        logging.info('No raw IPG files with cumulative measurements found')
+        return reports
+
+    cum_df = pd.DataFrame(cum_rows)
+
+    Path(out_dir).mkdir(parents=True, exist_ok=True)
+    cum_name = get_std_IPG_cum_all_name(cum_df, rawu.get_dir_filenames(out_dir))
+    rawu.store_std_df(cum_df, out_dir, cum_name, 'IPG Cumulative Meas of all files')
+
+    return reports
+
+
+def standardize_raw_IPG_in_dir(parsing_dir, out_dir, resume=False, time_from=None, time_to=None):
+    """
+    finds all raw IPG files in parsing_dir and stores standardized files in out_dir;
+    completed files and chunks are checkpointed to out_dir, so an interrupted run could be resumed
     :param parsing_dir:
     :param out_dir:
+    :param resume: True to continue the interrupted run from its checkpoints
+    :param time_from: datetime to standardize measurements from (inclusive), None for no limit
+    :param time_to: datetime to standardize measurements till (exclusive), None for no limit
     :return: None
     """
     logging.info('Start standardization of raw IPG files from "' + str(parsing_dir) + '" to "' + str(out_dir) + '"')
 
-    parse_path = Path(parsing_dir)
-    file_list = (list(parse_path.glob('*' + rawu.RAW_FILENAME_DELIM + rawu.RAW_IPG_FILENAME_SUFFIX + '.*')))
-
-    for file in file_list:
-        standardize_raw_IPG_file(str(file), out_dir)
-        # pp(str(file))
+    options = rawu.StdOptions(checkpoint_dir=chkp.get_checkpoint_dir(out_dir), resume=resume,
+                              time_from=time_from, time_to=time_to)
+    with chkp.locked_checkpoint_dir(options.checkpoint_dir) as is_locked:
+        if not is_locked:
+            logging.error('Another run uses "' + str(out_dir) + '", standardization is not started')
+            return
 
-    # standardize_raw_IPG(r'c:\Wit\Scripts\GreenParrot\FastShot1\RawOutput\DESKTOP-FP4OP26\DESKTOP-FP4OP26__2022-07-31_12-16-45__IPG.csv',
-    #                       out_dir)
+        engine.standardize_raw_sources_in_dir(parsing_dir, out_dir, [reg.RAW_SOURCE_IPG], options=options)
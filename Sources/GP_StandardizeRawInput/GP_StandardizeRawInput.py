@@ -1,36 +1,297 @@
 import argparse
 import logging
+import sys
+import datetime as dt
 from pathlib import Path
-from pprint import pprint as pp
-import GP_StandardizeRawIPG as ipg
-import GP_StandardizeRawScript2 as sc2
+
+import GP_StandardizeDefaults as dflt
+
+# heavy modules (pandas and the standardizers) are imported only inside of the subcommands,
+# so starting of the tool, --help and wrong arguments handling stay fast
 
 DEF_OUT_DIR = '__STD_RAW_OUTPUT'
 
+CMD_IPG = 'ipg'
+CMD_SCRIPT2 = 'script2'
+CMD_ALL = 'all'
+CMD_COMPACT = 'compact'
 
-if __name__ == "__main__":
-    # let's start with logging
-    logging.basicConfig(level=logging.DEBUG, format=' %(asctime)s - %(levelname)s - %(message)s')
-    logging.info('Start GP raw input standardization')
+# options of the ipg subcommand, which are not supported by cumulative-only run: destination -> option string
+CUM_ONLY_UNSUPPORTED_OPTIONS = {'time_from': '--from', 'time_to': '--to', 'cache_dir': '--cache-dir',
+                                'cache_max_size': '--cache-max-size', 'resume': '--resume', 'jobs': '--jobs',
+                                'memory_budget': '--memory-budget', 'energy': '--energy',
+                                'energy_window': '--energy-window', 'chunk_rows': '--chunk-rows',
+                                'chunk_min_size': '--chunk-min-size', 'no_processes': '--no-processes',
+                                'top_processes': '--top-processes', 'metrics_file': '--metrics-file',
+                                'metrics_interval': '--metrics-interval', 'dedup': '--dedup',
+                                'group_by_pc': '--group-by-pc'}
+
+
+def log_run_dirs(cmd_args):
+    """
+    logs input and output directories of the run
+    :param cmd_args: parsed command-line options
+    :return: None
+    """
+    logging.info('Start parsing of "' + '", "'.join(cmd_args.indir) + '"')
+    logging.info('Results will be stored to  "' + cmd_args.outdir + '"')
+
+
+def run_sources(cmd_args, source_names):
+    """
+    standardizes raw files of passed raw sources with the shared engine;
+    the run holds the lock of its checkpoints, and exits with error if another run uses the same out dir
+    :param cmd_args: parsed command-line options
+    :param source_names: names of registered raw sources, None for all registered sources
+    :return: None
+    """
+    import GP_RawInputUtils as rawu
+    import GP_StandardizeEngine as engine
+    import GP_StandardizeCheckpoint as chkp
+
+    log_run_dirs(cmd_args)
+
+    options = rawu.StdOptions(quarantine_dir=cmd_args.quarantine_dir, cache_dir=cmd_args.cache_dir,
+                              cache_max_bytes=rawu.parse_size_str(cmd_args.cache_max_size),
+                              store_processes=not cmd_args.no_processes, top_processes=cmd_args.top_processes,
+                              ipg_energy=cmd_args.energy, energy_window_sec=cmd_args.energy_window,
+                              chunk_rows=cmd_args.chunk_rows,
+                              chunk_min_bytes=rawu.parse_size_str(cmd_args.chunk_min_size),
+                              metrics_file=cmd_args.metrics_file, metrics_interval_sec=cmd_args.metrics_interval,
+                              checkpoint_dir=chkp.get_checkpoint_dir(cmd_args.outdir), resume=cmd_args.resume,
+                              time_from=cmd_args.time_from, time_to=cmd_args.time_to,
+                              memory_budget=rawu.parse_size_str(cmd_args.memory_budget))
+
+    with chkp.locked_checkpoint_dir(options.checkpoint_dir) as is_locked:
+        if not is_locked:
+            logging.error('Another run uses "' + cmd_args.outdir + '", start this one after it ends')
+            sys.exit(1)
+
+        reports = engine.standardize_raw_sources_in_dir(cmd_args.indir, cmd_args.outdir, source_names,
+                                                        cmd_args.jobs, cmd_args.recursive, cmd_args.include,
+                                                        cmd_args.exclude, cmd_args.group_by_pc, options,
+                                                        cmd_args.dedup)
+
+        if cmd_args.top_processes > 0:
+            import GP_ProcessSummary as summ
+            summ.store_pc_process_summaries(reports, cmd_args.top_processes, options)
+
+        if cmd_args.dedup:
+            import GP_StandardizeDedup as dedup
+            dedup.trim_overlapping_std_outputs(cmd_args.outdir)
+
+
+def store_layout(cmd_args):
+    """
+    moves standardized files to Hive-style partitions, if requested
+    :param cmd_args: parsed command-line options
+    :return: None
+    """
+    if cmd_args.partitioned:
+        import GP_StandardizeLayout as layout
+        layout.partition_std_outputs(cmd_args.outdir)
+
+
+def run_ipg(cmd_args):
+    """
+    standardizes raw IPG files
+    :param cmd_args: parsed command-line options
+    :return: None
+    """
+    import GP_RawSourceRegistry as reg
+
+    if cmd_args.cum_only:
+        import GP_StandardizeRawIPG as ipg
+        log_run_dirs(cmd_args)
+        ipg.standardize_raw_IPG_cum_only_in_dir(cmd_args.indir, cmd_args.outdir,
+                                                cmd_args.recursive, cmd_args.include, cmd_args.exclude,
+                                                cmd_args.quarantine_dir)
+    else:
+        run_sources(cmd_args, [reg.RAW_SOURCE_IPG])
+
+    store_layout(cmd_args)
+
+
+def run_script2(cmd_args):
+    """
+    standardizes raw Script2 files
+    :param cmd_args: parsed command-line options
+    :return: None
+    """
+    import GP_RawSourceRegistry as reg
+
+    run_sources(cmd_args, [reg.RAW_SOURCE_SCRIPT2])
+
+    store_layout(cmd_args)
+
+
+def run_all(cmd_args):
+    """
+    standardizes raw files of all registered sources, and joins IPG with Script2 if requested
+    :param cmd_args: parsed command-line options
+    :return: None
+    """
+    run_sources(cmd_args, None)
+
+    if cmd_args.join:
+        import GP_StandardizeJoin as join
+        join.join_std_IPG_with_Script2_in_dir(cmd_args.outdir, cmd_args.outdir,
+                                              cmd_args.join_direction, cmd_args.join_tolerance)
+
+    store_layout(cmd_args)
+
+
+def run_compact(cmd_args):
+    """
+    merges small standardized files
+    :param cmd_args: parsed command-line options
+    :return: None
+    """
+    import GP_RawInputUtils as rawu
+    import GP_StandardizeLayout as layout
+
+    layout.compact_std_outputs(cmd_args.outdir, rawu.parse_size_str(cmd_args.target_size))
+
+
+def get_cmd_parser():
+    """
+    creates command-line parser with subcommands
+    :return: created parser
+    """
+    # options common for all subcommands
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument('--indir', nargs='+',
+                               help='Directories to parse for raw input. By default -- current_dir',
+                               default=[str(Path.cwd())])
+    common_parser.add_argument('--recursive', action='store_true',
+                               help='Parse also all subdirectories of the input directories, e.g. RawOutput\\<PC_NAME>')
+    common_parser.add_argument('--include', nargs='+', default=None,
+                               help='Glob patterns of raw files (names or full paths) to handle. By default -- all')
+    common_parser.add_argument('--exclude', nargs='+', default=None,
+                               help='Glob patterns of raw files (names or full paths) to skip')
+    common_parser.add_argument('--group-by-pc', action='store_true',
+                               help='Store standardized files of each PC to its own subdirectory of the output dir')
+    common_parser.add_argument('--outdir',
+                               help='Directory to store result of the parsing. By default  -- current_dir\\'
+                                    + DEF_OUT_DIR,
+                               default=str(Path(Path.cwd(), DEF_OUT_DIR)))
+    common_parser.add_argument('--quarantine-dir', default='',
+                               help='Directory to store bad raw files and records, with reasons. '
+                                    'By default -- bad files and records are only logged')
+    common_parser.add_argument('--cache-dir', default='',
+                               help='Directory to cache parsed raw files, so re-exports skip parsing. '
+                                    'By default -- no caching')
+    common_parser.add_argument('--cache-max-size', default='0',
+                               help='Max cache size, e.g. 500M or 4G; least recently used entries are evicted. '
+                                    'By default -- unlimited')
+    common_parser.add_argument('--no-processes', action='store_true',
+                               help='Do not store Script2 per-process table')
+    common_parser.add_argument('--top-processes', type=int, default=dflt.DEF_TOP_PROCESSES, metavar='N',
+                               help='Number of heaviest Script2 processes per metric in per-file and per-PC '
+                                    'summaries, 0 to skip the summaries (default: %(default)s)')
+    common_parser.add_argument('--energy', action='store_true',
+                               help='Integrate IPG power columns to energy, and store energy totals by time windows')
+    common_parser.add_argument('--energy-window', type=float, default=dflt.DEF_ENERGY_WINDOW_SEC, metavar='SEC',
+                               help='Length of the windows of IPG energy totals in seconds (default: %(default)s)')
+    common_parser.add_argument('--chunk-rows', type=int, default=0, metavar='N',
+                               help='Handle raw IPG files by chunks of N rows with constant memory, 0 to read '
+                                    'whole files (default: %(default)s)')
+    common_parser.add_argument('--chunk-min-size', default='0', metavar='SIZE',
+                               help='Handle by chunks only raw files of at least SIZE, e.g. 500M '
+                                    '(default: %(default)s)')
+    common_parser.add_argument('--metrics-file', default='', metavar='FILE',
+                               help='File to store throughput/latency metrics to during the run: '
+                                    'json for *.json, Prometheus text format otherwise')
+    common_parser.add_argument('--metrics-interval', type=float, default=dflt.DEF_METRICS_INTERVAL_SEC, metavar='SEC',
+                               help='Min interval between stores of the metrics file (default: %(default)s)')
+    common_parser.add_argument('--from', dest='time_from', type=dt.datetime.fromisoformat, default=None,
+                               metavar='DATETIME',
+                               help='Standardize only measurements from DATETIME (inclusive), '
+                                    'e.g. "2022-07-14 14:00"')
+    common_parser.add_argument('--to', dest='time_to', type=dt.datetime.fromisoformat, default=None,
+                               metavar='DATETIME',
+                               help='Standardize only measurements till DATETIME (exclusive), '
+                                    'e.g. "2022-07-14 15:00"')
+    common_parser.add_argument('--resume', action='store_true',
+                               help='Continue the interrupted run: raw files, completed by it, are skipped, and '
+                                    'chunked files continue after their last committed chunk')
+    common_parser.add_argument('--partitioned', action='store_true',
+                               help='Store standardized files to Hive-style partitions of the output dir: '
+                                    'source=<SUFFIX>/pc=<PC_NAME>/date=<START_DATE>')
+    common_parser.add_argument('--dedup', action='store_true',
+                               help='Skip raw files with duplicated content, and trim rows overlapping in time '
+                                    'between standardized files of the same PC and source')
+    common_parser.add_argument('--jobs', type=int, default=dflt.DEF_NUM_JOBS,
+                               help='Number of parallel processes. By default -- ' + str(dflt.DEF_NUM_JOBS))
+    common_parser.add_argument('--memory-budget', default='0', metavar='SIZE',
+                               help='Run parallel processes only while estimated memory of their raw files '
+                                    'fits SIZE, e.g. 4G, 0 for no limit (default: %(default)s)')
 
-    # parse command-line options
     cmd_parser = argparse.ArgumentParser(description='Standardization of GP raw input files')
-    cmd_parser.add_argument('--indir', help='Directory to parse for raw input. By default -- current_dir',
-                            default=str(Path.cwd()))
-    cmd_parser.add_argument('--outdir',
-                            help='Directory to store result of the parsing. By default  -- current_dir\\' + DEF_OUT_DIR,
-                            default=str(Path(Path.cwd(), DEF_OUT_DIR)))
-    cmd_parser.print_help()  # print it anyway as user-friendly hint
+    subparsers = cmd_parser.add_subparsers(dest='command', required=True)
 
-    cmd_args = cmd_parser.parse_args()
+    ipg_parser = subparsers.add_parser(CMD_IPG, parents=[common_parser], help='Standardize raw IPG files')
+    ipg_parser.add_argument('--cum-only', action='store_true',
+                            help='Store only cumulative measurements of all raw IPG files to one file, '
+                                 'without parsing of real-time measurements; options of time window, caching, '
+                                 'resume, parallel runs, chunks, energy and dedup are rejected')
+    ipg_parser.set_defaults(run=run_ipg)
+
+    script2_parser = subparsers.add_parser(CMD_SCRIPT2, parents=[common_parser],
+                                           help='Standardize raw Script2 files')
+    script2_parser.set_defaults(run=run_script2)
+
+    all_parser = subparsers.add_parser(CMD_ALL, parents=[common_parser],
+                                       help='Standardize raw files of all registered sources')
+    all_parser.add_argument('--join', action='store_true',
+                            help='Join standardized IPG and Script2 samples of the same PC after the standardization')
+    all_parser.add_argument('--join-direction', choices=dflt.JOIN_DIRECTIONS_LIST, default=dflt.DEF_JOIN_DIRECTION,
+                            help='Which Script2 sample to join to IPG sample. By default -- ' + dflt.DEF_JOIN_DIRECTION)
+    all_parser.add_argument('--join-tolerance', type=float, default=dflt.DEF_JOIN_TOLERANCE_SEC,
+                            help='Max distance (sec) between joined samples. By default -- '
+                                 + str(dflt.DEF_JOIN_TOLERANCE_SEC))
+    all_parser.set_defaults(run=run_all)
 
-    # parsing_dir = r'c:\Wit\Scripts\GreenParrot\FastShot1\RawOutput\DESKTOP-FP4OP26'
-    parsing_dir = cmd_args.indir
-    # out_dir = r'c:\Wit\Scripts\GreenParrot\__STD_OUTPUT'
-    out_dir = cmd_args.outdir
+    compact_parser = subparsers.add_parser(CMD_COMPACT,
+                                           help='Merge small standardized time series files of the same PC, '
+                                                'source and partition')
+    compact_parser.add_argument('--outdir',
+                                help='Directory with standardized files. By default  -- current_dir\\'
+                                     + DEF_OUT_DIR,
+                                default=str(Path(Path.cwd(), DEF_OUT_DIR)))
+    compact_parser.add_argument('--target-size', default=dflt.DEF_COMPACT_TARGET_SIZE,
+                                help='Target size of merged files. By default -- ' + dflt.DEF_COMPACT_TARGET_SIZE)
+    compact_parser.set_defaults(run=run_compact)
 
-    logging.info('Start parsing of "' + parsing_dir + '"')
-    logging.info('Results will be stored to  "' + out_dir + '"')
+    return cmd_parser
+
+
+def check_cmd_args(cmd_parser, cmd_args):
+    """
+    rejects combinations of options, which could not be applied, instead of silently ignoring them
+    :param cmd_parser: command-line parser, see get_cmd_parser
+    :param cmd_args: parsed command-line options
+    :return: None, exits with usage error for wrong combinations
+    """
+    if (cmd_args.command != CMD_IPG) or (not cmd_args.cum_only):
+        return
+
+    # options, changed from their defaults, are found by comparison with the subcommand without options
+    def_args = cmd_parser.parse_args([cmd_args.command])
+    set_options = [option for dest, option in CUM_ONLY_UNSUPPORTED_OPTIONS.items()
+                   if getattr(cmd_args, dest) != getattr(def_args, dest)]
+    if set_options:
+        cmd_parser.error('--cum-only totals whole raw IPG files and does not support ' + ', '.join(set_options))
+
+
+if __name__ == "__main__":
+    # parse command-line options
+    cmd_parser = get_cmd_parser()
+    cmd_args = cmd_parser.parse_args()
+    check_cmd_args(cmd_parser, cmd_args)
+
+    # let's start with logging
+    logging.basicConfig(level=logging.DEBUG, format=' %(asctime)s - %(levelname)s - %(message)s')
+    logging.info('Start GP raw input standardization')
 
-    # ipg.standardize_raw_IPG_in_dir(parsing_dir, out_dir)
-    sc2.standardize_raw_Script2_in_dir(parsing_dir, out_dir)
+    cmd_args.run(cmd_args)
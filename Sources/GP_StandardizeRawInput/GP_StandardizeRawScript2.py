@@ -1,15 +1,54 @@
 import logging
 from pathlib import Path
-import json
+from dataclasses import dataclass, field
 from datetime import datetime
+import os
+import shutil
+import heapq
 import pandas as pd
 from pprint import pprint as pp
 
 import GP_RawInputUtils as rawu
+import GP_RawInputValidation as rawv
+import GP_ParsedCache as cache
+import GP_RawSourceRegistry as reg
+import GP_StandardizeEngine as engine
+import GP_StandardizeCheckpoint as chkp
+import GP_ProcessSummary as summ
 
 # =======================================
 # ============= CONSTANTS ===============
 
+# version of Script2 parsing, must be increased on every change of the parsed tables
+SCRIPT2_PARSER_VERSION = 3
+
+CACHE_SYS_TABLE_NAME = 'sys'
+CACHE_REPORT_TABLE_NAME = 'report'
+CACHE_PROCESSES_LONG_FILE_NAME = 'processes_long'
+CACHE_PROCESSES_NAMES_FILE_NAME = 'processes_names'
+CACHE_PROCESSES_SUMMARY_TABLE_NAME = 'processes_summary'
+# process tables are cached only if they are stored, so such entries get their own keys
+CACHE_PROCESSES_OPTIONS_TAG = 'processes'
+
+# number of process table rows, collected in memory before they are appended to the file
+SCRIPT2_PROCESS_ROW_GROUP_SIZE = 100000
+PROCESSES_TMP_FILE_PREFIX = '.tmp_'
+
+# records are yielded sorted by timestamps within a window of this number of records, so memory doesn't grow
+# with the length of the capture; json keys are written in time order, so only a few records could be shuffled
+SCRIPT2_REORDER_WINDOW_SIZE = 1000
+
+# estimated peak memory of standardization per byte of the raw file, as system stats of all records are kept in memory
+SCRIPT2_MEMORY_PER_RAW_BYTE = 6
+
+METRIC_NAME_DELIM = '.'
+
+# suffixes of all standardized outputs of one raw Script2 file, their names are created together
+SCRIPT2_STD_FILENAME_SUFFIXES = [rawu.RAW_SCRIPT2_SYS_FILENAME_SUFFIX,
+                                 rawu.RAW_SCRIPT2_PROCESSES_LONG_FILENAME_SUFFIX,
+                                 rawu.RAW_SCRIPT2_PROCESSES_NAMES_FILENAME_SUFFIX,
+                                 rawu.RAW_SCRIPT2_PROCESSES_TOP_FILENAME_SUFFIX]
+
 # ---------------------------------------
 # - Original Script2 structure constants -
 SCRIPT2_SYS_STATS_STR = 'SYS Stats'
@@ -54,6 +93,35 @@ SCRIPT2_GPU_STATS_IDX = 2
 
 SCRIPT2_PROCESSES_STATS_STR = 'Processes Stats'
 SCRIPT2_PROCESSES_STATS_IDX = 3
+
+SCRIPT2_PROCESS_NAME_STR = 'name'
+SCRIPT2_PROCESS_PID_STR = 'pid'
+
+SCRIPT2_UNKNOWN_PID = -1
+# ---------------------------------------
+
+SCRIPT2_TIMESTAMP_FORMAT = '%Y_%m_%d_%H_%M_%S_%f_'
+# ---------------------------------------
+
+# ---------------------------------------
+# ------------ Record schema ------------
+# every Script2 record is checked against the schema before its conversion
+SCRIPT2_RECORD_SCHEMA = [
+    ((SCRIPT2_SYS_STATS_IDX, SCRIPT2_SYS_STATS_STR, SCRIPT2_SYS_STATS_PC_NAME_STR), rawv.SCALAR_TYPES, None),
+    ((SCRIPT2_SYS_STATS_IDX, SCRIPT2_SYS_STATS_STR, SCRIPT2_SYS_STATS_CPU_TYPE_STR), rawv.SCALAR_TYPES, None),
+    ((SCRIPT2_SYS_STATS_IDX, SCRIPT2_SYS_STATS_STR, SCRIPT2_SYS_STATS_CPU_DETAILS_STR), rawv.SCALAR_TYPES, None),
+    ((SCRIPT2_CPU_STATS_IDX, SCRIPT2_CPU_STATS_STR, SCRIPT2_CPU_STATS_NUM_CORES_STR), rawv.NUMBER_TYPES, None),
+    ((SCRIPT2_CPU_STATS_IDX, SCRIPT2_CPU_STATS_STR, SCRIPT2_SYS_STATS_CPU_LOAD_STR), (list,), 1),
+    ((SCRIPT2_CPU_STATS_IDX, SCRIPT2_CPU_STATS_STR, SCRIPT2_IO_BYTES_STR), (list,), SCRIPT2_IO_BYTES_WRITTEN_IDX + 1),
+    ((SCRIPT2_CPU_STATS_IDX, SCRIPT2_CPU_STATS_STR, SCRIPT2_IO_MS_STR), (list,), SCRIPT2_IO_MS_WRITTEN_IDX + 1),
+    ((SCRIPT2_CPU_STATS_IDX, SCRIPT2_CPU_STATS_STR, SCRIPT2_MEM_BYTES_STR), (list,),
+     SCRIPT2_MEM_BYTES_AVAILABLE_IDX + 1),
+    ((SCRIPT2_CPU_STATS_IDX, SCRIPT2_CPU_STATS_STR, SCRIPT2_NET_BYTES_STR), (list,),
+     SCRIPT2_NET_BYTES_RECEIVED_IDX + 1),
+    ((SCRIPT2_PROCESSES_STATS_IDX, SCRIPT2_PROCESSES_STATS_STR), (dict,), None),
+]
+
+SCRIPT2_RECORD_VALIDATOR = rawv.compile_record_schema(SCRIPT2_RECORD_SCHEMA)
 # ---------------------------------------
 
 # ---------------------------------------
@@ -62,6 +130,27 @@ SCRIPT2_PROCESSES_STATS_IDX = 3
 # =======================================
 
 
+# =======================================
+# ============= STD TYPES ===============
+@dataclass()
+class ProcessesLongTable:
+    """
+    state of the process table, written in long format (timestamp, process, pid, metric, value) by row groups;
+    process names are integer-coded, codes are stored to the separate names table
+    """
+    out_fullname: str = ''
+    name_codes: dict = field(default_factory=dict)
+    datetimes: list = field(default_factory=list)
+    codes: list = field(default_factory=list)
+    pids: list = field(default_factory=list)
+    metrics: list = field(default_factory=list)
+    values: list = field(default_factory=list)
+    num_rows: int = 0
+
+
+# =======================================
+
+
 def get_sys_stats_dict(rec: dict) -> dict:
     """
     extracts SYS_Stats information from Script2 json dictionary
@@ -252,17 +341,14 @@ def get_network_total_received_bytes(rec: dict):
     return get_total_network_bytes_stats_list(rec)[SCRIPT2_NET_BYTES_RECEIVED_IDX]
 
 
-def get_datetime_df_row(timestamp):
+def get_datetime_strs(timestamp):
     """
-    creates DataFrame row with standardized date/time info
+    converts Script2 timestamp to standardized date/time strings
     :param timestamp:
-    :return: created DataFrame
+    :return: tuple (datetime string, date string, time string)
     """
-
-    logging.info('Create DataFrame of timestamp ' + timestamp)
-
     # convert to datetime without timezone, as timezone seems to be irrelevant
-    dt = datetime.strptime(timestamp, '%Y_%m_%d_%H_%M_%S_%f_')
+    dt = datetime.strptime(timestamp, SCRIPT2_TIMESTAMP_FORMAT)
 
     start_date = dt.date().isoformat()
     time_format_str = '%H' + rawu.PANDAS_TIME_DELIM + '%M' \
@@ -271,7 +357,19 @@ def get_datetime_df_row(timestamp):
     start_time = dt.time().strftime(time_format_str)
     start_datetime = rawu.get_date_time_str(start_date, start_time)
 
-    dt_df = pd.DataFrame([(start_datetime, start_date, start_time)], columns=rawu.TIMESTAMPS_COLUMN_NAMES_RM)
+    return start_datetime, start_date, start_time
+
+
+def get_datetime_df_row(timestamp):
+    """
+    creates DataFrame row with standardized date/time info
+    :param timestamp:
+    :return: created DataFrame
+    """
+
+    logging.info('Create DataFrame of timestamp ' + timestamp)
+
+    dt_df = pd.DataFrame([get_datetime_strs(timestamp)], columns=rawu.TIMESTAMPS_COLUMN_NAMES_RM)
 
     return dt_df
 
@@ -394,19 +492,183 @@ def get_avg_cpu_load_row(cores_load: pd.DataFrame) -> pd.DataFrame:
     return sys_load
 
 
+def get_process_metrics(prc_rec: dict):
+    """
+    extracts numeric metrics of one process: numbers as is, lists and dicts of numbers as separate metrics
+    :param prc_rec: one process record from Script2 processes stats
+    :return: generator of tuples (metric name, value)
+    """
+    for name, value in prc_rec.items():
+        if name in (SCRIPT2_PROCESS_NAME_STR, SCRIPT2_PROCESS_PID_STR):
+            continue
+
+        if isinstance(value, (list, tuple)):
+            items = [(name + METRIC_NAME_DELIM + str(i), item) for i, item in enumerate(value)]
+        elif isinstance(value, dict):
+            items = [(name + METRIC_NAME_DELIM + str(key), item) for key, item in value.items()]
+        else:
+            items = [(name, value)]
+
+        for metric_name, metric_value in items:
+            if isinstance(metric_value, rawv.NUMBER_TYPES) and not isinstance(metric_value, bool):
+                yield metric_name, metric_value
+
+
+def get_process_pid(prc_key, prc_rec: dict):
+    """
+    gets pid of one process
+    :param prc_key: key of the process record in Script2 processes stats
+    :param prc_rec: one process record
+    :return: pid as int, SCRIPT2_UNKNOWN_PID if not known
+    """
+    try:
+        return int(prc_rec.get(SCRIPT2_PROCESS_PID_STR, prc_key))
+    except (TypeError, ValueError):
+        return SCRIPT2_UNKNOWN_PID
+
+
 def get_process_info_row(prc_info):
-    # prc_df = pd.DataFrame(columns = )
-    pass
+    """
+    creates long-format rows with standardized info of one process
+    :param prc_info: tuple (key of the process record, process record)
+    :return: list of tuples (process name, pid, metric name, value)
+    """
+    prc_key, prc_rec = prc_info
+    if not isinstance(prc_rec, dict):
+        return []
 
+    prc_name = str(prc_rec.get(SCRIPT2_PROCESS_NAME_STR, ''))
+    prc_pid = get_process_pid(prc_key, prc_rec)
+
+    return [(prc_name, prc_pid, metric_name, value) for metric_name, value in get_process_metrics(prc_rec)]
 
-def get_processes_info_from_timestamp(rec: dict):
-    logging.info('Start handling of detailed process info')
 
+def get_processes_info_from_timestamp(rec: dict):
+    """
+    creates long-format rows with standardized info of all processes of one timestamp record
+    :param rec: one Script2 json record
+    :return: generator of tuples (process name, pid, metric name, value)
+    """
     prcs_dict = get_processes_stats_dict(rec)
 
-    for prc_rec in prcs_dict.values():
-        prc_df = get_process_info_row(prc_rec)
-        pp(prc_df)
+    for prc_info in prcs_dict.items():
+        yield from get_process_info_row(prc_info)
+
+
+def create_processes_long_table(full_filename, out_dir) -> ProcessesLongTable:
+    """
+    creates process table state, which is written to temporary file until its standardized name is known
+    :param full_filename: full name of the raw Script2 file
+    :param out_dir: directory to store resulting files
+    :return: ProcessesLongTable structure
+    """
+    tmp_fullname = Path(out_dir) / (PROCESSES_TMP_FILE_PREFIX + Path(full_filename).name + '.'
+                                    + rawu.RAW_SCRIPT2_PROCESSES_LONG_FILENAME_SUFFIX + '.csv')
+
+    return ProcessesLongTable(out_fullname=str(tmp_fullname))
+
+
+def add_processes_to_long_table(table: ProcessesLongTable, start_datetime, prc_rows):
+    """
+    adds processes of one timestamp record to the process table, full row groups are written to the file
+    :param table: ProcessesLongTable structure
+    :param start_datetime: standardized datetime string of the record
+    :param prc_rows: list of tuples (process name, pid, metric name, value), see get_processes_info_from_timestamp
+    :return: None
+    """
+    for prc_name, prc_pid, metric_name, value in prc_rows:
+        code = table.name_codes.setdefault(prc_name, len(table.name_codes))
+
+        table.datetimes.append(start_datetime)
+        table.codes.append(code)
+        table.pids.append(prc_pid)
+        table.metrics.append(metric_name)
+        table.values.append(value)
+
+    if len(table.values) >= SCRIPT2_PROCESS_ROW_GROUP_SIZE:
+        flush_processes_long_table(table)
+
+
+def flush_processes_long_table(table: ProcessesLongTable):
+    """
+    appends collected rows of the process table to its file as one row group
+    :param table: ProcessesLongTable structure
+    :return: None
+    """
+    if not table.values and table.num_rows:
+        return
+
+    group_df = pd.DataFrame({rawu.RAW_START_DATETIME_COLUMN_NAME: table.datetimes,
+                             rawu.PROCESS_NAME_CODE_COLUMN_NAME: pd.Series(table.codes, dtype='int32'),
+                             rawu.PROCESS_PID_COLUMN_NAME: pd.Series(table.pids, dtype='int64'),
+                             rawu.METRIC_COLUMN_NAME: pd.Series(table.metrics, dtype='category'),
+                             rawu.METRIC_VALUE_COLUMN_NAME: pd.Series(table.values, dtype='float64')},
+                            columns=rawu.PROCESSES_LONG_COLUMN_NAMES)
+
+    group_df.to_csv(table.out_fullname, mode='w' if table.num_rows == 0 else 'a', header=(table.num_rows == 0),
+                    index=False)
+    table.num_rows += len(group_df)
+
+    table.datetimes = []
+    table.codes = []
+    table.pids = []
+    table.metrics = []
+    table.values = []
+
+
+def get_std_Script2_filenames(sys_df: pd.DataFrame, suffixes, claim_func=None):
+    """
+    creates standardized CSV-filenames of all outputs of one raw Script2 file in one pass;
+    all outputs have the same time range as overall system table
+    :param sys_df: standardized overall system Dataframe
+    :param suffixes: list of standardized filename suffixes of the outputs
+    :param claim_func: function, which claims the name for the raw file in the run, see get_std_filename_claimer
+    :return: dict suffix -> filename
+    """
+    datetimes = pd.to_datetime(sys_df[rawu.RAW_START_DATETIME_COLUMN_NAME].iloc[[0, -1]],
+                               format=rawu.STD_SCRIPT2_DATETIME_FORMAT)
+    pc_name = str(sys_df[rawu.RAW_PC_NAME_COLUMN_NAME].iat[0])
+
+    filenames = rawu.get_std_raw_filenames([(pc_name, datetimes.iat[0], datetimes.iat[1], suffix)
+                                            for suffix in suffixes], claim_func=claim_func)
+
+    return dict(zip(suffixes, filenames))
+
+
+def store_top_processes(summary_df: pd.DataFrame, std_names, out_dir, top_n):
+    """
+    stores top processes of one raw Script2 file
+    :param summary_df: process summary Dataframe, see get_process_summary_df
+    :param std_names: dict suffix -> standardized filename, see get_std_Script2_filenames
+    :param out_dir: directory to store resulting file
+    :param top_n: number of processes to keep per metric
+    :return: full name of the stored file
+    """
+    return rawu.store_std_df(summ.get_top_processes_df(summary_df, top_n), out_dir,
+                             std_names[rawu.RAW_SCRIPT2_PROCESSES_TOP_FILENAME_SUFFIX], 'Script2 top processes')
+
+
+def close_processes_long_table(table: ProcessesLongTable, std_names, out_dir):
+    """
+    writes the rest of the process table, and stores it and its names table under standardized names
+    :param table: ProcessesLongTable structure
+    :param std_names: dict suffix -> standardized filename, see get_std_Script2_filenames
+    :param out_dir: directory to store resulting files
+    :return: tuple (full name of process table, full name of names table)
+    """
+    flush_processes_long_table(table)
+
+    long_fullname = str(Path(out_dir) / std_names[rawu.RAW_SCRIPT2_PROCESSES_LONG_FILENAME_SUFFIX])
+    os.replace(table.out_fullname, long_fullname)
+    logging.info('Standardized Script2 processes (' + str(table.num_rows) + ' rows) are stored to "'
+                 + long_fullname + '"')
+
+    names_df = pd.DataFrame([(code, name) for name, code in table.name_codes.items()],
+                            columns=rawu.PROCESSES_NAMES_COLUMN_NAMES)
+    names_fullname = rawu.store_std_df(names_df, out_dir, std_names[rawu.RAW_SCRIPT2_PROCESSES_NAMES_FILENAME_SUFFIX],
+                                       'Script2 processes names')
+
+    return long_fullname, names_fullname
 
 
 def parse_script2_record(timestamp, rec):
@@ -427,8 +689,6 @@ def parse_script2_record(timestamp, rec):
     avg_cpu_load_df = get_avg_cpu_load_row(cpu_load_per_core_df)
     overall_sys_process_df = get_sys_overall_row()
 
-    prc_info = get_processes_info_from_timestamp(rec)
-
     sys_rec = pd.concat([dt_df, machine_info_df, disk_io_info_df, virtual_mem_info_df,
                          total_net_info_df, overall_sys_process_df, cpu_load_per_core_df, avg_cpu_load_df],
                         axis=1)
@@ -436,103 +696,298 @@ def parse_script2_record(timestamp, rec):
     return sys_rec
 
 
-def get_process_name_as_filename_suffix(prc_name):
+def validate_script2_record(timestamp, rec):
     """
-    converts PC name to format, applicable for filenames
-    :param prc_name:
-    :return: converted PC name
+    checks one timestamp record against Script2 record schema
+    :param timestamp:
+    :param rec:
+    :return: reason string for bad record, None for valid one
     """
-    result_name = prc_name.upper()
-
-    result_name = result_name.replace('.', '_')
+    try:
+        datetime.strptime(timestamp, SCRIPT2_TIMESTAMP_FORMAT)
+    except (TypeError, ValueError):
+        return 'wrong timestamp format'
 
-    return result_name
+    return SCRIPT2_RECORD_VALIDATOR(rec)
 
 
-def get_standardized_process_out_filename(df: pd.DataFrame):
+def get_script2_sys_row_fast(timestamp, rec) -> dict:
     """
-    creates standardized CSV-filename to store process info from Script2 raw file
+    creates standardized overall system row of one timestamp record, without checks;
+    gives the same columns as parse_script2_record, so it must be called only for validated records
+    :param timestamp:
+    :param rec: one validated Script2 json record
+    :return: dict column name -> value
+    """
+    sys_stats = get_sys_stats_dict(rec)
+    cpu_stats = get_cpu_stats_dict(rec)
+    io_bytes = cpu_stats[SCRIPT2_IO_BYTES_STR]
+    io_ms = cpu_stats[SCRIPT2_IO_MS_STR]
+    mem_bytes = cpu_stats[SCRIPT2_MEM_BYTES_STR]
+    net_bytes = cpu_stats[SCRIPT2_NET_BYTES_STR]
+    load_list = cpu_stats[SCRIPT2_SYS_STATS_CPU_LOAD_STR]
+
+    sys_row = dict(zip(rawu.TIMESTAMPS_COLUMN_NAMES_RM, get_datetime_strs(timestamp)))
+    sys_row[rawu.RAW_PC_NAME_COLUMN_NAME] = str(sys_stats[SCRIPT2_SYS_STATS_PC_NAME_STR]).upper()
+    sys_row[rawu.CPU_TYPE_COLUMN_NAME] = sys_stats[SCRIPT2_SYS_STATS_CPU_TYPE_STR]
+    sys_row[rawu.CPU_DETAILS_COLUMN_NAME] = sys_stats[SCRIPT2_SYS_STATS_CPU_DETAILS_STR]
+    sys_row[rawu.CPU_NUM_CORES_COLUMN_NAME] = cpu_stats[SCRIPT2_CPU_STATS_NUM_CORES_STR]
+    sys_row[rawu.DISK_IO_BYTES_READ_TOTAL_COLUMN_NAME] = io_bytes[SCRIPT2_IO_BYTES_READ_IDX]
+    sys_row[rawu.DISK_IO_BYTES_WRITTEN_TOTAL_COLUMN_NAME] = io_bytes[SCRIPT2_IO_BYTES_WRITTEN_IDX]
+    sys_row[rawu.DISK_IO_MS_READ_TOTAL_COLUMN_NAME] = io_ms[SCRIPT2_IO_MS_READ_IDX]
+    sys_row[rawu.DISK_IO_MS_WRITTEN_TOTAL_COLUMN_NAME] = io_ms[SCRIPT2_IO_MS_WRITTEN_IDX]
+    sys_row[rawu.VIRTUAL_MEM_BYTES_TOTAL_COLUMN_NAME] = mem_bytes[SCRIPT2_MEM_BYTES_TOTAL_IDX]
+    sys_row[rawu.VIRTUAL_MEM_BYTES_USED_COLUMN_NAME] = mem_bytes[SCRIPT2_MEM_BYTES_USED_IDX]
+    sys_row[rawu.VIRTUAL_MEM_BYTES_AVAILABLE_COLUMN_NAME] = mem_bytes[SCRIPT2_MEM_BYTES_AVAILABLE_IDX]
+    sys_row[rawu.NETWORK_BYTES_SENT_TOTAL_COLUMN_NAME] = net_bytes[SCRIPT2_NET_BYTES_SENT_IDX]
+    sys_row[rawu.NETWORK_BYTES_RECEIVED_TOTAL_COLUMN_NAME] = net_bytes[SCRIPT2_NET_BYTES_RECEIVED_IDX]
+    sys_row[rawu.PROCESS_NAME_COLUMN_NAME] = rawu.OVERALL_SYSTEM_PROCESS_NAME
+    for core, load in enumerate(load_list):
+        sys_row[rawu.get_cpu_load_per_core_column_name(core)] = load
+    sys_row[rawu.OVERAL_CPU_LOAD_COLUMN_NAME] = sum(load_list) / len(load_list)
+
+    return sys_row
+
+
+def get_script2_sys_df_fast(records) -> pd.DataFrame:
+    """
+    creates standardized overall system Dataframe from validated records in one construction
+    :param records: list of tuples (timestamp, validated record)
+    :return: created Dataframe
+    """
+    return rawu.downcast_std_df(pd.DataFrame([get_script2_sys_row_fast(timestamp, rec) for timestamp, rec in records]))
+
+
+def store_standardized_Script2_to_outfile(df: pd.DataFrame, out_dir: str, std_names):
+    """
+    stores overall system Dataframe to out dir
     :param df:
-    :return: created filename
+    :param out_dir:
+    :param std_names: dict suffix -> standardized filename, see get_std_Script2_filenames
+    :return: full name of the stored file
     """
-    pc_name = str(df.iloc[0][rawu.RAW_PC_NAME_COLUMN_NAME])
-    start_date_str = str(df.iloc[0][rawu.RAW_START_DATE_COLUMN_NAME])
-    start_time_str = rawu.convert_df_time_to_str(df.iloc[0][rawu.RAW_START_TIME_COLUMN_NAME])
-    end_date_str = str(df.iloc[-1][rawu.RAW_START_DATE_COLUMN_NAME])
-    end_time_str = rawu.convert_df_time_to_str(df.iloc[-1][rawu.RAW_START_TIME_COLUMN_NAME])
+    return rawu.store_std_df(df, out_dir, std_names[rawu.RAW_SCRIPT2_SYS_FILENAME_SUFFIX],
+                             'Script2 ' + rawu.OVERALL_SYSTEM_PROCESS_NAME)
 
-    process_name = str(df.iloc[0][rawu.PROCESS_NAME_COLUMN_NAME])
-    process_name = get_process_name_as_filename_suffix(process_name)
 
-    suffix_name = process_name + rawu.RAW_FILENAME_DELIM + rawu.RAW_SCRIPT2_REALMEAS_FILENAME_SUFFIX
-
-    csv_name = rawu.get_std_raw_filename(pc_name,
-                                         start_date_str, start_time_str,
-                                         end_date_str, end_time_str,
-                                         suffix_name, 'csv')
+def is_Script2_timestamp_in_window(timestamp, options: rawu.StdOptions):
+    """
+    :param timestamp: timestamp key of Script2 record
+    :param options: StdOptions structure with the time window
+    :return: True if the record is within the time window; True for wrong timestamp, so the record is validated
+    """
+    try:
+        # timezone is ignored, as in get_datetime_strs
+        timestamp_dt = datetime.strptime(timestamp, SCRIPT2_TIMESTAMP_FORMAT).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        return True
 
-    return csv_name
+    return rawu.is_in_time_window(timestamp_dt, options)
 
 
-def store_standardized_Script2_to_outfile(df: pd.DataFrame, out_dir: str):
+def read_Script2_records(full_filename: str, options: rawu.StdOptions = None):
     """
-    stores Dataframe to out dir
-    :param df:
-    :param out_dir:
-    :return: None
+    streams records of the raw Script2 file, sorted by timestamps:
+    as dict keys are not mandatory sorted, records are reordered within SCRIPT2_REORDER_WINDOW_SIZE records;
+    a record, which is late for more than the window, is yielded in file order with a warning
+    (the caller sorts the overall system records, so only process table rows of such records stay in file order)
+    :param full_filename: string with full name (including full path) of the raw Script2 file
+    :param options: StdOptions structure with the time window, None for all records
+    :return: generator of tuples (timestamp, record)
     """
-    out_name = get_standardized_process_out_filename(df)
+    # records out of the time window are dropped by their timestamp keys while streaming, before they are kept
+    is_window_set = (options is not None) and rawu.is_time_window_set(options)
+
+    # heap of tuples (timestamp, file position, record), position keeps equal timestamps in file order
+    reorder_heap = []
+    last_timestamp = None
+    num_late = 0
+
+    # stream (possibly compressed) file instead of reading it whole
+    with rawu.open_raw_file(full_filename) as json_file:
+        for position, (timestamp, rec) in enumerate(rawu.iter_json_object_items(json_file)):
+            if is_window_set and not is_Script2_timestamp_in_window(timestamp, options):
+                continue
+
+            if (last_timestamp is not None) and (timestamp < last_timestamp):
+                num_late += 1
+                yield timestamp, rec
+                continue
 
-    out_fullname = str(Path(out_dir) / out_name)
+            heapq.heappush(reorder_heap, (timestamp, position, rec))
+            if len(reorder_heap) > SCRIPT2_REORDER_WINDOW_SIZE:
+                last_timestamp, position, rec = heapq.heappop(reorder_heap)
+                yield last_timestamp, rec
 
-    logging.info('Store file to ' + out_fullname)
-    df.to_csv(out_fullname, index=False)
+    while reorder_heap:
+        timestamp, position, rec = heapq.heappop(reorder_heap)
+        yield timestamp, rec
 
+    if num_late:
+        logging.warning('"' + full_filename + '": ' + str(num_late) + ' records are out of time order by more than '
+                        + str(SCRIPT2_REORDER_WINDOW_SIZE) + ' records, they are kept in file order')
 
-def standardize_raw_Script2_file(full_filename: str, out_dir: str):
+
+def estimate_Script2_file_memory(full_filename, size, options: rawu.StdOptions):
+    """
+    estimates peak memory of standardization of the raw Script2 file
+    :param full_filename: full name (including full path) of the raw Script2 file
+    :param size: size of the raw file in bytes
+    :param options: StdOptions structure
+    :return: estimated memory in bytes
+    """
+    return rawu.get_raw_file_uncompressed_size(full_filename, size) * SCRIPT2_MEMORY_PER_RAW_BYTE
+
+
+def standardize_raw_Script2_file(full_filename: str, out_dir: str, options: rawu.StdOptions = None):
     """
     converts to std format the json-files, created in the format of the script
     https://github.com/vovetskyy/GP_FastShot1/blob/0aa893d3a6ab1badd33bcb735aee5e09351f960e/main.py
 
     :param full_filename: string with full name (including full path) of the raw IPG file
     :param out_dir: string with full path to the directory to store resulting file(s)
-    :return: None
+    :param options: StdOptions structure, None for default options
+    :return: StdFileReport structure
     """
     logging.info('Start handling of file ' + '"' + full_filename + '"')
 
-    with open(full_filename) as json_file:
-        json_dict = json.load(json_file)
+    if options is None:
+        options = rawu.StdOptions()
+    report = rawu.StdFileReport(full_filename=full_filename)
+
+    # parsed tables of the same content could be already cached; the cache holds tables of whole files,
+    # so it's not used for time slices
+    cache_key = None
+    if options.cache_dir and not rawu.is_time_window_set(options):
+        cache_key = cache.get_cache_key(full_filename, reg.RAW_SOURCE_SCRIPT2, SCRIPT2_PARSER_VERSION,
+                                        CACHE_PROCESSES_OPTIONS_TAG if options.store_processes else '')
+        with rawu.timed_stage(report, rawu.STAGE_CACHE_LOAD):
+            cached_tables = cache.load_cached_tables(options.cache_dir, cache_key)
+        if cached_tables is not None:
+            report_row = cached_tables[CACHE_REPORT_TABLE_NAME].iloc[0]
+            report.records_total = int(report_row['records_total'])
+            report.records_bad = int(report_row['records_bad'])
+
+            with rawu.timed_stage(report, rawu.STAGE_STORE):
+                store_cached_Script2_tables(cached_tables, options, cache_key, out_dir, report)
+            return report
+
+    processes_table = create_processes_long_table(full_filename, out_dir) if options.store_processes else None
+    # the summary is computed even if not requested, so it's cached for later runs with summaries
+    processes_summary = summ.ProcessSummary()
+
+    # validate all records in one pass, bad ones go to quarantine, the rest takes the unchecked fast path;
+    # processes are streamed to the long process table and the process summary, so they are not kept for later
+    good_records = []
+    bad_records = []
+    with rawu.timed_stage(report, rawu.STAGE_READ):
+        for timestamp, rec in read_Script2_records(full_filename, options):
+            reason = validate_script2_record(timestamp, rec)
+            if reason is None:
+                good_records.append((timestamp, rec[:SCRIPT2_PROCESSES_STATS_IDX]))
+                prc_rows = list(get_processes_info_from_timestamp(rec))
+                summ.add_processes_to_summary(processes_summary, prc_rows)
+                if processes_table is not None:
+                    add_processes_to_long_table(processes_table, get_datetime_strs(timestamp)[0], prc_rows)
+            else:
+                bad_records.append((timestamp, rec, reason))
+
+    report.records_total = len(good_records) + len(bad_records)
+    report.records_bad = len(bad_records)
+    rawv.quarantine_records(full_filename, options.quarantine_dir, bad_records)
+
+    if not good_records:
+        if processes_table is not None:
+            Path(processes_table.out_fullname).unlink(missing_ok=True)
+        if (not bad_records) and rawu.is_time_window_set(options):
+            logging.info('"' + full_filename + '" has no records in the time window')
+            return report
+        rawv.quarantine_raw_file(full_filename, options.quarantine_dir, 'no valid records')
+        report.is_quarantined = True
+        return report
+
+    # create final DataFrames with the overall system info
+    with rawu.timed_stage(report, rawu.STAGE_TRANSFORM):
+        # records late for more than the reorder window are placed by a stable sort, as the table and its time range,
+        # used for names of all outputs, must be sorted as with sorted keys
+        good_records.sort(key=lambda timestamp_rec: timestamp_rec[0])
+        sys_df = get_script2_sys_df_fast(good_records)
+
+    with rawu.timed_stage(report, rawu.STAGE_STORE):
+        logging.info('Store overall system info')
+        std_names = get_std_Script2_filenames(sys_df, SCRIPT2_STD_FILENAME_SUFFIXES,
+                                              chkp.get_std_filename_claimer(options, report.full_filename, out_dir))
+        report.out_files.append(store_standardized_Script2_to_outfile(sys_df, out_dir, std_names))
+
+        cached_files = {}
+        if processes_table is not None:
+            long_fullname, names_fullname = close_processes_long_table(processes_table, std_names, out_dir)
+            report.out_files += [long_fullname, names_fullname]
+            cached_files = {CACHE_PROCESSES_LONG_FILE_NAME: long_fullname,
+                            CACHE_PROCESSES_NAMES_FILE_NAME: names_fullname}
+
+        pc_name = str(sys_df.iloc[0][rawu.RAW_PC_NAME_COLUMN_NAME])
+        summary_df = summ.get_process_summary_df(processes_summary, pc_name)
+        if options.top_processes > 0:
+            report.process_summary = summary_df
+            report.out_files.append(store_top_processes(summary_df, std_names, out_dir, options.top_processes))
+
+    if cache_key is not None:
+        report_df = pd.DataFrame([{'records_total': report.records_total, 'records_bad': report.records_bad}])
+        cache.store_cached_tables(options.cache_dir, cache_key,
+                                  {CACHE_SYS_TABLE_NAME: sys_df, CACHE_REPORT_TABLE_NAME: report_df,
+                                   CACHE_PROCESSES_SUMMARY_TABLE_NAME: summary_df}, cached_files)
+        cache.evict_cache(options.cache_dir, options.cache_max_bytes)
+
+    return report
+
+
+def store_cached_Script2_tables(cached_tables, options: rawu.StdOptions, cache_key, out_dir, report):
+    """
+    stores standardized files of one raw Script2 file from its cached parsed tables
+    :param cached_tables: dict table name -> Dataframe, loaded from cache
+    :param options: StdOptions structure
+    :param cache_key: cache key of the raw file
+    :param out_dir: directory to store resulting files
+    :param report: StdFileReport structure to add stored files to
+    :return: None
+    """
+    sys_df = cached_tables[CACHE_SYS_TABLE_NAME]
 
-    # as dict keys are not mandatory sorted, get timestamps sorted by time
-    times_list = list(json_dict.keys())
-    times_list.sort()
+    logging.info('Store overall system info')
+    std_names = get_std_Script2_filenames(sys_df, SCRIPT2_STD_FILENAME_SUFFIXES,
+                                          chkp.get_std_filename_claimer(options, report.full_filename, out_dir))
+    report.out_files.append(store_standardized_Script2_to_outfile(sys_df, out_dir, std_names))
 
-    # create final DataFrames with the overall system info and process-specific info
-    sys_list = []
-    for i in range(len(times_list)):
-        sys_rec = parse_script2_record(times_list[i], json_dict[times_list[i]])
-        sys_list.append(sys_rec)
-    sys_df = pd.concat(sys_list, ignore_index=True)
+    if options.store_processes:
+        for name, suffix in [(CACHE_PROCESSES_LONG_FILE_NAME, rawu.RAW_SCRIPT2_PROCESSES_LONG_FILENAME_SUFFIX),
+                             (CACHE_PROCESSES_NAMES_FILE_NAME, rawu.RAW_SCRIPT2_PROCESSES_NAMES_FILENAME_SUFFIX)]:
+            cached_file = cache.get_cached_file(options.cache_dir, cache_key, name)
+            if cached_file is not None:
+                out_fullname = str(Path(out_dir) / std_names[suffix])
+                shutil.copyfile(cached_file, out_fullname)
+                report.out_files.append(out_fullname)
 
-    logging.info('Store overall system info')
-    # store_standardized_Script2_to_outfile(sys_df, out_dir)
+    if options.top_processes > 0:
+        report.process_summary = cached_tables[CACHE_PROCESSES_SUMMARY_TABLE_NAME]
+        report.out_files.append(store_top_processes(report.process_summary, std_names, out_dir,
+                                                    options.top_processes))
 
 
-def standardize_raw_Script2_in_dir(parsing_dir: str, out_dir: str):
+def standardize_raw_Script2_in_dir(parsing_dir: str, out_dir: str, resume=False, time_from=None, time_to=None):
     """
-    finds all raw Script2 files in parsing_dir and stores standardized files in out_dir
+    finds all raw Script2 files in parsing_dir and stores standardized files in out_dir;
+    completed files are checkpointed to out_dir, so an interrupted run could be resumed
     :param parsing_dir:
     :param out_dir:
+    :param resume: True to continue the interrupted run from its checkpoints
+    :param time_from: datetime to standardize records from (inclusive), None for no limit
+    :param time_to: datetime to standardize records till (exclusive), None for no limit
     :return: None
     """
     logging.info('Start standardization of raw Script2 files from "' + str(parsing_dir) + '" to "' + str(out_dir) + '"')
 
-    parse_path = Path(parsing_dir)
-    file_list = (list(parse_path.glob('*' + rawu.RAW_FILENAME_DELIM + rawu.RAW_SCRIPT2_FILENAME_SUFFIX + '.*')))
-
-    for file in file_list:
-        # standardize_raw_Script2_file(str(file), out_dir)
-        # pp(str(file))
-        continue
+    options = rawu.StdOptions(checkpoint_dir=chkp.get_checkpoint_dir(out_dir), resume=resume,
+                              time_from=time_from, time_to=time_to)
+    engine.standardize_raw_sources_in_dir(parsing_dir, out_dir, [reg.RAW_SOURCE_SCRIPT2], options=options)
 
-    standardize_raw_Script2_file(str(file_list[0]), out_dir)
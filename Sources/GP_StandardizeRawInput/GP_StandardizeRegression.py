@@ -0,0 +1,734 @@
+import logging
+import io
+import subprocess
+import sys
+import time
+import random
+import json
+import gzip
+import shutil
+import datetime as dt
+from pathlib import Path
+from dataclasses import dataclass, field
+from itertools import zip_longest
+import numpy as np
+import pandas as pd
+
+import GP_RawInputUtils as rawu
+import GP_RawSourceRegistry as reg
+import GP_StandardizeEngine as engine
+import GP_StandardizeRawIPG as ipg
+import GP_StandardizeRawScript2 as sc2
+import GP_StandardizeCheckpoint as chkp
+
+# =======================================
+# ============= CONSTANTS ===============
+CLI_SCRIPT_NAME = 'GP_StandardizeRawInput.py'
+
+# common CLI arguments of the reference and all optimized runs
+REGRESSION_CLI_ARGS = ['all', '--recursive', '--energy', '--join']
+
+REFERENCE_VARIANT_NAME = 'reference'
+# rows per chunk of chunked IPG runs and checks, small and odd to get many chunk boundaries
+CHECK_IPG_CHUNK_ROWS = 997
+CHECK_PARALLEL_JOBS = 2
+# max number of Script2 records converted by the slow reference parser per file
+CHECK_SCRIPT2_REFERENCE_RECORDS = 200
+# interval of polling for the committed chunk, after which the interrupted run is killed
+CHECK_INTERRUPT_POLL_SEC = 0.005
+# logged by the chunked IPG standardization, when it continues after the last committed chunk
+RESUMED_FILE_LOG_MARKER = 'is resumed after'
+# appended to chunked outputs after the kill, as rows of the chunk, which was being appended, but not committed
+UNCOMMITTED_ROWS = b'23:59:59:999,UNCOMMITTED\n23:59:59:999,TORN'
+
+# ---------------------------------------
+# ------- Generated raw files -----------
+DEF_GEN_IPG_ROWS = 20000
+DEF_GEN_SCRIPT2_RECORDS = 500
+DEF_GEN_SCRIPT2_PROCESSES = 30
+# processes per record of the Script2 file with shuffled keys, fewer as the file is longer
+GEN_SHUFFLED_SCRIPT2_PROCESSES = 10
+DEF_GEN_SEED = 1
+
+GEN_PC_NAMES = ['REGPC1', 'REGPC2']
+# measurements start shortly before midnight, so day wraparounds are covered
+GEN_START_DATETIME = dt.datetime(2022, 7, 14, 23, 50, 0)
+GEN_IPG_INTERVAL = dt.timedelta(milliseconds=100)
+GEN_IPG_FIRST_MEAS_DELAY = dt.timedelta(milliseconds=1)
+GEN_SCRIPT2_INTERVAL = dt.timedelta(seconds=2)
+GEN_RAW_FILENAME_DATETIME_FORMAT = '%Y-%m-%d_%H-%M-%S'
+GEN_IPG_HEADER = [ipg.IPG_TIME_COLUMN_NAME, 'RDTSC', ipg.IPG_ELAPSED_TIME_COLUMN_NAME, 'CPU Utilization(%)',
+                  'CPU Frequency_0(MHz)', 'Processor Power_0(Watt)', 'Cumulative Processor Energy_0(Joules)',
+                  'Cumulative Processor Energy_0(mWh)', 'IA Power_0(Watt)', 'Cumulative IA Energy_0(Joules)']
+GEN_SCRIPT2_NUM_CORES = 4
+# ---------------------------------------
+
+# ---------------------------------------
+# ------------ Comparison ---------------
+DEF_COMPARE_CHUNK_ROWS = 100000
+DEF_FLOAT_RTOL = 1e-9
+DEF_FLOAT_ATOL = 1e-9
+# max number of mismatches reported per compared table
+MAX_REPORTED_MISMATCHES = 10
+# ---------------------------------------
+# =======================================
+
+
+# =======================================
+# ============= STD TYPES ===============
+@dataclass()
+class StdVariant:
+    """
+    one way to standardize the same raw files, e.g. the reference one or an optimized one
+    """
+    name: str = ''
+    cli_args: list = field(default_factory=list)
+    # only outputs of the last run are compared, e.g. the 2nd run of the cached variant loads the cache
+    runs: int = 1
+    # True to kill the 1st run as soon as a chunk of IPG file is committed, and to keep its outputs and checkpoints,
+    # so the next run resumes the file after that chunk; rows of a not committed chunk are added to the kept outputs
+    is_interrupted: bool = False
+
+
+@dataclass()
+class CompareTolerance:
+    rtol: float = DEF_FLOAT_RTOL
+    atol: float = DEF_FLOAT_ATOL
+    chunk_rows: int = DEF_COMPARE_CHUNK_ROWS
+
+
+# =======================================
+
+
+def get_std_variants(work_dir):
+    """
+    :param work_dir: working directory of the regression run
+    :return: list of StdVariant structures of the optimized paths, compared with the reference one
+    """
+    return [StdVariant(name='chunked', cli_args=['--chunk-rows', str(CHECK_IPG_CHUNK_ROWS)]),
+            StdVariant(name='cached', cli_args=['--cache-dir', str(Path(work_dir) / 'cache')], runs=2),
+            StdVariant(name='parallel', cli_args=['--jobs', str(CHECK_PARALLEL_JOBS)]),
+            StdVariant(name='resumed', cli_args=['--chunk-rows', str(CHECK_IPG_CHUNK_ROWS), '--resume'], runs=2,
+                       is_interrupted=True)]
+
+
+# =======================================
+# ========= Generated raw files =========
+
+def get_gen_raw_filename(pc_name, start_datetime, suffix, extension):
+    """
+    :return: raw filename in the format, expected by get_filename_parts
+    """
+    return pc_name + rawu.RAW_FILENAME_DELIM + start_datetime.strftime(GEN_RAW_FILENAME_DATETIME_FORMAT) \
+           + rawu.RAW_FILENAME_DELIM + suffix + '.' + extension
+
+
+def generate_raw_IPG_file(raw_dir, pc_name, start_datetime, num_rows, rng: random.Random, compress=False):
+    """
+    generates raw IPG file with real-time and cumulative measurements; lines are written one by one,
+    so files of any size could be generated
+    :param raw_dir: directory to store the file
+    :param pc_name: name of PC
+    :param start_datetime: start datetime of the measurements, stored in the filename
+    :param num_rows: number of real-time measurements
+    :param rng: random generator
+    :param compress: True to store gzip-compressed file
+    :return: full name of the generated file
+    """
+    full_filename = Path(raw_dir) / get_gen_raw_filename(pc_name, start_datetime, rawu.RAW_IPG_FILENAME_SUFFIX,
+                                                         'csv.gz' if compress else 'csv')
+    interval_sec = GEN_IPG_INTERVAL.total_seconds()
+
+    energy = 0.0
+    ia_energy = 0.0
+    with (gzip.open(full_filename, 'wt') if compress else open(full_filename, 'w')) as ipg_file:
+        ipg_file.write(ipg.IPG_CSV_DELIM.join(GEN_IPG_HEADER) + '\n')
+        for i in range(num_rows):
+            meas_datetime = start_datetime + GEN_IPG_FIRST_MEAS_DELAY + i * GEN_IPG_INTERVAL
+            power = 5 + rng.random()
+            ia_power = power / 2
+            energy += power * interval_sec
+            ia_energy += ia_power * interval_sec
+
+            ipg_file.write(ipg.IPG_CSV_DELIM.join([
+                meas_datetime.strftime('%H:%M:%S') + ':' + f'{meas_datetime.microsecond // 1000:03d}',
+                str(1000 + i), f'{i * interval_sec:.3f}', f'{rng.random() * 100:.3f}', '2400',
+                f'{power:.3f}', f'{energy:.3f}', f'{energy / 3.6:.3f}', f'{ia_power:.3f}', f'{ia_energy:.3f}'])
+                + '\n')
+
+        ipg_file.write('\n'.join(['',
+                                  f'Total Elapsed Time (sec) {ipg.IPG_CUM_MEAS_DELIM} '
+                                  f'{max(num_rows - 1, 0) * interval_sec:.3f}',
+                                  f'Measured RDTSC Frequency (GHz) {ipg.IPG_CUM_MEAS_DELIM} 2.592',
+                                  '',
+                                  f'Cumulative Processor Energy_0 (Joules) {ipg.IPG_CUM_MEAS_DELIM} {energy:.3f}',
+                                  f'Cumulative Processor Energy_0 (mWh) {ipg.IPG_CUM_MEAS_DELIM} {energy / 3.6:.3f}',
+                                  f'Cumulative IA Energy_0 (Joules) {ipg.IPG_CUM_MEAS_DELIM} {ia_energy:.3f}',
+                                  '']))
+
+    return str(full_filename)
+
+
+def generate_raw_Script2_file(raw_dir, pc_name, start_datetime, num_records, num_processes, rng: random.Random,
+                              shuffle_keys=False):
+    """
+    generates raw Script2 file; processes with the same name and different pids are included
+    :param raw_dir: directory to store the file
+    :param pc_name: name of PC
+    :param start_datetime: start datetime of the records, stored in the filename
+    :param num_records: number of timestamp records
+    :param num_processes: number of processes per record
+    :param rng: random generator
+    :param shuffle_keys: if True, timestamp keys are written in random order, and the earliest one is written last
+    :return: full name of the generated file
+    """
+    full_filename = Path(raw_dir) / get_gen_raw_filename(pc_name, start_datetime, rawu.RAW_SCRIPT2_FILENAME_SUFFIX,
+                                                         'json')
+
+    records = {}
+    for i in range(num_records):
+        timestamp = (start_datetime + i * GEN_SCRIPT2_INTERVAL).strftime(sc2.SCRIPT2_TIMESTAMP_FORMAT)
+
+        processes = {}
+        # the set of processes changes over time, so summaries see appearing and disappearing processes
+        for j in range(i % 3, num_processes + i % 3):
+            pid = 100 + j
+            processes[str(pid)] = {sc2.SCRIPT2_PROCESS_NAME_STR: 'proc' + str(j % max(num_processes - 5, 1)) + '.exe',
+                                   sc2.SCRIPT2_PROCESS_PID_STR: pid,
+                                   'cpu_percent': rng.random() * 20,
+                                   'memory_percent': rng.random(),
+                                   'memory_info': [rng.randrange(10 ** 6, 10 ** 9), rng.randrange(10 ** 6, 10 ** 9)]}
+
+        records[timestamp] = [
+            {sc2.SCRIPT2_SYS_STATS_STR: {sc2.SCRIPT2_SYS_STATS_PC_NAME_STR: pc_name.lower(),
+                                         sc2.SCRIPT2_SYS_STATS_CPU_TYPE_STR: 'AMD64',
+                                         sc2.SCRIPT2_SYS_STATS_CPU_DETAILS_STR: 'Intel64 Family 6'}},
+            {sc2.SCRIPT2_CPU_STATS_STR: {
+                sc2.SCRIPT2_CPU_STATS_NUM_CORES_STR: GEN_SCRIPT2_NUM_CORES,
+                sc2.SCRIPT2_SYS_STATS_CPU_LOAD_STR: [rng.random() * 100 for core in range(GEN_SCRIPT2_NUM_CORES)],
+                sc2.SCRIPT2_IO_BYTES_STR: [1000 * i, 2000 * i],
+                sc2.SCRIPT2_IO_MS_STR: [i, 2 * i],
+                sc2.SCRIPT2_MEM_BYTES_STR: [16e9, 8e9 + rng.random() * 1e9, 8e9],
+                sc2.SCRIPT2_NET_BYTES_STR: [10 * i, 20 * i]}},
+            {'GPU Stats': {}},
+            {sc2.SCRIPT2_PROCESSES_STATS_STR: processes}]
+
+    if shuffle_keys:
+        timestamps = list(records)
+        rng.shuffle(timestamps)
+        timestamps.remove(min(timestamps))
+        timestamps.append(min(records))
+        records = {timestamp: records[timestamp] for timestamp in timestamps}
+
+    with open(full_filename, 'w') as json_file:
+        json.dump(records, json_file)
+
+    return str(full_filename)
+
+
+def generate_raw_files(raw_dir, ipg_rows=DEF_GEN_IPG_ROWS, script2_records=DEF_GEN_SCRIPT2_RECORDS,
+                       seed=DEF_GEN_SEED):
+    """
+    generates deterministic set of raw files: IPG and Script2 files of the 1st PC, compressed IPG file of the 2nd one
+    and its Script2 file with shuffled keys, all of them crossing midnight;
+    the shuffled file has more records than the Script2 reorder window, so some records are late for more than it
+    :param raw_dir: directory to store the files, subdirectory per PC
+    :param ipg_rows: number of real-time measurements per IPG file
+    :param script2_records: number of records per Script2 file in time order
+    :param seed: seed of the random generator
+    :return: list of full names of generated files
+    """
+    rng = random.Random(seed)
+
+    generated_list = []
+    for pc_idx, pc_name in enumerate(GEN_PC_NAMES):
+        pc_dir = Path(raw_dir) / pc_name
+        pc_dir.mkdir(parents=True, exist_ok=True)
+
+        generated_list.append(generate_raw_IPG_file(pc_dir, pc_name, GEN_START_DATETIME, ipg_rows, rng,
+                                                    compress=(pc_idx > 0)))
+        if pc_idx == 0:
+            generated_list.append(generate_raw_Script2_file(pc_dir, pc_name, GEN_START_DATETIME, script2_records,
+                                                            DEF_GEN_SCRIPT2_PROCESSES, rng))
+        else:
+            generated_list.append(generate_raw_Script2_file(pc_dir, pc_name, GEN_START_DATETIME,
+                                                            script2_records + sc2.SCRIPT2_REORDER_WINDOW_SIZE,
+                                                            GEN_SHUFFLED_SCRIPT2_PROCESSES, rng, shuffle_keys=True))
+
+    logging.info(str(len(generated_list)) + ' raw files are generated in "' + str(raw_dir) + '"')
+
+    return generated_list
+
+
+# =======================================
+# ============= Comparison ==============
+
+def get_values_mismatch(ref_serie: pd.Series, serie: pd.Series, tolerance: CompareTolerance):
+    """
+    compares values of two columns cell by cell, depending on their dtypes:
+    floats with tolerance, integers exactly, all other values as strings
+    :param ref_serie: reference column
+    :param serie: compared column of the same length
+    :param tolerance: CompareTolerance structure
+    :return: numpy bool array, True for mismatched cells
+    """
+    is_numeric = pd.api.types.is_numeric_dtype(ref_serie) and pd.api.types.is_numeric_dtype(serie) \
+                 and not pd.api.types.is_bool_dtype(ref_serie) and not pd.api.types.is_bool_dtype(serie)
+
+    if is_numeric and pd.api.types.is_integer_dtype(ref_serie) and pd.api.types.is_integer_dtype(serie):
+        return ref_serie.to_numpy() != serie.to_numpy()
+    elif is_numeric:
+        return ~np.isclose(ref_serie.to_numpy(dtype=float), serie.to_numpy(dtype=float),
+                           rtol=tolerance.rtol, atol=tolerance.atol, equal_nan=True)
+
+    return ref_serie.astype(str).to_numpy() != serie.astype(str).to_numpy()
+
+
+def compare_std_dfs(ref_df: pd.DataFrame, df: pd.DataFrame, name, tolerance: CompareTolerance, row_offset=0):
+    """
+    compares standardized tables cell by cell
+    :param ref_df: reference Dataframe
+    :param df: compared Dataframe
+    :param name: name of the table, used in mismatch descriptions
+    :param tolerance: CompareTolerance structure
+    :param row_offset: number of table rows before the passed ones, if tables are compared by chunks
+    :return: list of mismatch descriptions, empty if tables are equal
+    """
+    if list(ref_df.columns) != list(df.columns):
+        return [name + ': columns ' + str(list(df.columns)) + ' differ from reference ' + str(list(ref_df.columns))]
+
+    mismatches = []
+    if len(ref_df) != len(df):
+        mismatches.append(name + ': ' + str(len(df)) + ' rows differ from reference ' + str(len(ref_df))
+                          + ' rows after row ' + str(row_offset))
+
+    num_rows = min(len(ref_df), len(df))
+    for column in ref_df.columns:
+        ref_serie = ref_df[column].iloc[:num_rows].reset_index(drop=True)
+        serie = df[column].iloc[:num_rows].reset_index(drop=True)
+
+        mismatched_rows = np.flatnonzero(get_values_mismatch(ref_serie, serie, tolerance))
+        for row in mismatched_rows[:MAX_REPORTED_MISMATCHES]:
+            mismatches.append(name + ': row ' + str(row_offset + row) + ', column "' + str(column) + '": '
+                              + repr(serie.iat[row]) + ' differs from reference ' + repr(ref_serie.iat[row]))
+        if len(mismatched_rows) > MAX_REPORTED_MISMATCHES:
+            mismatches.append(name + ': column "' + str(column) + '": '
+                              + str(len(mismatched_rows) - MAX_REPORTED_MISMATCHES) + ' more mismatched rows')
+
+    return mismatches
+
+
+def compare_std_files(ref_fullname, fullname, name, tolerance: CompareTolerance):
+    """
+    compares standardized csv-files chunk by chunk, so files of any size could be compared
+    :param ref_fullname: full name of the reference file
+    :param fullname: full name of the compared file
+    :param name: name of the table, used in mismatch descriptions
+    :param tolerance: CompareTolerance structure
+    :return: list of mismatch descriptions, empty if files are equal
+    """
+    mismatches = []
+
+    row_offset = 0
+    try:
+        with pd.read_csv(ref_fullname, chunksize=tolerance.chunk_rows, low_memory=False) as ref_chunks, \
+                pd.read_csv(fullname, chunksize=tolerance.chunk_rows, low_memory=False) as chunks:
+            for ref_chunk, chunk in zip_longest(ref_chunks, chunks):
+                if (ref_chunk is None) or (chunk is None):
+                    mismatches.append(name + ': number of rows differs from reference after row ' + str(row_offset))
+                    break
+
+                mismatches += compare_std_dfs(ref_chunk, chunk, name, tolerance, row_offset)
+                if len(mismatches) >= MAX_REPORTED_MISMATCHES:
+                    break
+                row_offset += len(ref_chunk)
+    except pd.errors.ParserError as err:
+        # e.g. torn rows
+        mismatches.append(name + ': wrong csv format after row ' + str(row_offset) + ': ' + str(err).strip())
+
+    return mismatches
+
+
+def get_std_relative_names(std_dir):
+    """
+    :param std_dir: directory with standardized files
+    :return: set of relative names of all files in std_dir and its subdirs, including partitions;
+             hidden files and dirs (e.g. checkpoints) are skipped
+    """
+    return {str(file.relative_to(std_dir)) for file in Path(std_dir).rglob('*')
+            if file.is_file() and not any([part.startswith('.') for part in file.relative_to(std_dir).parts])}
+
+
+def compare_std_dirs(ref_dir, std_dir, tolerance: CompareTolerance):
+    """
+    compares standardized filenames and tables of two directories
+    :param ref_dir: directory with reference standardized files
+    :param std_dir: directory with compared standardized files
+    :param tolerance: CompareTolerance structure
+    :return: list of mismatch descriptions, empty if directories are equal
+    """
+    ref_names = get_std_relative_names(ref_dir)
+    names = get_std_relative_names(std_dir)
+
+    mismatches = ['standardized file is missing: ' + name for name in sorted(ref_names - names)]
+    mismatches += ['unexpected standardized file: ' + name for name in sorted(names - ref_names)]
+
+    for name in sorted(ref_names & names):
+        mismatches += compare_std_files(Path(ref_dir) / name, Path(std_dir) / name, name, tolerance)
+
+    return mismatches
+
+
+# =======================================
+# ===== Reference implementations =======
+
+def get_aligned_datetime_serie_reference(orig_df, filename_parts):
+    """
+    reference row-by-row implementation of rawu.get_aligned_datetime_serie
+    :param orig_df: datetime Serie with inaligned dates
+    :param filename_parts: parsed RawInputFilenameParts structure
+    :return: aligned Serie
+    """
+    aligned_df = orig_df.copy()
+
+    start_date = dt.date.fromisoformat(filename_parts.Date)
+    start_time = dt.datetime.strptime(filename_parts.Time, "%H-%M-%S").time()
+    if aligned_df[0].time() < start_time:
+        start_date = start_date + dt.timedelta(days=1)
+
+    aligned_df[0] = aligned_df[0].replace(start_date.year, start_date.month, start_date.day)
+
+    cur_date = start_date
+    for i in range(1, len(aligned_df)):
+        if orig_df[i].time() < orig_df[i - 1].time():
+            cur_date = cur_date + dt.timedelta(days=1)
+
+        aligned_df[i] = aligned_df[i].replace(cur_date.year, cur_date.month, cur_date.day)
+
+    return aligned_df
+
+
+def transform_IPG_real_meas_to_df_reference(meas_lines, filename_parts):
+    """
+    reference implementation of ipg.transform_IPG_real_meas_to_df (without energy columns), as it was before
+    the optimizations: parsing of a text buffer without downcast, row-by-row datetime alignment, dates as objects
+    :param meas_lines: array of strings in csv-format
+    :param filename_parts: parsed RawInputFilenameParts structure
+    :return: converted pandas Dataframe
+    """
+    meas_df = pd.read_csv(io.StringIO('\n'.join(meas_lines)), delim_whitespace=False)
+
+    times_serie = pd.to_datetime(meas_df[ipg.IPG_TIME_COLUMN_NAME], format=ipg.IPG_TIME_FORMAT)
+    datetimes_serie = get_aligned_datetime_serie_reference(times_serie, filename_parts)
+    datetimes_serie.name = rawu.RAW_DATETIME_COLUMN_NAME
+
+    dates_serie = datetimes_serie.dt.date
+    dates_serie.name = rawu.RAW_DATE_COLUMN_NAME
+
+    meas_df.rename(columns={ipg.IPG_TIME_COLUMN_NAME: rawu.RAW_TIME_COLUMN_NAME}, inplace=True)
+
+    pc_name_serie = rawu.get_pc_name_serie(filename_parts.PC_name, len(dates_serie.index))
+
+    return pd.concat([pc_name_serie, datetimes_serie, dates_serie, meas_df], axis=1)
+
+
+def compare_stored_std_dfs(ref_df: pd.DataFrame, df: pd.DataFrame, name, tolerance: CompareTolerance):
+    """
+    compares standardized tables as they are stored: csv-texts line by line, as dtypes of the tables could differ
+    without change of the stored files, and then values of the re-read tables for details of the mismatch
+    :param ref_df: reference Dataframe
+    :param df: compared Dataframe
+    :param name: name of the table, used in mismatch descriptions
+    :param tolerance: CompareTolerance structure
+    :return: list of mismatch descriptions, empty if stored tables are equal
+    """
+    ref_csv = ref_df.to_csv(index=False)
+    csv = df.to_csv(index=False)
+    if csv == ref_csv:
+        return []
+
+    mismatches = []
+    for line_num, (ref_line, line) in enumerate(zip_longest(ref_csv.splitlines(), csv.splitlines())):
+        if line != ref_line:
+            mismatches.append(name + ': stored line ' + str(line_num) + ' ' + repr(line) + ' differs from reference '
+                              + repr(ref_line))
+            break
+
+    return mismatches + compare_std_dfs(pd.read_csv(io.StringIO(ref_csv)), pd.read_csv(io.StringIO(csv)), name,
+                                        tolerance)
+
+
+def check_IPG_file(full_filename, tolerance: CompareTolerance):
+    """
+    compares optimized datetime alignment and IPG transform with the reference ones on the raw IPG file:
+    vectorized alignment and alignment by chunks with the row-by-row one,
+    transform of the whole file with the reference transform, transform by chunks with the one of the whole file
+    :param full_filename: full name of the raw IPG file
+    :param tolerance: CompareTolerance structure
+    :return: list of mismatch descriptions
+    """
+    name = Path(full_filename).name
+    filename_parts = rawu.get_filename_parts(full_filename)
+
+    sections = ipg.read_IPG_sections(full_filename)
+    if sections is None:
+        return [name + ': wrong format: no sections delimiter found']
+    header_line = sections[0][0]
+    meas_lines = sections[0][1:]
+
+    whole_df = ipg.transform_IPG_real_meas_to_df([header_line] + meas_lines, filename_parts)
+    mismatches = compare_stored_std_dfs(transform_IPG_real_meas_to_df_reference([header_line] + meas_lines,
+                                                                                filename_parts),
+                                        whole_df, name + ' [IPG transform]', tolerance)
+
+    times_serie = pd.to_datetime(whole_df[rawu.RAW_TIME_COLUMN_NAME], format=ipg.IPG_TIME_FORMAT)
+    ref_datetimes_df = get_aligned_datetime_serie_reference(times_serie, filename_parts).to_frame()
+
+    align_state = rawu.get_start_align_state(times_serie.iloc[0].time(), filename_parts)
+    chunked_datetimes_df = pd.concat([rawu.align_datetime_chunk(times_serie.iloc[i:i + CHECK_IPG_CHUNK_ROWS],
+                                                                align_state)
+                                      for i in range(0, len(times_serie), CHECK_IPG_CHUNK_ROWS)]).to_frame()
+
+    mismatches += compare_std_dfs(ref_datetimes_df, rawu.get_aligned_datetime_serie(times_serie.copy(),
+                                                                                    filename_parts).to_frame(),
+                                  name + ' [aligned datetimes]', tolerance)
+    mismatches += compare_std_dfs(ref_datetimes_df, chunked_datetimes_df, name + ' [aligned datetimes by chunks]',
+                                  tolerance)
+
+    align_state = rawu.get_start_align_state(times_serie.iloc[0].time(), filename_parts)
+    chunk_dfs = []
+    for i in range(0, len(meas_lines), CHECK_IPG_CHUNK_ROWS):
+        chunk_dfs.append(ipg.transform_IPG_real_meas_to_df([header_line] + meas_lines[i:i + CHECK_IPG_CHUNK_ROWS],
+                                                           filename_parts, align_state=align_state))
+    mismatches += compare_std_dfs(whole_df, pd.concat(chunk_dfs, ignore_index=True),
+                                  name + ' [IPG transform by chunks]', tolerance)
+
+    return mismatches
+
+
+def check_Script2_file(full_filename, tolerance: CompareTolerance):
+    """
+    compares the fast overall system table with the one of the reference record-by-record parser
+    on the first records of the raw Script2 file
+    :param full_filename: full name of the raw Script2 file
+    :param tolerance: CompareTolerance structure
+    :return: list of mismatch descriptions
+    """
+    records = []
+    for timestamp, rec in sc2.read_Script2_records(full_filename):
+        if sc2.validate_script2_record(timestamp, rec) is None:
+            records.append((timestamp, rec))
+        if len(records) >= CHECK_SCRIPT2_REFERENCE_RECORDS:
+            break
+
+    if not records:
+        return []
+
+    # the reference parser logs every record
+    logging.disable(logging.INFO)
+    try:
+        ref_df = pd.concat([sc2.parse_script2_record(timestamp, rec) for timestamp, rec in records], ignore_index=True)
+    finally:
+        logging.disable(logging.NOTSET)
+
+    return compare_std_dfs(ref_df, sc2.get_script2_sys_df_fast(records),
+                           Path(full_filename).name + ' [Script2 overall system table]', tolerance)
+
+
+def check_std_Script2_order(std_dir):
+    """
+    checks, that standardized Script2 overall system tables are sorted by time,
+    and their standardized names have the time range of the table
+    :param std_dir: directory with standardized files, searched recursively
+    :return: list of mismatch descriptions
+    """
+    mismatches = []
+    for file in sorted(Path(std_dir).rglob('*' + rawu.RAW_SCRIPT2_SYS_FILENAME_SUFFIX + '*.csv')):
+        std_parts = rawu.get_std_filename_parts(file.name)
+        if (std_parts is None) or (std_parts.Suffix != rawu.RAW_SCRIPT2_SYS_FILENAME_SUFFIX):
+            continue
+
+        datetimes = pd.to_datetime(pd.read_csv(file, usecols=[rawu.RAW_START_DATETIME_COLUMN_NAME])
+                                   [rawu.RAW_START_DATETIME_COLUMN_NAME], format=rawu.STD_SCRIPT2_DATETIME_FORMAT)
+        if not datetimes.is_monotonic_increasing:
+            mismatches.append(file.name + ': rows are not sorted by time')
+
+        name_range = rawu.get_std_filename_datetimes(std_parts)
+        table_range = (datetimes.min().floor(rawu.STD_FILENAME_TIME_RESOLUTION),
+                       datetimes.max().floor(rawu.STD_FILENAME_TIME_RESOLUTION))
+        if tuple(name_range) != table_range:
+            mismatches.append(file.name + ': name range ' + str(name_range) + ' differs from table range '
+                              + str(table_range))
+
+    return mismatches
+
+
+def check_reference_functions(raw_dirs, tolerance: CompareTolerance):
+    """
+    compares optimized functions with the reference ones on all raw files of raw_dirs
+    :param raw_dirs: list of directories with raw files, parsed recursively
+    :param tolerance: CompareTolerance structure
+    :return: list of mismatch descriptions
+    """
+    mismatches = []
+    for job in engine.find_raw_files(raw_dirs, reg.RAW_SOURCE_IPG, recursive=True):
+        mismatches += check_IPG_file(job.full_filename, tolerance)
+    for job in engine.find_raw_files(raw_dirs, reg.RAW_SOURCE_SCRIPT2, recursive=True):
+        mismatches += check_Script2_file(job.full_filename, tolerance)
+
+    return mismatches
+
+
+# =======================================
+# ============ Regression run ===========
+
+def is_chunk_committed(out_dir):
+    """
+    :param out_dir: directory with standardized files of the run with checkpoints
+    :return: True if at least one chunk of a chunked file is committed to the checkpoint
+    """
+    chunks_dir = Path(chkp.get_checkpoint_dir(out_dir)) / chkp.CHECKPOINT_CHUNKS_DIR_NAME
+    if not chunks_dir.is_dir():
+        return False
+
+    return any([not file.name.startswith(chkp.CHECKPOINT_TMP_FILE_PREFIX) for file in chunks_dir.iterdir()])
+
+
+def run_interrupted_cli(cli_args, log_file, out_dir):
+    """
+    runs the CLI and kills it as soon as a chunk is committed, as a crash in the middle of a chunked file would do
+    :param cli_args: list of command-line arguments, including the interpreter and the script
+    :param log_file: opened log file
+    :param out_dir: directory with standardized files of the run
+    :return: True if the run is killed, False if it ended before any chunk is committed
+    """
+    process = subprocess.Popen(cli_args, stdout=log_file, stderr=subprocess.STDOUT, cwd=str(Path(__file__).parent))
+    while process.poll() is None:
+        if is_chunk_committed(out_dir):
+            process.kill()
+            process.wait()
+            return True
+        time.sleep(CHECK_INTERRUPT_POLL_SEC)
+
+    return False
+
+
+def add_uncommitted_rows(out_dir):
+    """
+    appends rows after the last committed chunk of every chunked output, so the resumed run must drop them
+    :param out_dir: directory with standardized files of the interrupted run
+    :return: number of changed chunked outputs
+    """
+    checkpoint_dir = chkp.get_checkpoint_dir(out_dir)
+
+    num_changed = 0
+    for tmp_file in Path(out_dir).rglob(ipg.IPG_TMP_FILE_PREFIX + '*'):
+        if chkp.get_chunk_checkpoint_fullname(checkpoint_dir, tmp_file).exists():
+            with open(tmp_file, 'ab') as out_file:
+                out_file.write(UNCOMMITTED_ROWS)
+            num_changed += 1
+
+    return num_changed
+
+
+def run_std_variant(raw_dirs, work_dir, variant: StdVariant):
+    """
+    standardizes raw files with the CLI in a separate process, as a user would do
+    :param raw_dirs: list of directories with raw files
+    :param work_dir: working directory, outputs and logs are stored to its subdirs
+    :param variant: StdVariant structure
+    :return: tuple (directory with standardized files, wall time of the last run in seconds, True if all runs passed)
+    """
+    out_dir = Path(work_dir) / variant.name
+    log_fullname = Path(work_dir) / (variant.name + '.log')
+    cli_args = [sys.executable, str(Path(__file__).parent / CLI_SCRIPT_NAME)] + REGRESSION_CLI_ARGS \
+               + ['--indir'] + [str(raw_dir) for raw_dir in raw_dirs] + ['--outdir', str(out_dir)] + variant.cli_args
+
+    is_ok = True
+    wall_sec = 0.0
+    for run_idx in range(variant.runs):
+        # outputs of the interrupted run are kept for the next one
+        if (run_idx == 0) or not variant.is_interrupted:
+            shutil.rmtree(out_dir, ignore_errors=True)
+
+        start = time.perf_counter()
+        with open(log_fullname, 'w') as log_file:
+            if (run_idx == 0) and variant.is_interrupted:
+                if not (run_interrupted_cli(cli_args, log_file, out_dir) and add_uncommitted_rows(out_dir)):
+                    logging.error('Regression: variant "' + variant.name + '" ended before it was interrupted')
+                    is_ok = False
+                continue
+
+            result = subprocess.run(cli_args, stdout=log_file, stderr=subprocess.STDOUT,
+                                    cwd=str(Path(__file__).parent))
+        wall_sec = time.perf_counter() - start
+
+        if result.returncode != 0:
+            logging.error('Regression: variant "' + variant.name + '" failed, see "' + str(log_fullname) + '"')
+            is_ok = False
+
+    if variant.is_interrupted and (RESUMED_FILE_LOG_MARKER not in Path(log_fullname).read_text()):
+        logging.error('Regression: variant "' + variant.name + '" resumed no chunked file, see "'
+                      + str(log_fullname) + '"')
+        is_ok = False
+
+    logging.info(f'Regression: variant "{variant.name}": {wall_sec:.2f} s, '
+                 f'{len(get_std_relative_names(out_dir))} standardized files')
+
+    return str(out_dir), wall_sec, is_ok
+
+
+def run_regression(work_dir, recorded_dirs=None, golden_dir='', ipg_rows=DEF_GEN_IPG_ROWS,
+                   script2_records=DEF_GEN_SCRIPT2_RECORDS, tolerance: CompareTolerance = None, seed=DEF_GEN_SEED):
+    """
+    runs differential regression check on generated and recorded raw files:
+        - optimized functions are compared with the reference ones
+        - standardized Script2 tables of the reference run are checked to be sorted and named by their time range
+        - standardized files of every optimized variant (chunked, cached, parallel, resumed) are compared
+          with the ones of the reference run: filenames and tables cell by cell;
+          the resumed variant is killed after the first committed chunk, gets rows of a not committed chunk,
+          and is run again with --resume
+        - if golden_dir is passed, the reference run is compared with the golden outputs,
+          or the golden outputs are recorded if golden_dir is empty
+
+    :param work_dir: working directory for generated raw files and outputs
+    :param recorded_dirs: list of directories with recorded raw files, parsed recursively
+    :param golden_dir: directory with golden standardized files, '' to skip golden comparison
+    :param ipg_rows: number of real-time measurements per generated IPG file
+    :param script2_records: number of records per generated Script2 file
+    :param tolerance: CompareTolerance structure, None for default tolerance
+    :param seed: seed of the random generator of raw files
+    :return: True if no regression found
+    """
+    if tolerance is None:
+        tolerance = CompareTolerance()
+
+    gen_dir = Path(work_dir) / 'raw'
+    shutil.rmtree(gen_dir, ignore_errors=True)
+    generate_raw_files(gen_dir, ipg_rows, script2_records, seed)
+    raw_dirs = [str(gen_dir)] + list(recorded_dirs or [])
+
+    mismatches = check_reference_functions(raw_dirs, tolerance)
+
+    ref_dir, ref_sec, is_ok = run_std_variant(raw_dirs, work_dir, StdVariant(name=REFERENCE_VARIANT_NAME))
+    mismatches += ['[' + REFERENCE_VARIANT_NAME + '] ' + mismatch for mismatch in check_std_Script2_order(ref_dir)]
+
+    if golden_dir and Path(golden_dir).is_dir() and get_std_relative_names(golden_dir):
+        mismatches += ['[golden] ' + mismatch for mismatch in compare_std_dirs(golden_dir, ref_dir, tolerance)]
+    elif golden_dir:
+        shutil.copytree(ref_dir, golden_dir, dirs_exist_ok=True)
+        logging.info('Regression: golden standardized files are recorded to "' + str(golden_dir) + '"')
+
+    for variant in get_std_variants(work_dir):
+        std_dir, wall_sec, is_variant_ok = run_std_variant(raw_dirs, work_dir, variant)
+        is_ok = is_ok and is_variant_ok
+        mismatches += ['[' + variant.name + '] ' + mismatch
+                       for mismatch in compare_std_dirs(ref_dir, std_dir, tolerance)]
+
+    for mismatch in mismatches:
+        logging.error('Regression: ' + mismatch)
+    logging.info('Regression: ' + str(len(mismatches)) + ' mismatches found')
+
+    return is_ok and not mismatches
+
+# =======================================